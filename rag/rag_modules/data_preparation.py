@@ -4,16 +4,136 @@
 
 import logging
 import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 from langchain_text_splitters import MarkdownHeaderTextSplitter
 from langchain_core.documents import Document
 from pathlib import Path
 import uuid
+from collections import Counter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# 并行读取文件的线程数，文件读取是I/O密集型，线程数可超过CPU核数
+LOAD_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# 超过该大小的文件通过mmap读取，由页缓存承载原始字节，只为解码后的字符串分配内存
+MMAP_MIN_FILE_SIZE = 1 << 20
+
+# Markdown分割的标题层级
+HEADERS_TO_SPLIT_ON = [
+    ("#", "主标题"),      # 地点名称
+    ("##", "二级标题"),   # 景点介绍、交通指南、门票信息等
+    ("###", "三级标题")   # 开放时间、游览路线、注意事项等
+]
+# 内容预览长度及预览中是否存在Markdown标题行的检测
+HEADER_PREVIEW_LEN = 200
+_HEADER_PREVIEW_RE = re.compile(r'(?m)^\s*#')
+# 每次派发给工作进程的文档数，减少进程间通信次数
+SPLIT_CHUNKSIZE = 8
+# 文档数达到该值才启用多进程分割（至少派发两个任务），文档较少时进程启动开销大于并行收益
+SPLIT_PARALLEL_MIN_DOCS = 2 * SPLIT_CHUNKSIZE
+# 每次从系统随机源批量读取的UUID个数
+UUID_BATCH_SIZE = 1024
+
+_markdown_splitter = None
+
+
+def _iter_md_files(root: str, relative_dir: str = '') -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    递归遍历目录下的Markdown文件，产出 (文件路径, 相对数据根目录的POSIX路径)
+    基于os.scandir直接使用DirEntry的类型缓存，中间目录不构造Path对象；
+    先产出当前目录的文件再进入子目录，不跟随目录符号链接。
+    相对路径随递归向下拼接，无需逐个文件解析真实路径；
+    文件本身是符号链接时相对路径为None，由调用方按链接目标计算
+    """
+    sub_dirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_dirs.append((entry.path, relative_dir + entry.name + '/'))
+            elif entry.name.endswith('.md'):
+                yield entry.path, None if entry.is_symlink() else relative_dir + entry.name
+    for sub_dir, sub_relative_dir in sub_dirs:
+        yield from _iter_md_files(sub_dir, sub_relative_dir)
+
+
+def _read_markdown(path: str) -> Tuple[str, Optional[str]]:
+    """读取单个Markdown文件，返回 (路径, 内容)，读取失败时内容为None"""
+    try:
+        # 无缓冲二进制整读后一次解码，省去每个文件的缓冲区和文本包装器
+        with open(path, 'rb', buffering=0) as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_FILE_SIZE:
+                # 直接从映射区解码，不再复制一份完整的bytes
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    content = str(mm, 'utf-8')
+            else:
+                content = f.read().decode('utf-8')
+        # 与文本模式的通用换行保持一致
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return path, content
+    except Exception as e:
+        logger.warning(f"读取文件 {path} 失败: {e}")
+        return path, None
+
+
+def _iter_uuid_strings() -> Iterator[str]:
+    """
+    批量读取随机字节切分为UUID4字符串，格式与str(uuid.uuid4())一致
+    多个UUID共用一次系统随机源读取；生成器为模块级共享，只能通过_new_chunk_id加锁取值
+    """
+    while True:
+        random_bytes = os.urandom(16 * UUID_BATCH_SIZE)
+        for offset in range(0, len(random_bytes), 16):
+            yield str(uuid.UUID(bytes=random_bytes[offset:offset + 16], version=4))
+
+
+_uuid_strings = _iter_uuid_strings()
+_uuid_lock = threading.Lock()
+
+
+def _new_chunk_id() -> str:
+    """生成一个子块ID，多个实例在不同线程中同时分块时由锁串行取值"""
+    with _uuid_lock:
+        return next(_uuid_strings)
+
+
+def _get_markdown_splitter() -> MarkdownHeaderTextSplitter:
+    """获取当前进程的Markdown标题分割器，每个进程只创建一次"""
+    global _markdown_splitter
+    if _markdown_splitter is None:
+        _markdown_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=HEADERS_TO_SPLIT_ON,
+            strip_headers=False  # 保留标题，便于理解上下文
+        )
+    return _markdown_splitter
+
+
+def _split_markdown(content: str) -> Tuple[Optional[List[Document]], Optional[str]]:
+    """
+    按标题分割单个文档，可在工作进程中执行
+    返回 (分割结果, 错误信息)，异常转为错误信息返回，避免中断整批分割
+    """
+    try:
+        return _get_markdown_splitter().split_text(content), None
+    except Exception as e:
+        return None, str(e)
+
+
 class DataPreparationModule:
     """旅游数据准备模块 - 负责旅游数据加载、清洗和预处理"""
     # 统一维护的分类与价格区间配置，供外部复用，避免关键词重复定义
@@ -29,8 +149,18 @@ class DataPreparationModule:
         'activity': '活动',
         'practical': '实用信息'
     }
-    CATEGORY_LABELS = list(set(CATEGORY_MAPPING.values()))
+    # 按映射顺序去重，顺序确定且不可变
+    CATEGORY_LABELS = tuple(dict.fromkeys(CATEGORY_MAPPING.values()))
     PRICE_LEVELS = ['经济', '中等', '高端', '奢华']
+    # 价格关键词 -> 价格区间；正则按长度从长到短排列，一次扫描即可识别全部关键词
+    _PRICE_KEYWORDS = {
+        '奢华': '奢华', '¥¥¥¥': '奢华',
+        '高端': '高端', '¥¥¥': '高端',
+        '中等': '中等', '¥¥': '中等',
+        '经济': '经济', '¥': '经济',
+    }
+    _PRICE_RE = re.compile('|'.join(map(re.escape, _PRICE_KEYWORDS)))
+    _PRICE_RANKS = {level: rank for rank, level in enumerate(PRICE_LEVELS)}
     
     def __init__(self, data_path: str):
         """
@@ -43,6 +173,11 @@ class DataPreparationModule:
         self.documents: List[Document] = []  # 父文档（完整旅游信息）
         self.chunks: List[Document] = []     # 子文档（按标题分割的小块）
         self.parent_child_map: Dict[str, str] = {}  # 子块ID -> 父文档ID的映射
+        self._parent_index: Dict[str, Document] = {}  # 父文档ID -> 父文档
+        self._parent_children: Dict[str, List[str]] = {}  # 父文档ID -> 子块ID列表
+        self._by_category: Dict[str, List[Document]] = {}  # 分类 -> 父文档列表
+        self._by_price: Dict[str, List[Document]] = {}     # 价格区间 -> 父文档列表
+        self._total_chunk_size = 0  # 全部子块的字符总数，分块时累计
     
     def load_documents(self) -> List[Document]:
         """
@@ -55,21 +190,29 @@ class DataPreparationModule:
         
         # 直接读取Markdown文件以保持原始格式
         documents = []
-        data_path_obj = Path(self.data_path)
+        parent_index = {}  # 父文档ID索引，同一ID保留首个文档
+        data_root = os.path.realpath(self.data_path)
 
-        for md_file in data_path_obj.rglob("*.md"):
-            try:
-                # 直接读取文件内容，保持Markdown格式
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+        md_entries = list(_iter_md_files(os.path.normpath(self.data_path)))
+        md_files = [md_file for md_file, _ in md_entries]
+
+        # 文件读取等待磁盘时释放GIL，多线程并行读取；map按输入顺序返回，文档顺序保持确定
+        with ThreadPoolExecutor(max_workers=max(1, min(LOAD_WORKERS, len(md_files)))) as executor:
+            read_results = list(executor.map(_read_markdown, md_files))
 
+        for (md_file, content), (_, relative_path) in zip(read_results, md_entries):
+            if content is None:
+                continue
+            try:
                 # 为每个父文档分配确定性的唯一ID（基于数据根目录的相对路径）
-                try:
-                    data_root = Path(self.data_path).resolve()
-                    relative_path = Path(md_file).resolve().relative_to(data_root).as_posix()
-                except Exception:
-                    relative_path = Path(md_file).as_posix()
-                parent_id = hashlib.md5(relative_path.encode("utf-8")).hexdigest()
+                if relative_path is None:
+                    # 文件符号链接按链接目标计算相对路径，指向数据根目录之外时退回原始路径
+                    relative_path = os.path.relpath(os.path.realpath(md_file), data_root)
+                    if relative_path.startswith(os.pardir):
+                        relative_path = md_file
+                    relative_path = relative_path.replace(os.sep, '/')
+                # 已保存的向量索引中记录的是该MD5值，更换哈希算法会使父文档查找失配
+                parent_id = hashlib.md5(relative_path.encode("utf-8"), usedforsecurity=False).hexdigest()
 
                 # 创建Document对象
                 doc = Document(
@@ -81,55 +224,70 @@ class DataPreparationModule:
                     }
                 )
                 documents.append(doc)
+                parent_index.setdefault(parent_id, doc)
 
             except Exception as e:
                 logger.warning(f"读取文件 {md_file} 失败: {e}")
         
-        # 增强文档元数据
+        # 增强文档元数据，同时建立分类和价格区间索引
+        by_category = {}
+        by_price = {}
         for doc in documents:
-            self._enhance_metadata(doc)
+            self._enhance_metadata(doc, doc.metadata["source"])
+            by_category.setdefault(doc.metadata['category'], []).append(doc)
+            by_price.setdefault(doc.metadata['price_level'], []).append(doc)
         
         self.documents = documents
+        self._parent_index = parent_index
+        self._by_category = by_category
+        self._by_price = by_price
         logger.info(f"成功加载 {len(documents)} 个文档")
         return documents
     
-    def _enhance_metadata(self, doc: Document):
+    def _enhance_metadata(self, doc: Document, path_str: Optional[str] = None):
         """
         增强文档元数据
 
         Args:
             doc: 需要增强元数据的文档
+            path_str: 文档文件路径，缺省时取元数据中的source
         """
-        file_path = Path(doc.metadata.get('source', ''))
-        path_parts = file_path.parts
+        if path_str is None:
+            path_str = doc.metadata.get('source', '')
+        if os.altsep:
+            path_str = path_str.replace(os.altsep, os.sep)
+        path_parts = path_str.split(os.sep)
+        parts_set = set(path_parts)
 
         # 提取旅游内容分类
         doc.metadata['category'] = '其他'
         for key, value in self.CATEGORY_MAPPING.items():
-            if key in path_parts:
+            if key in parts_set:
                 doc.metadata['category'] = value
                 break
 
         # 提取地点/景点名称
-        doc.metadata['location_name'] = file_path.stem
+        doc.metadata['location_name'] = os.path.splitext(os.path.basename(path_str))[0]
 
         # 分析价格区间
-        content = doc.page_content
-        if '奢华' in content or '¥¥¥¥' in content:
-            doc.metadata['price_level'] = '奢华'
-        elif '高端' in content or '¥¥¥' in content:
-            doc.metadata['price_level'] = '高端'
-        elif '中等' in content or '¥¥' in content:
-            doc.metadata['price_level'] = '中等'
-        elif '经济' in content or '¥' in content:
-            doc.metadata['price_level'] = '经济'
-        else:
-            doc.metadata['price_level'] = '未知'
+        # 单次扫描全文，取出现过的最高价格区间
+        price_level = '未知'
+        best_rank = -1
+        top_rank = len(self.PRICE_LEVELS) - 1
+        for match in self._PRICE_RE.finditer(doc.page_content):
+            level = self._PRICE_KEYWORDS[match.group()]
+            rank = self._PRICE_RANKS[level]
+            if rank > best_rank:
+                price_level, best_rank = level, rank
+                if rank == top_rank:
+                    break
+        doc.metadata['price_level'] = price_level
 
         # 提取城市信息（如果文件路径中有城市名）
+        # 城市名来自路径拆分，每个文档都是新字符串，驻留后同一城市的文档及其子块共享同一对象
         for part in path_parts:
             if part not in ['data', 'travel', 'src'] and len(part) > 1:
-                doc.metadata['city'] = part
+                doc.metadata['city'] = sys.intern(part)
                 break
         else:
             doc.metadata['city'] = '未知城市'
@@ -137,7 +295,7 @@ class DataPreparationModule:
     @classmethod
     def get_supported_categories(cls) -> List[str]:
         """对外提供支持的分类标签列表"""
-        return cls.CATEGORY_LABELS
+        return list(cls.CATEGORY_LABELS)
 
     @classmethod
     def get_supported_price_levels(cls) -> List[str]:
@@ -156,90 +314,102 @@ class DataPreparationModule:
         if not self.documents:
             raise ValueError("请先加载文档")
 
-        # 使用Markdown标题分割器
-        chunks = self._markdown_header_split()
+        # 重新分块会生成新的子块ID，先清空旧的父子映射
+        self.parent_child_map = {}
+        self._parent_children = {}
 
-        # 为每个chunk添加基础元数据
-        for i, chunk in enumerate(chunks):
+        # 使用Markdown标题分割器，边分割边补充基础元数据，每个chunk只处理一次
+        chunks = []
+        total_chunk_size = 0
+        for i, chunk in enumerate(self._markdown_header_split()):
             if 'chunk_id' not in chunk.metadata:
                 # 如果没有chunk_id（比如分割失败的情况），则生成一个
-                chunk.metadata['chunk_id'] = str(uuid.uuid4())
+                chunk.metadata['chunk_id'] = _new_chunk_id()
+            chunk_size = len(chunk.page_content)
             chunk.metadata['batch_index'] = i  # 在当前批次中的索引
-            chunk.metadata['chunk_size'] = len(chunk.page_content)
+            chunk.metadata['chunk_size'] = chunk_size
+            total_chunk_size += chunk_size
+            chunks.append(chunk)
 
         self.chunks = chunks
+        self._total_chunk_size = total_chunk_size
         logger.info(f"Markdown分块完成，共生成 {len(chunks)} 个chunk")
         return chunks
 
-    def _markdown_header_split(self) -> List[Document]:
+    def _markdown_header_split(self) -> Iterator[Document]:
         """
         使用Markdown标题分割器进行结构化分割
+        文档较多时在进程池中并行分割，父子关系和ID仍在主进程中按文档顺序建立
 
         Returns:
-            按标题结构分割的文档列表
+            按标题结构分割的文档迭代器，逐个文档产出分割结果
         """
-        # 定义要分割的标题层级
-        headers_to_split_on = [
-            ("#", "主标题"),      # 地点名称
-            ("##", "二级标题"),   # 景点介绍、交通指南、门票信息等
-            ("###", "三级标题")   # 开放时间、游览路线、注意事项等
-        ]
-
-        # 创建Markdown分割器
-        markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=headers_to_split_on,
-            strip_headers=False  # 保留标题，便于理解上下文
-        )
-
-        all_chunks = []
+        documents = self.documents
+        contents = [doc.page_content for doc in documents]
+
+        # 进程数不超过派发的任务数，单核或只有一个任务时并行没有收益，直接在本进程分割
+        workers = 0
+        if len(documents) >= SPLIT_PARALLEL_MIN_DOCS:
+            workers = min(os.cpu_count() or 1, math.ceil(len(documents) / SPLIT_CHUNKSIZE))
+
+        executor = None
+        if workers >= 2:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            split_results = executor.map(_split_markdown, contents, chunksize=SPLIT_CHUNKSIZE)
+        else:
+            split_results = map(_split_markdown, contents)
 
-        for doc in self.documents:
-            try:
-                # 检查文档内容是否包含Markdown标题
-                content_preview = doc.page_content[:200]
-                has_headers = any(line.strip().startswith('#') for line in content_preview.split('\n'))
+        total_chunks = 0
 
-                if not has_headers:
-                    logger.warning(f"文档 {doc.metadata.get('location_name', '未知')} 内容中没有发现Markdown标题")
-                    logger.debug(f"内容预览: {content_preview}")
+        try:
+            for doc, (md_chunks, split_error) in zip(documents, split_results):
+                try:
+                    # 检查文档内容开头是否包含Markdown标题，按位置限定搜索范围，无需切片和逐行拆分
+                    if _HEADER_PREVIEW_RE.search(doc.page_content, 0, HEADER_PREVIEW_LEN) is None:
+                        logger.warning(f"文档 {doc.metadata.get('location_name', '未知')} 内容中没有发现Markdown标题")
+                        logger.debug(f"内容预览: {doc.page_content[:HEADER_PREVIEW_LEN]}")
 
-                # 对每个文档进行Markdown分割
-                md_chunks = markdown_splitter.split_text(doc.page_content)
+                    if split_error is not None:
+                        raise RuntimeError(split_error)
 
-                logger.debug(f"文档 {doc.metadata.get('location_name', '未知')} 分割成 {len(md_chunks)} 个chunk")
+                    logger.debug(f"文档 {doc.metadata.get('location_name', '未知')} 分割成 {len(md_chunks)} 个chunk")
 
-                # 如果没有分割成功，说明文档可能没有标题结构
-                if len(md_chunks) <= 1:
-                    logger.warning(f"文档 {doc.metadata.get('location_name', '未知')} 未能按标题分割，可能缺少标题结构")
+                    # 如果没有分割成功，说明文档可能没有标题结构
+                    if len(md_chunks) <= 1:
+                        logger.warning(f"文档 {doc.metadata.get('location_name', '未知')} 未能按标题分割，可能缺少标题结构")
 
-                # 为每个子块建立与父文档的关系
-                parent_id = doc.metadata["parent_id"]
+                    # 为每个子块建立与父文档的关系
+                    parent_id = doc.metadata["parent_id"]
 
-                for i, chunk in enumerate(md_chunks):
-                    # 为子块分配唯一ID
-                    child_id = str(uuid.uuid4())
+                    for i, chunk in enumerate(md_chunks):
+                        # 为子块分配唯一ID
+                        child_id = _new_chunk_id()
 
-                    # 合并原文档元数据和新的标题元数据
-                    chunk.metadata.update(doc.metadata)
-                    chunk.metadata.update({
-                        "chunk_id": child_id,
-                        "parent_id": parent_id,
-                        "doc_type": "child",  # 标记为子文档
-                        "chunk_index": i      # 在父文档中的位置
-                    })
+                        # 合并原文档元数据和新的标题元数据
+                        chunk.metadata.update(doc.metadata)
+                        chunk.metadata.update({
+                            "chunk_id": child_id,
+                            "parent_id": parent_id,
+                            "doc_type": "child",  # 标记为子文档
+                            "chunk_index": i      # 在父文档中的位置
+                        })
 
-                    # 建立父子映射关系
-                    self.parent_child_map[child_id] = parent_id
+                        # 建立父子映射关系
+                        self.parent_child_map[child_id] = parent_id
+                        self._parent_children.setdefault(parent_id, []).append(child_id)
 
-                all_chunks.extend(md_chunks)
+                except Exception as e:
+                    logger.warning(f"文档 {doc.metadata.get('source', '未知')} Markdown分割失败: {e}")
+                    # 如果Markdown分割失败，将整个文档作为一个chunk
+                    md_chunks = [doc]
 
-            except Exception as e:
-                logger.warning(f"文档 {doc.metadata.get('source', '未知')} Markdown分割失败: {e}")
-                # 如果Markdown分割失败，将整个文档作为一个chunk
-                all_chunks.append(doc)
+                total_chunks += len(md_chunks)
+                yield from md_chunks
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
-        logger.info(f"Markdown结构分割完成，生成 {len(all_chunks)} 个结构化块")
-        return all_chunks
+        logger.info(f"Markdown结构分割完成，生成 {total_chunks} 个结构化块")
 
     def filter_documents_by_category(self, category: str) -> List[Document]:
         """
@@ -251,7 +421,7 @@ class DataPreparationModule:
         Returns:
             过滤后的文档列表
         """
-        return [doc for doc in self.documents if doc.metadata.get('category') == category]
+        return list(self._by_category.get(category, ()))
 
     def filter_documents_by_price_level(self, price_level: str) -> List[Document]:
         """
@@ -263,7 +433,7 @@ class DataPreparationModule:
         Returns:
             过滤后的文档列表
         """
-        return [doc for doc in self.documents if doc.metadata.get('price_level') == price_level]
+        return list(self._by_price.get(price_level, ()))
     
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -275,24 +445,16 @@ class DataPreparationModule:
         if not self.documents:
             return {}
 
-        categories = {}
-        price_levels = {}
-
-        for doc in self.documents:
-            # 统计分类
-            category = doc.metadata.get('category', '未知')
-            categories[category] = categories.get(category, 0) + 1
-
-            # 统计价格区间
-            price_level = doc.metadata.get('price_level', '未知')
-            price_levels[price_level] = price_levels.get(price_level, 0) + 1
+        # 统计分类和价格区间
+        categories = Counter(doc.metadata.get('category', '未知') for doc in self.documents)
+        price_levels = Counter(doc.metadata.get('price_level', '未知') for doc in self.documents)
 
         return {
             'total_documents': len(self.documents),
             'total_chunks': len(self.chunks),
-            'categories': categories,
-            'price_levels': price_levels,
-            'avg_chunk_size': sum(chunk.metadata.get('chunk_size', 0) for chunk in self.chunks) / len(self.chunks) if self.chunks else 0
+            'categories': dict(categories),
+            'price_levels': dict(price_levels),
+            'avg_chunk_size': self._total_chunk_size / len(self.chunks) if self.chunks else 0
         }
     
     def export_metadata(self, output_path: str):
@@ -302,21 +464,26 @@ class DataPreparationModule:
         Args:
             output_path: 输出文件路径
         """
-        import json
-
-        metadata_list = []
-        for doc in self.documents:
-            metadata_list.append({
+        metadata_list = [
+            {
                 'source': doc.metadata.get('source'),
                 'location_name': doc.metadata.get('location_name'),
                 'category': doc.metadata.get('category'),
                 'price_level': doc.metadata.get('price_level'),
                 'city': doc.metadata.get('city'),
                 'content_length': len(doc.page_content)
-            })
+            }
+            for doc in self.documents
+        ]
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata_list, f, ensure_ascii=False, indent=2)
+        # 优先使用orjson直接编码为UTF-8字节，未安装时退回标准库，两者都整体编码后一次写入
+        if orjson is not None:
+            data = orjson.dumps(metadata_list, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(metadata_list, ensure_ascii=False, indent=2).encode('utf-8')
+
+        with open(output_path, 'wb') as f:
+            f.write(data)
 
         logger.info(f"元数据已导出到: {output_path}")
 
@@ -331,33 +498,17 @@ class DataPreparationModule:
             对应的父文档列表（去重，按相关性排序）
         """
         # 统计每个父文档被匹配的次数（相关性指标）
-        parent_relevance = {}
-        parent_docs_map = {}
-
-        # 收集所有相关的父文档ID和相关性分数
-        for chunk in child_chunks:
-            parent_id = chunk.metadata.get("parent_id")
-            if parent_id:
-                # 增加相关性计数
-                parent_relevance[parent_id] = parent_relevance.get(parent_id, 0) + 1
-
-                # 缓存父文档（避免重复查找）
-                if parent_id not in parent_docs_map:
-                    for doc in self.documents:
-                        if doc.metadata.get("parent_id") == parent_id:
-                            parent_docs_map[parent_id] = doc
-                            break
-
-        # 按相关性排序（匹配次数多的排在前面）
-        sorted_parent_ids = sorted(parent_relevance.keys(),
-                                 key=lambda x: parent_relevance[x],
-                                 reverse=True)
-
-        # 构建去重后的父文档列表
-        parent_docs = []
-        for parent_id in sorted_parent_ids:
-            if parent_id in parent_docs_map:
-                parent_docs.append(parent_docs_map[parent_id])
+        parent_relevance = Counter(
+            parent_id for parent_id in (chunk.metadata.get("parent_id") for chunk in child_chunks) if parent_id
+        )
+
+        # 按相关性排序（匹配次数多的排在前面，次数相同保持首次出现顺序），通过父文档ID索引直接查找
+        parent_index = self._parent_index
+        parent_docs = [
+            parent_index[parent_id]
+            for parent_id, _ in parent_relevance.most_common()
+            if parent_id in parent_index
+        ]
 
         # 收集父文档名称和相关性信息用于日志
         parent_info = []
@@ -368,4 +519,16 @@ class DataPreparationModule:
             parent_info.append(f"{location_name}({relevance_count}块)")
 
         logger.info(f"从 {len(child_chunks)} 个子块中找到 {len(parent_docs)} 个去重父文档: {', '.join(parent_info)}")
-        return parent_docs
\ No newline at end of file
+        return parent_docs
+
+    def get_child_ids(self, parent_id: str) -> List[str]:
+        """
+        获取父文档下全部子块的ID
+
+        Args:
+            parent_id: 父文档ID
+
+        Returns:
+            子块ID列表，按在父文档中的位置排列
+        """
+        return list(self._parent_children.get(parent_id, ()))
\ No newline at end of file
@@ -19,6 +19,11 @@ class GraphRAGConfig:
     neo4j_user: str = os.getenv("NEO4J_USER", "neo4j")
     neo4j_password: str = os.getenv("NEO4J_PASSWORD", "")
     neo4j_database: str = os.getenv("NEO4J_DATABASE", "neo4j")
+    neo4j_max_pool_size: int = int(os.getenv("NEO4J_MAX_POOL_SIZE", "64"))  # 连接池上限
+    neo4j_acquisition_timeout: float = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))  # 从连接池获取连接的超时（秒）
+    neo4j_connection_timeout: float = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "10"))  # 建立TCP连接的超时（秒）
+    neo4j_max_connection_lifetime: float = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))  # 连接最长复用时间（秒）
+    neo4j_fetch_size: int = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))  # 每批拉取的记录数
 
     # Milvus配置
     milvus_host: str = os.getenv("MILVUS_HOST", "localhost")
@@ -38,11 +43,14 @@ class GraphRAGConfig:
     # 生成配置
     temperature: float = float(os.getenv("TEMPERATURE", "0.1"))
     max_tokens: int = int(os.getenv("MAX_TOKENS", "2048"))
+    intent_max_tokens: int = int(os.getenv("INTENT_MAX_TOKENS", "4096"))  # 单次查询意图理解请求的max_tokens上限
 
     # 图数据处理配置
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "500"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "50"))
     max_graph_depth: int = int(os.getenv("MAX_GRAPH_DEPTH", "2"))  # 图遍历最大深度
+    pre_warm: bool = os.getenv("GRAPH_PRE_WARM", "true").lower() == "true"  # 初始化时预热Neo4j页缓存
+    hub_penalty_rho: float = float(os.getenv("HUB_PENALTY_RHO", "4.0"))  # 子图枢纽惩罚阈值，log(1+度数)不低于该值的邻居被剪枝
 
     def __post_init__(self):
         """初始化后的处理"""
@@ -61,6 +69,11 @@ class GraphRAGConfig:
             'neo4j_user': self.neo4j_user,
             'neo4j_password': self.neo4j_password,
             'neo4j_database': self.neo4j_database,
+            'neo4j_max_pool_size': self.neo4j_max_pool_size,
+            'neo4j_acquisition_timeout': self.neo4j_acquisition_timeout,
+            'neo4j_connection_timeout': self.neo4j_connection_timeout,
+            'neo4j_max_connection_lifetime': self.neo4j_max_connection_lifetime,
+            'neo4j_fetch_size': self.neo4j_fetch_size,
             'milvus_host': self.milvus_host,
             'milvus_port': self.milvus_port,
             'milvus_collection_name': self.milvus_collection_name,
@@ -71,9 +84,12 @@ class GraphRAGConfig:
 
             'temperature': self.temperature,
             'max_tokens': self.max_tokens,
+            'intent_max_tokens': self.intent_max_tokens,
             'chunk_size': self.chunk_size,
             'chunk_overlap': self.chunk_overlap,
-            'max_graph_depth': self.max_graph_depth
+            'max_graph_depth': self.max_graph_depth,
+            'hub_penalty_rho': self.hub_penalty_rho,
+            'pre_warm': self.pre_warm
         }
 
 # 默认配置实例
@@ -2,7 +2,7 @@
 
 import logging
 import json
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional
 from dataclasses import dataclass
 
 from neo4j import GraphDatabase
@@ -95,7 +95,7 @@ class GraphDataPreparationModule:
 
         logger.info("正在从Neo4j加载图数据")
 
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # 加载城市节点
             city_query = """
             MATCH (n:City)
@@ -452,6 +452,9 @@ class GraphDataPreparationModule:
         
         if not self.documents:
             raise ValueError("请先构建文档")
+
+        if chunk_overlap >= chunk_size:
+            raise ValueError("重叠大小必须小于分块大小")
         
         chunks = []
         chunk_id_counter = 0 
@@ -483,12 +486,7 @@ class GraphDataPreparationModule:
                     # 没有二级标题，按长度强制分块
                     total_chunks = (len(content) - 1) // (chunk_size - chunk_overlap) + 1
 
-                    for i in range(total_chunks):
-                        start = i * (chunk_size - chunk_overlap)
-                        end = min(start + chunk_size, len(content))
-
-                        chunk_content = content[start:end]
-
+                    for i, chunk_content in enumerate(self._sliding_windows(content, chunk_size, chunk_overlap)):
                         chunk = Document(
                             page_content=chunk_content,
                             metadata={
@@ -534,6 +532,23 @@ class GraphDataPreparationModule:
         logger.info(f"文档分块完成，共生成 {len(chunks)} 个块")
         return chunks
     
+    @staticmethod
+    def _sliding_windows(content: str, chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+        """
+        按固定步长惰性生成重叠窗口，每个窗口直接对原文切片
+
+        Args:
+           content: 文本内容
+           chunk_size: 窗口大小
+           chunk_overlap: 相邻窗口的重叠大小
+
+        Yields:
+           每个窗口的文本
+        """
+        step = chunk_size - chunk_overlap
+        for start in range(0, len(content), step):
+            yield content[start:start + chunk_size]
+
     def get_statistics(self) -> Dict[str, Any]:
         """
         获取数据统计信息
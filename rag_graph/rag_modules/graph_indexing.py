@@ -7,19 +7,83 @@ V: 详细描述段落（包含相关文本片段）
 
 import json
 import logging
-from typing import Dict, List, Tuple, Any, Optional
+import sys
+from typing import Dict, Iterable, List, Tuple, Any, Optional
 from dataclasses import dataclass
 from collections import defaultdict
 
 from langchain_core.documents import Document
 
+# pyarrow为可选依赖，仅用于批量导出实体文本
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
 logger = logging.getLogger(__name__)
 
+# 实体类型 -> (名称前缀, ((属性名, 标签前缀), ...))
+# 前缀预先拼好，构建内容时直接做字符串拼接
+ENTITY_SCHEMA: Dict[str, Tuple[str, Tuple[Tuple[str, str], ...]]] = {
+    "City": ("城市名称：", (
+        ("type", "类型: "),
+        ("description", "描述: "),
+        ("best_time", "最佳旅游时间: "),
+        ("consumption_level", "消费水平: "),
+        ("highlights", "特色景点: "),
+    )),
+    "Region": ("地区名称：", (
+        ("type", "类型: "),
+        ("description", "描述: "),
+        ("best_time", "最佳旅游时间: "),
+        ("consumption_level", "消费水平: "),
+        ("highlights", "特色景点: "),
+    )),
+    "SubRegion": ("子地区名称：", (
+        ("parent_region", "所属地区: "),
+        ("description", "描述: "),
+    )),
+    "Attraction": ("景点名称：", (
+        ("city_id", "所在城市: "),
+        ("category", "景点类型: "),
+        ("description", "描述: "),
+        ("ticket_price", "门票价格: "),
+        ("address", "地址: "),
+    )),
+    "Food": ("美食名称：", (
+        ("city_id", "所在城市: "),
+        ("category", "美食类型: "),
+        ("description", "描述: "),
+    )),
+    "Restaurant": ("餐厅名称：", (
+        ("city_id", "所在城市: "),
+        ("type", "餐厅类型: "),
+        ("description", "描述: "),
+        ("address", "地址: "),
+    )),
+    "Hotel": ("住宿名称：", (
+        ("city_id", "所在城市: "),
+        ("type", "住宿类型: "),
+        ("description", "描述: "),
+        ("area", "所在区域: "),
+    )),
+    "Festival": ("节庆名称：", (
+        ("city_id", "所在城市: "),
+        ("time", "举办时间: "),
+        ("description", "描述: "),
+    )),
+    "Specialty": ("特产名称：", (
+        ("city_id", "所在城市: "),
+        ("category", "特产类型: "),
+        ("description", "描述: "),
+    )),
+}
+
 @dataclass
 class EntityKeyValue:
     """实体键值对"""
     entity_name: str
-    index_keys: List[str]  # 索引键列表
+    index_keys: Tuple[str, ...]  # 索引键（驻留字符串的不可变元组）
     value_content: str     # 详细描述内容
     entity_type: str       # 实体类型 (Recipe, Ingredient, CookingStep)
     metadata: Dict[str, Any]
@@ -28,7 +92,7 @@ class EntityKeyValue:
 class RelationKeyValue:
     """关系键值对"""
     relation_id: str
-    index_keys: List[str]  # 多个索引键（可包含全局主题）
+    index_keys: Tuple[str, ...]  # 多个索引键（可包含全局主题，驻留字符串的不可变元组）
     value_content: str     # 关系描述内容
     relation_type: str     # 关系类型
     source_entity: str     # 源实体
@@ -56,22 +120,26 @@ class GraphIndexingModule:
         # 索引映射：key -> entity/relation IDs
         self.key_to_entities: Dict[str, List[str]] = defaultdict(list)
         self.key_to_relations: Dict[str, List[str]] = defaultdict(list)
+
+        # (实体类, 实体类型) -> 字段存在位图，同一类的属性结构不变，只需探测一次
+        self._field_masks: Dict[Tuple[type, str], int] = {}
         
     def create_entity_key_values(
         self,
-        cities: List[Any] = None,
-        regions: List[Any] = None,
-        subregions: List[Any] = None,
-        attractions: List[Any] = None,
-        foods: List[Any] = None,
-        restaurants: List[Any] = None,
-        hotels: List[Any] = None,
-        festivals: List[Any] = None,
-        specialties: List[Any] = None) -> Dict[str, EntityKeyValue]:
+        cities: Iterable[Any] = None,
+        regions: Iterable[Any] = None,
+        subregions: Iterable[Any] = None,
+        attractions: Iterable[Any] = None,
+        foods: Iterable[Any] = None,
+        restaurants: Iterable[Any] = None,
+        hotels: Iterable[Any] = None,
+        festivals: Iterable[Any] = None,
+        specialties: Iterable[Any] = None) -> Dict[str, EntityKeyValue]:
         """
         为实体创建键值对结构
         每个实体使用其名称作为唯一的索引键
         支持所有旅游相关实体类型
+        各参数可以是任意可迭代对象（包括查询结果生成器），每种类型只遍历一次
         """
 
         # 初始化参数为空列表
@@ -96,321 +164,78 @@ class GraphIndexingModule:
 
         logger.info("开始创建实体键值对...")
 
-        # 处理城市实体
-        for city in cities:
-            entity_id = getattr(city, 'id', city.node_id if hasattr(city, 'node_id') else None)
-            entity_name = getattr(city, 'name', city.node_name if hasattr(city, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"城市名称：{entity_name}"]
-
-            # 添加城市特有属性
-            if hasattr(city, 'type'):
-                content_parts.append(f"类型: {city.type}")
-            if hasattr(city, 'description') and city.description:
-                content_parts.append(f"描述: {city.description}")
-            if hasattr(city, 'best_time') and city.best_time:
-                content_parts.append(f"最佳旅游时间: {city.best_time}")
-            if hasattr(city, 'consumption_level') and city.consumption_level:
-                content_parts.append(f"消费水平: {city.consumption_level}")
-            if hasattr(city, 'highlights') and city.highlights:
-                content_parts.append(f"特色景点: {city.highlights}")
-
-            # 创建键值对
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],  # 使用名称作为唯一索引键
-                value_content='\n'.join(content_parts),
-                entity_type="City",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(city)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理地区实体
-        for region in regions:
-            entity_id = getattr(region, 'id', region.node_id if hasattr(region, 'node_id') else None)
-            entity_name = getattr(region, 'name', region.node_name if hasattr(region, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"地区名称：{entity_name}"]
-
-            if hasattr(region, 'type'):
-                content_parts.append(f"类型: {region.type}")
-            if hasattr(region, 'description') and region.description:
-                content_parts.append(f"描述: {region.description}")
-            if hasattr(region, 'best_time') and region.best_time:
-                content_parts.append(f"最佳旅游时间: {region.best_time}")
-            if hasattr(region, 'consumption_level') and region.consumption_level:
-                content_parts.append(f"消费水平: {region.consumption_level}")
-            if hasattr(region, 'highlights') and region.highlights:
-                content_parts.append(f"特色景点: {region.highlights}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Region",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(region)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理子地区实体
-        for subregion in subregions:
-            entity_id = getattr(subregion, 'id', subregion.node_id if hasattr(subregion, 'node_id') else None)
-            entity_name = getattr(subregion, 'name', subregion.node_name if hasattr(subregion, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"子地区名称：{entity_name}"]
-
-            if hasattr(subregion, 'parent_region') and subregion.parent_region:
-                content_parts.append(f"所属地区: {subregion.parent_region}")
-            if hasattr(subregion, 'description') and subregion.description:
-                content_parts.append(f"描述: {subregion.description}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="SubRegion",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(subregion)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理景点实体
-        for attraction in attractions:
-            entity_id = getattr(attraction, 'id', attraction.node_id if hasattr(attraction, 'node_id') else None)
-            entity_name = getattr(attraction, 'name', attraction.node_name if hasattr(attraction, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"景点名称：{entity_name}"]
-
-            if hasattr(attraction, 'city_id') and attraction.city_id:
-                content_parts.append(f"所在城市: {attraction.city_id}")
-            if hasattr(attraction, 'category') and attraction.category:
-                content_parts.append(f"景点类型: {attraction.category}")
-            if hasattr(attraction, 'description') and attraction.description:
-                content_parts.append(f"描述: {attraction.description}")
-            if hasattr(attraction, 'ticket_price') and attraction.ticket_price:
-                content_parts.append(f"门票价格: {attraction.ticket_price}")
-            if hasattr(attraction, 'address') and attraction.address:
-                content_parts.append(f"地址: {attraction.address}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Attraction",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(attraction)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理美食实体
-        for food in foods:
-            entity_id = getattr(food, 'id', food.node_id if hasattr(food, 'node_id') else None)
-            entity_name = getattr(food, 'name', food.node_name if hasattr(food, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"美食名称：{entity_name}"]
-
-            if hasattr(food, 'city_id') and food.city_id:
-                content_parts.append(f"所在城市: {food.city_id}")
-            if hasattr(food, 'category') and food.category:
-                content_parts.append(f"美食类型: {food.category}")
-            if hasattr(food, 'description') and food.description:
-                content_parts.append(f"描述: {food.description}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Food",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(food)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理餐厅实体
-        for restaurant in restaurants:
-            entity_id = getattr(restaurant, 'id', restaurant.node_id if hasattr(restaurant, 'node_id') else None)
-            entity_name = getattr(restaurant, 'name', restaurant.node_name if hasattr(restaurant, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"餐厅名称：{entity_name}"]
-
-            if hasattr(restaurant, 'city_id') and restaurant.city_id:
-                content_parts.append(f"所在城市: {restaurant.city_id}")
-            if hasattr(restaurant, 'type') and restaurant.type:
-                content_parts.append(f"餐厅类型: {restaurant.type}")
-            if hasattr(restaurant, 'description') and restaurant.description:
-                content_parts.append(f"描述: {restaurant.description}")
-            if hasattr(restaurant, 'address') and restaurant.address:
-                content_parts.append(f"地址: {restaurant.address}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Restaurant",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(restaurant)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理住宿实体
-        for hotel in hotels:
-            entity_id = getattr(hotel, 'id', hotel.node_id if hasattr(hotel, 'node_id') else None)
-            entity_name = getattr(hotel, 'name', hotel.node_name if hasattr(hotel, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"住宿名称：{entity_name}"]
-
-            if hasattr(hotel, 'city_id') and hotel.city_id:
-                content_parts.append(f"所在城市: {hotel.city_id}")
-            if hasattr(hotel, 'type') and hotel.type:
-                content_parts.append(f"住宿类型: {hotel.type}")
-            if hasattr(hotel, 'description') and hotel.description:
-                content_parts.append(f"描述: {hotel.description}")
-            if hasattr(hotel, 'area') and hotel.area:
-                content_parts.append(f"所在区域: {hotel.area}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Hotel",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(hotel)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理节庆实体
-        for festival in festivals:
-            entity_id = getattr(festival, 'id', festival.node_id if hasattr(festival, 'node_id') else None)
-            entity_name = getattr(festival, 'name', festival.node_name if hasattr(festival, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"节庆名称：{entity_name}"]
-
-            if hasattr(festival, 'city_id') and festival.city_id:
-                content_parts.append(f"所在城市: {festival.city_id}")
-            if hasattr(festival, 'time') and festival.time:
-                content_parts.append(f"举办时间: {festival.time}")
-            if hasattr(festival, 'description') and festival.description:
-                content_parts.append(f"描述: {festival.description}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Festival",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(festival)
-                }
-            )
-
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
-
-        # 处理特产实体
-        for specialty in specialties:
-            entity_id = getattr(specialty, 'id', specialty.node_id if hasattr(specialty, 'node_id') else None)
-            entity_name = getattr(specialty, 'name', specialty.node_name if hasattr(specialty, 'node_name') else None)
-
-            if not entity_id or not entity_name:
-                continue
-
-            content_parts = [f"特产名称：{entity_name}"]
-
-            if hasattr(specialty, 'city_id') and specialty.city_id:
-                content_parts.append(f"所在城市: {specialty.city_id}")
-            if hasattr(specialty, 'category') and specialty.category:
-                content_parts.append(f"特产类型: {specialty.category}")
-            if hasattr(specialty, 'description') and specialty.description:
-                content_parts.append(f"描述: {specialty.description}")
-
-            entity_kv = EntityKeyValue(
-                entity_name=entity_name,
-                index_keys=[entity_name],
-                value_content='\n'.join(content_parts),
-                entity_type="Specialty",
-                metadata={
-                    "node_id": entity_id,
-                    "properties": self._get_entity_properties(specialty)
-                }
-            )
+        entity_groups = (
+            ("City", cities),
+            ("Region", regions),
+            ("SubRegion", subregions),
+            ("Attraction", attractions),
+            ("Food", foods),
+            ("Restaurant", restaurants),
+            ("Hotel", hotels),
+            ("Festival", festivals),
+            ("Specialty", specialties),
+        )
+
+        for entity_type, entities in entity_groups:
+            name_prefix, fields = ENTITY_SCHEMA[entity_type]
+            max_parts = 1 + len(fields)
+
+            for entity in entities:
+                entity_id = getattr(entity, 'id', entity.node_id if hasattr(entity, 'node_id') else None)
+                entity_name = getattr(entity, 'name', entity.node_name if hasattr(entity, 'node_name') else None)
+
+                if not entity_id or not entity_name:
+                    continue
 
-            self.entity_kv_store[entity_id] = entity_kv
-            self.key_to_entities[entity_name].append(entity_id)
+                # 按该类型的最大字段数预分配，避免逐个append扩容
+                content_parts = [None] * max_parts
+                content_parts[0] = name_prefix + entity_name
+                part_count = 1
+
+                # 添加该实体类型特有的属性（只读取位图中标记存在的字段）
+                mask_key = (type(entity), entity_type)
+                present_mask = self._field_masks.get(mask_key)
+                if present_mask is None:
+                    present_mask = self._compute_field_mask(entity, fields)
+                    self._field_masks[mask_key] = present_mask
+
+                if present_mask:
+                    for field_index, (attr_name, label) in enumerate(fields):
+                        if present_mask >> field_index & 1:
+                            value = getattr(entity, attr_name, None)
+                            if value:
+                                content_parts[part_count] = label + str(value)
+                                part_count += 1
+
+                # 创建键值对：名称驻留后同时作为索引键和倒排映射的键，字典查找可直接按指针比较
+                entity_name = sys.intern(entity_name)
+                entity_kv = EntityKeyValue(
+                    entity_name=entity_name,
+                    index_keys=(entity_name,),  # 使用名称作为唯一索引键
+                    value_content='\n'.join(content_parts[:part_count]),
+                    entity_type=entity_type,
+                    metadata={
+                        "node_id": entity_id
+                    }
+                )
+
+                self.entity_kv_store[entity_id] = entity_kv
+                self.key_to_entities[entity_name].append(entity_id)
 
         logger.info(f"实体键值对创建完成，共创建 {len(self.entity_kv_store)} 个实体")
         return self.entity_kv_store
 
-    def _get_entity_properties(self, entity: Any) -> Dict[str, Any]:
+    @staticmethod
+    def _compute_field_mask(entity: Any, fields: Tuple[Tuple[str, str], ...]) -> int:
         """
-        提取实体的所有属性为字典
+        计算实体拥有哪些schema字段的位图
+        第i位为1表示实体拥有fields[i]对应的属性
         """
-        properties = {}
-
-        # 获取所有非函数属性
-        for attr_name in dir(entity):
-            if not attr_name.startswith('_') and not callable(getattr(entity, attr_name)):
-                try:
-                    attr_value = getattr(entity, attr_name)
-                    if attr_value is not None and attr_name not in ['id', 'name', 'node_id', 'node_name']:
-                        properties[attr_name] = attr_value
-                except:
-                    continue
-
-        return properties
+        mask = 0
+        for field_index, (attr_name, _) in enumerate(fields):
+            if hasattr(entity, attr_name):
+                mask |= 1 << field_index
+        return mask
 
     def get_entities_by_key(self, key: str) -> List[EntityKeyValue]:
         """
@@ -463,19 +288,22 @@ class GraphIndexingModule:
         logger.debug(f"通过键 '{key}' 找到 {len(results)} 个关系")
         return results
 
-    def create_relation_key_values(self, relationships: List[Tuple[str, str, str]]) -> Dict[str, RelationKeyValue]:
+    def create_relation_key_values(self, relationships: Iterable[Tuple[str, str, str]]) -> Dict[str, RelationKeyValue]:
         """
         为关系创建键值对结构
         
         Args:
-            relationships: 关系列表，格式为 [(source_id, relation_type, target_id), ...]
+            relationships: 关系序列，格式为 [(source_id, relation_type, target_id), ...]，
+                           可以是生成器，只遍历一次
         
         Returns:
             关系键值对字典
         """
-        logger.info(f"开始创建关系键值对，关系数量: {len(relationships)}")
+        logger.info("开始创建关系键值对...")
         
+        relation_count = 0
         for source_id, relation_type, target_id in relationships:
+            relation_count += 1
             # 创建唯一的关系ID
             relation_id = f"{source_id}_{relation_type}_{target_id}"
             
@@ -486,13 +314,13 @@ class GraphIndexingModule:
             if not source_entity or not target_entity:
                 continue
             
-            # 创建索引键列表（包含关系类型和实体名称）
-            index_keys = [
-                relation_type,
-                f"{source_entity.entity_name}_{relation_type}",
-                f"{relation_type}_{target_entity.entity_name}",
-                f"{source_entity.entity_name}_{target_entity.entity_name}"
-            ]
+            # 创建索引键元组（包含关系类型和实体名称），键字符串驻留
+            index_keys = (
+                sys.intern(relation_type),
+                sys.intern(f"{source_entity.entity_name}_{relation_type}"),
+                sys.intern(f"{relation_type}_{target_entity.entity_name}"),
+                sys.intern(f"{source_entity.entity_name}_{target_entity.entity_name}")
+            )
             
             # 创建关系描述内容
             value_content = f"{source_entity.entity_name} {relation_type} {target_entity.entity_name}"
@@ -520,7 +348,7 @@ class GraphIndexingModule:
             for key in index_keys:
                 self.key_to_relations[key].append(relation_id)
         
-        logger.info(f"关系键值对创建完成，共创建 {len(self.relation_kv_store)} 个关系")
+        logger.info(f"关系键值对创建完成，处理 {relation_count} 条关系，共创建 {len(self.relation_kv_store)} 个关系")
         return self.relation_kv_store
 
     def deduplicate_entities_and_relations(self):
@@ -547,6 +375,29 @@ class GraphIndexingModule:
         
         logger.info(f"去重完成，删除了 {duplicates} 个重复实体")
 
+    def export_value_contents_arrow(self) -> Optional[Any]:
+        """
+        将实体键值对的详细描述导出为Arrow表
+        value_content列为LargeString类型，所有文本存放在同一块连续缓冲区中，
+        可直接零拷贝写入Parquet等Arrow原生存储
+
+        Returns:
+            包含 entity_id / entity_type / value_content 三列的 pyarrow.Table，
+            未安装pyarrow时返回None
+        """
+        if pa is None:
+            logger.warning("未安装pyarrow，跳过Arrow导出")
+            return None
+
+        entity_ids = list(self.entity_kv_store.keys())
+        entities = self.entity_kv_store.values()
+
+        return pa.table({
+            "entity_id": pa.array(entity_ids, type=pa.string()),
+            "entity_type": pa.array([entity.entity_type for entity in entities], type=pa.string()),
+            "value_content": pa.array([entity.value_content for entity in entities], type=pa.large_string())
+        })
+
     def get_statistics(self) -> Dict[str, int]:
         """
         获取图索引统计信息
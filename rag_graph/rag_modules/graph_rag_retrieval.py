@@ -3,18 +3,385 @@
 基于图结构的知识推理和检索，而非简单的关键词匹配
 """
 
+import heapq
+import itertools
 import json
 import logging
-from collections import defaultdict, deque
-from typing import List, Dict, Tuple, Any, Optional, Set
-from dataclasses import dataclass
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, defaultdict, deque
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Tuple, Any, Iterable, Iterator, Optional, Set, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+import numpy as np
 from langchain_core.documents import Document
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, READ_ACCESS, WRITE_ACCESS
+
+# scipy为可选依赖，仅用于实体关系的稀疏矩阵快速路径
+try:
+    from scipy.sparse import csc_matrix
+except ImportError:
+    csc_matrix = None
 
 logger = logging.getLogger(__name__)
 
+# 参与名称检索的实体标签
+ENTITY_LABELS = ("City", "Region", "SubRegion", "Attraction", "Food",
+                 "Restaurant", "Hotel", "Festival", "Specialty")
+
+# 实体名称全文索引
+FULLTEXT_NAME_INDEX = "entityNameIdx"
+
+# 种子节点查找：全文索引短语匹配 + id精确匹配
+# 名称中的反斜杠和双引号需要转义后再拼成Lucene短语查询
+_FULLTEXT_SEED_TEMPLATE = r"""
+    CALL {
+        WITH %(name)s
+        CALL db.index.fulltext.queryNodes('%(index)s', '"' + replace(replace(%(name)s, '\\', '\\\\'), '"', '\\"') + '"')
+        YIELD node
+        RETURN node AS %(node)s
+        UNION
+        WITH %(name)s
+        MATCH (node:%(labels)s)
+        WHERE node.id = %(name)s
+        RETURN node AS %(node)s
+    }
+"""
+
+# 全文索引不可用时的降级方案：在实体标签范围内逐节点CONTAINS扫描
+_CONTAINS_SEED_TEMPLATE = """
+    MATCH (%(node)s:%(labels)s)
+    WHERE %(node)s.name CONTAINS %(name)s OR %(node)s.id = %(name)s
+"""
+
+# 全文索引不可用时的首选方案：名称在Python端预先解析为elementId，服务端按ID直接定位节点
+# $seed_element_ids 为 名称 -> elementId列表 的映射
+_RESOLVED_SEED_TEMPLATE = """
+    MATCH (%(node)s)
+    WHERE elementId(%(node)s) IN $seed_element_ids[%(name)s]
+"""
+
+# Python端名称表的刷新周期（秒）和最大实体数
+SEED_NAME_INDEX_TTL = 600
+SEED_NAME_INDEX_MAX_ENTITIES = 200000
+# 名称子串索引中按名称缓存的解析结果数
+NAME_INDEX_CACHE_SIZE = 4096
+
+_SEED_NAME_INDEX_CYPHER = """
+    MATCH (n:%(labels)s)
+    RETURN n.name as name, n.id as node_id, elementId(n) as element_id
+    LIMIT %(limit)d
+"""
+
+# 路径结果在服务端组装成基础类型映射，驱动端无需再逐个包装Node/Relationship
+# 只投影下游用到的 id/name/labels 和关系类型，不再序列化节点和关系的全部属性
+# element_id 为节点的数据库标识，业务id缺失时仍能区分不同节点（用于路径端点去重）
+_PATH_NODES_PROJECTION = (
+    "[path_node IN %s | {id: coalesce(path_node.id, path_node.nodeId, ''), "
+    "element_id: elementId(path_node), "
+    "name: coalesce(path_node.name, ''), labels: labels(path_node)}]"
+)
+_PATH_RELS_PROJECTION = "[path_rel IN %s | {type: type(path_rel)}]"
+
+# 变长匹配深度无法参数化，按这些深度预编译查询字符串，其余变量一律走参数
+CYPHER_DEPTHS = (1, 2, 3)
+
+# 多跳遍历查询模板（%(seed)s: 种子查找片段, %(depth)d: 最大跳数）
+# 多跳路径的轻量评分：只用路径长度和关系类型，度数加权在Python端按实体缓存查表重排
+_MULTI_HOP_SCORING = """
+    WITH length(path) as path_len,
+         relationships(path) as rels,
+         nodes(path) as path_nodes
+    WITH path_len, rels, path_nodes,
+         (1.0 / path_len) +
+         (CASE WHEN size($relation_types) > 0 AND ANY(r IN rels WHERE type(r) IN $relation_types)
+               THEN 0.3 ELSE 0.0 END) as relevance
+
+    ORDER BY relevance DESC
+    LIMIT 20
+
+    RETURN %(path_nodes)s as path_nodes,
+           %(rels)s as rels,
+           path_len, relevance
+"""
+
+_MULTI_HOP_CYPHER_TEMPLATE = """
+    // 多跳推理查询
+    UNWIND $source_entities as source_name
+    %(seed)s
+
+    // 执行多跳遍历
+    MATCH path = (source)-[*1..%(depth)d]-(target)
+    WHERE NOT source = target
+      AND (size($target_labels) = 0 OR ANY(label IN labels(target) WHERE label IN $target_labels))
+""" + _MULTI_HOP_SCORING
+
+# APOC可用时的多跳查询：有界展开，最多产出 $path_cap 条路径，深度作为参数传入
+_APOC_MULTI_HOP_CYPHER_TEMPLATE = """
+    // 多跳推理查询（APOC有界展开）
+    UNWIND $source_entities as source_name
+    %(seed)s
+
+    CALL apoc.path.expandConfig(source, {
+        minLevel: 1,
+        maxLevel: $max_depth,
+        limit: $path_cap,
+        uniqueness: 'NODE_GLOBAL',
+        labelFilter: $label_filter
+    }) YIELD path
+""" + _MULTI_HOP_SCORING
+
+# 多跳展开的默认路径上限，可通过 GraphQuery.constraints["path_cap"] 覆盖
+DEFAULT_PATH_EXPAND_CAP = 200
+
+# 查询意图理解：每次LLM请求合并的查询数，以及每个查询预留的输出token数（总量再受配置上限约束）
+INTENT_BATCH_SIZE = 4
+INTENT_TOKENS_PER_QUERY = 1000
+
+# 子图提取查询模板（简化版，不依赖APOC）
+_SUBGRAPH_CYPHER_TEMPLATE = """
+    // 找到源实体
+    UNWIND $source_entities as entity_name
+    %(seed)s
+
+    // 获取指定深度的邻居
+    MATCH (source)-[r*1..%(depth)d]-(neighbor)
+
+    // 枢纽惩罚：剪掉 log(1+度数) 过高的泛化枢纽节点，种子实体和保留标签不受影响
+    WITH source, neighbor, r, COUNT { (neighbor)--() } as degree
+    WHERE log(1 + degree) < $hub_rho
+       OR neighbor.name IN $source_entities
+       OR neighbor.id IN $source_entities
+       OR ANY(label IN labels(neighbor) WHERE label IN $preserve_labels)
+    WITH source, collect(DISTINCT neighbor) as neighbors,
+         collect(DISTINCT r) as relationships
+    WHERE size(neighbors) <= $max_nodes
+
+    // 计算图指标
+    WITH source, neighbors, relationships,
+         size(neighbors) as node_count,
+         size(relationships) as rel_count
+
+    // 节点和关系直接投影为属性映射，变长关系列表在服务端展开
+    RETURN
+        source {.*, labels: labels(source)} as source,
+        [n IN neighbors[0..$max_nodes] | n {.*, labels: labels(n)}] as nodes,
+        reduce(acc = [], rs IN relationships[0..$max_nodes] |
+               acc + [rel IN rs | rel {.*, type: type(rel)}]) as rels,
+        {
+            node_count: node_count,
+            relationship_count: rel_count,
+            density: CASE WHEN node_count > 1 THEN toFloat(rel_count) / (node_count * (node_count - 1) / 2) ELSE 0.0 END
+        } as metrics
+"""
+
+# 旅游场景的实体关系查询模板
+_ENTITY_RELATION_CYPHER_TEMPLATE = """
+    UNWIND $source_entities as source_name
+    %(seed)s
+
+    // 查找直接关系
+    MATCH (source)-[r]-(target)
+    WHERE target.name IS NOT NULL
+
+    // 关系权重按类型查参数映射（RELATION_TYPE_WEIGHTS），未列出的类型取默认权重
+    WITH source, target, r,
+         coalesce($relation_weights[type(r)], $default_relation_weight) as weight
+
+    ORDER BY weight DESC
+    LIMIT 15
+
+    // 只返回用到的标量字段，驱动端不再构造节点/关系对象
+    RETURN coalesce(source.id, source.nodeId, '') as source_id, coalesce(source.name, '') as source_name,
+           labels(source) as source_labels,
+           coalesce(target.id, target.nodeId, '') as target_id, coalesce(target.name, '') as target_name,
+           labels(target) as target_labels,
+           type(r) as rel_type, weight as relevance
+"""
+
+# 实体关系查询的返回列（result.values 按此顺序取值）
+_ENTITY_RELATION_COLUMNS = (
+    "source_id", "source_name", "source_labels",
+    "target_id", "target_name", "target_labels",
+    "rel_type", "relevance"
+)
+
+# 实体关系权重（Cypher查询和内存矩阵共用），未列出的关系类型取默认权重
+RELATION_TYPE_WEIGHTS = {
+    'NEARBY': 0.9,
+    'HAS_ATTRACTION': 0.8,
+    'HAS_FOOD': 0.7,
+    'HAS_SPECIALTY': 0.6
+}
+DEFAULT_RELATION_WEIGHT = 0.5
+ENTITY_RELATION_LIMIT = 15
+
+# 关系总数不超过该值时在内存中构建稀疏关联矩阵，实体关系查询不再访问Neo4j
+RELATION_MATRIX_MAX_EDGES = 500000
+
+_RELATION_MATRIX_NODES_CYPHER = """
+    MATCH (n)
+    WHERE n.name IS NOT NULL OR n.id IS NOT NULL
+    RETURN elementId(n) as element_id, coalesce(n.id, n.nodeId, '') as node_id,
+           n.name as name, labels(n) as node_labels
+"""
+
+_RELATION_MATRIX_EDGES_CYPHER = """
+    MATCH (s)-[r]->(o)
+    RETURN elementId(s) as subject_id, type(r) as rel_type, elementId(o) as object_id
+"""
+
+# 最短路径的最大跳数和每对源-目标名称保留的路径数
+SHORTEST_PATH_MAX_HOPS = 4
+SHORTEST_PATH_LIMIT = 10
+
+# 最短路径节点类型得分（只读），节点有多个标签时取最高分，未列出的标签计0.5
+NODE_LABEL_SCORES = MappingProxyType({
+    'City': 1.0,
+    'Attraction': 0.9,
+    'Food': 0.8,
+    'Restaurant': 0.8,
+    'Hotel': 0.7,
+    'Region': 0.6,
+    'SubRegion': 0.6
+})
+DEFAULT_NODE_LABEL_SCORE = 0.5
+
+# 旅游场景的最短路径查询模板（按源-目标名称对查询，结果按名称对分别缓存）
+_SHORTEST_PATH_CYPHER_TEMPLATE = """
+    // 按调用方给出的名称对逐对匹配，不再展开 源×目标 的笛卡尔积
+    UNWIND $pairs as pair
+    WITH pair.s as source_name, pair.t as target_name
+    %(seed)s
+    %(target_seed)s
+
+    // 使用最短路径算法
+    MATCH path = shortestPath((source)-[*1..%(max_hops)d]-(target))
+    WHERE source <> target
+
+    // 路径得分在Python端按节点类型计算
+    RETURN source_name, target_name,
+           %(path_nodes)s as path_nodes,
+           %(rels)s as rels,
+           length(path) as path_len
+"""
+
+# GDS投影名称及最短路径所需的过程
+GDS_GRAPH_NAME = "travelEntityGraph"
+GDS_REQUIRED_PROCEDURES = frozenset({
+    "gds.graph.drop", "gds.graph.project", "gds.shortestPath.yens.stream"
+})
+GDS_YENS_K = 3
+
+# GDS可用时的最短路径查询模板：在内存投影上按Yen算法取前k条最短路径，再映射回真实关系
+_GDS_SHORTEST_PATH_CYPHER_TEMPLATE = """
+    UNWIND $pairs as pair
+    WITH pair.s as source_name, pair.t as target_name
+    %(seed)s
+    %(target_seed)s
+    WITH source_name, target_name, source, target
+    WHERE source <> target
+
+    CALL gds.shortestPath.yens.stream($graph_name, {sourceNode: source, targetNode: target, k: $k})
+    YIELD nodeIds
+    WITH source_name, target_name, gds.util.asNodes(nodeIds) as yen_nodes
+
+    // 投影路径上的关系是虚拟关系，逐跳找回图中真实的关系
+    CALL {
+        WITH yen_nodes
+        UNWIND range(0, size(yen_nodes) - 2) as hop
+        WITH hop, yen_nodes[hop] as hop_start, yen_nodes[hop + 1] as hop_end
+        MATCH (hop_start)-[hop_rel]-(hop_end)
+        WITH hop, head(collect(hop_rel)) as first_rel
+        ORDER BY hop
+        RETURN collect(first_rel) as yen_rels
+    }
+
+    RETURN source_name, target_name,
+           %(path_nodes)s as path_nodes,
+           %(rels)s as rels,
+           size(yen_rels) as path_len
+"""
+
+# 子图枢纽惩罚不剪枝的节点标签（地理层级节点天然度数高，但对推理必不可少）
+HUB_PRESERVE_LABELS = ("City", "Region", "SubRegion")
+
+# 推理模式触发条件（按输出顺序）：(推理模式, 触发节点标签, 触发关系类型)，命中任一即启用
+REASONING_PATTERN_TRIGGERS = (
+    ("地理位置推理", frozenset({'City', 'Region'}), frozenset()),
+    ("旅游景点相关性推理", frozenset({'Attraction'}), frozenset()),
+    ("旅游配套服务推理", frozenset(), frozenset({'HAS_ATTRACTION', 'HAS_FOOD', 'HAS_HOTEL'})),
+    ("空间邻近性推理", frozenset(), frozenset({'NEARBY'})),
+    ("美食文化推理", frozenset({'Food', 'Restaurant'}), frozenset()),
+    ("住宿便利性推理", frozenset({'Hotel'}), frozenset()),
+    ("节庆时间推理", frozenset({'Festival'}), frozenset()),
+)
+
+# 推理链验证使用的旅游关键词集合
+TOURISM_KEYWORDS = frozenset({
+    '旅游', '景点', '酒店', '美食', '餐厅', '交通', '路线',
+    '门票', '开放时间', '地址', '推荐', '攻略', '体验',
+    '文化', '历史', '自然', '风光', '住宿', '购物'
+})
+
+# 一次扫描找出文本中出现的全部旅游关键词（前瞻匹配，允许关键词重叠）
+_TOURISM_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(TOURISM_KEYWORDS, key=len, reverse=True))) + "))"
+)
+
+# 关键词 -> 指示向量中的列号
+_TOURISM_KEYWORD_INDEX = {keyword: i for i, keyword in enumerate(sorted(TOURISM_KEYWORDS))}
+
+def _compact_cypher(query: str) -> str:
+    """去掉缩进、空行和整行注释，预编译时调用一次，发送的查询文本更短且逐字节稳定"""
+    lines = (line.strip() for line in query.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+@lru_cache(maxsize=256)
+def _relation_arrow(rel_type: str) -> str:
+    """关系箭头片段，关系类型种类有限，缓存后各路径共享同一字符串"""
+    return f" --{rel_type}--> "
+
+
+@lru_cache(maxsize=256)
+def _node_label_score(labels: Tuple[str, ...]) -> float:
+    """节点标签组合的类型得分，标签组合种类有限，缓存后每种组合只计算一次"""
+    return max((NODE_LABEL_SCORES.get(label, DEFAULT_NODE_LABEL_SCORE) for label in labels),
+               default=DEFAULT_NODE_LABEL_SCORE)
+
+
+def _execute_read(session, query: str, params: Dict[str, Any], columns: Tuple[str, ...] = ()) -> List[Any]:
+    """
+    在读事务函数中执行查询并一次取回全部结果，驱动按读事务路由并自动重试瞬时错误
+    给出columns时按列顺序返回值元组，否则返回记录列表
+    """
+    def work(tx):
+        result = tx.run(query, params)
+        return result.values(*columns) if columns else list(result)
+
+    return session.execute_read(work)
+
+
+def _path_relevance(path: "GraphPath") -> float:
+    """路径排序键"""
+    return path.relevance_score
+
+
+def _iter_path_segments(path: "GraphPath") -> Iterator[str]:
+    """按 节点名、关系箭头 交替产出路径描述片段"""
+    relationships = path.relationships[:len(path.nodes)]
+    for i, (node, rel) in enumerate(itertools.zip_longest(path.nodes, relationships)):
+        yield node.get("name", f"节点{i}")
+        if rel is not None:
+            yield _relation_arrow(rel.get("type", "相关"))
+
+
 class QueryType(Enum):
     """查询类型枚举"""
     ENTITY_RELATION = "entity_relation"  # 实体关系查询：A和B有什么关系？
@@ -34,7 +401,7 @@ class GraphQuery:
     max_nodes: int = 50
     constraints: Dict[str, Any] = None
 
-@dataclass
+@dataclass(slots=True)
 class GraphPath:
     """图路径结构"""
     nodes: List[Dict[str, Any]]
@@ -43,7 +410,173 @@ class GraphPath:
     relevance_score: float
     path_type: str
 
-@dataclass
+class SubstringNameIndex:
+    """
+    实体名称子串索引，查询语义与 `name CONTAINS $q OR id = $q` 一致
+    名称按单字符和相邻二元字符建倒排表：1~2个字符的查询直接取倒排表，
+    更长的查询取其二元字符中最短的倒排表作为候选，再逐个确认子串，不再扫描全部实体。
+    解析结果按名称做LRU缓存，缓存随索引重建一起失效
+    """
+
+    def __init__(self, entries: Iterable[Tuple[Optional[str], Optional[str], Any]]):
+        """entries 为 (名称, id, 载荷) 序列，查询返回命中条目的载荷，按条目顺序排列"""
+        self._names: List[Optional[str]] = []
+        self._payloads: List[Any] = []
+        postings = defaultdict(list)
+        rows_by_id = defaultdict(list)
+        for row, (name, entity_id, payload) in enumerate(entries):
+            self._names.append(name)
+            self._payloads.append(payload)
+            if entity_id is not None:
+                rows_by_id[entity_id].append(row)
+            if name:
+                grams = set(name)
+                grams.update(name[i:i + 2] for i in range(len(name) - 1))
+                for gram in grams:
+                    postings[gram].append(row)
+        self._postings: Dict[str, List[int]] = dict(postings)
+        self._rows_by_id: Dict[str, List[int]] = dict(rows_by_id)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def lookup(self, name: str) -> Tuple[Any, ...]:
+        """返回名称包含name或id等于name的条目载荷"""
+        with self._cache_lock:
+            cached = self._cache.get(name)
+            if cached is not None:
+                self._cache.move_to_end(name)
+                return cached
+
+        payloads = self._payloads
+        result = tuple(payloads[row] for row in self._match_rows(name))
+
+        with self._cache_lock:
+            self._cache[name] = result
+            if len(self._cache) > NAME_INDEX_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _match_rows(self, name: str) -> List[int]:
+        """按倒排表取候选行并确认子串，返回升序行号"""
+        rows = set(self._rows_by_id.get(name, ()))
+        names = self._names
+        if not name:
+            # 空串是任何名称的子串
+            rows.update(row for row, entity_name in enumerate(names) if entity_name is not None)
+        else:
+            grams = [name] if len(name) == 1 else [name[i:i + 2] for i in range(len(name) - 1)]
+            postings = [self._postings.get(gram) for gram in grams]
+            if all(postings):
+                candidates = min(postings, key=len)
+                if len(name) <= 2:
+                    # 单字符/二元字符的倒排表本身就是精确结果
+                    rows.update(candidates)
+                else:
+                    rows.update(row for row in candidates if name in names[row])
+        return sorted(rows)
+
+@dataclass(slots=True)
+class RelationMatrix:
+    """
+    实体关系的稀疏矩阵表示
+    SUB/OBJ 为 边×节点 的CSC关联矩阵：SUB[e, i] = 1 表示边e的起点是节点i，OBJ同理对应终点
+    按列存储，取种子节点所在列即得到其关联边，不必对全部节点做矩阵向量乘
+    """
+    node_ids: List[str]
+    node_names: List[Optional[str]]
+    node_labels: List[List[str]]
+    name_index: SubstringNameIndex
+    named_mask: np.ndarray
+    subjects: np.ndarray
+    objects: np.ndarray
+    rel_types: List[str]
+    weights: np.ndarray
+    sub: Any
+    obj: Any
+
+    @classmethod
+    def build(cls, node_records: List[Tuple], edge_records: List[Tuple]) -> "RelationMatrix":
+        """由 (elementId, id, name, labels) 节点元组和 (起点elementId, 关系类型, 终点elementId) 边元组构建"""
+        row_by_element = {}
+        node_ids, node_names, node_labels = [], [], []
+        for element_id, node_id, name, labels in node_records:
+            row_by_element[element_id] = len(node_ids)
+            node_ids.append(node_id)
+            node_names.append(name)
+            node_labels.append(labels)
+
+        # 端点不在节点表中的边（无名称且无id的节点）直接丢弃
+        subjects, objects, rel_types = [], [], []
+        for subject_id, rel_type, object_id in edge_records:
+            subject_row = row_by_element.get(subject_id)
+            object_row = row_by_element.get(object_id)
+            if subject_row is None or object_row is None:
+                continue
+            subjects.append(subject_row)
+            objects.append(object_row)
+            rel_types.append(rel_type)
+
+        node_count, edge_count = len(node_ids), len(rel_types)
+        subjects = np.asarray(subjects, dtype=np.int64)
+        objects = np.asarray(objects, dtype=np.int64)
+        edge_rows = np.arange(edge_count)
+        ones = np.ones(edge_count, dtype=np.float32)
+        entity_labels = set(ENTITY_LABELS)
+
+        return cls(
+            node_ids=node_ids,
+            node_names=node_names,
+            node_labels=node_labels,
+            # 实体标签范围内的名称子串索引，载荷为节点行号
+            name_index=SubstringNameIndex(
+                (node_names[row], node_ids[row], row)
+                for row, labels in enumerate(node_labels) if entity_labels.intersection(labels)
+            ),
+            named_mask=np.fromiter((name is not None for name in node_names), dtype=bool, count=node_count),
+            subjects=subjects,
+            objects=objects,
+            rel_types=rel_types,
+            weights=np.fromiter(
+                (RELATION_TYPE_WEIGHTS.get(rel_type, DEFAULT_RELATION_WEIGHT) for rel_type in rel_types),
+                dtype=np.float64, count=edge_count
+            ),
+            sub=csc_matrix((ones, (edge_rows, subjects)), shape=(edge_count, node_count)),
+            obj=csc_matrix((ones, (edge_rows, objects)), shape=(edge_count, node_count))
+        )
+
+    def find_seed_rows(self, names: List[str]) -> np.ndarray:
+        """种子节点查找：实体标签范围内名称包含或id等于给定名称（与CONTAINS降级查询一致），走名称子串索引"""
+        rows = {row for name in dict.fromkeys(names) for row in self.name_index.lookup(name)}
+        return np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+
+    def one_hop(self, seed_rows: np.ndarray, limit: int) -> List[Tuple[int, int, int]]:
+        """
+        种子节点的无向一跳邻接
+        SUB/OBJ 中种子节点所在列分别给出起点、终点为种子的边，按关系权重取前limit条
+        返回 (源节点行, 目标节点行, 边行) 列表
+        """
+        if seed_rows.size == 0 or not self.rel_types:
+            return []
+
+        # 每条边只有一个起点和一个终点，同一矩阵的各列之间没有重复边，排序后即为边行号升序
+        out_edges = np.sort(self.sub[:, seed_rows].indices)
+        in_edges = np.sort(self.obj[:, seed_rows].indices)
+
+        edges = np.concatenate([out_edges, in_edges])
+        sources = np.concatenate([self.subjects[out_edges], self.objects[in_edges]])
+        targets = np.concatenate([self.objects[out_edges], self.subjects[in_edges]])
+
+        # 与查询保持一致：目标节点必须有名称
+        keep = self.named_mask[targets]
+        edges, sources, targets = edges[keep], sources[keep], targets[keep]
+
+        order = np.argsort(-self.weights[edges], kind="stable")[:limit]
+        return list(zip(sources[order].tolist(), targets[order].tolist(), edges[order].tolist()))
+
+@dataclass(slots=True)
 class KnowledgeSubgraph:
     """知识子图结构"""
     central_nodes: List[Dict[str, Any]]
@@ -51,6 +584,9 @@ class KnowledgeSubgraph:
     relationships: List[Dict[str, Any]]
     graph_metrics: Dict[str, float]
     reasoning_chains: List[List[str]]
+    # 按标签/关系类型分组的列式索引，构建时一次遍历生成，供推理链直接查表
+    by_label: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    rel_by_type: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
 
 class GraphRAGRetrieval:
     """
@@ -71,7 +607,44 @@ class GraphRAGRetrieval:
         # 图结构缓存
         self.entity_cache = {}
         self.relation_cache = {}
-        self.subgraph_cache = {}
+        # 实体ID -> 度数，由 entity_cache 派生，多跳重排直接查表
+        self._degree_map: Dict[str, int] = {}
+        # 遍历结果LRU缓存：(结果类别, 查询类型, 源实体, 目标实体, 关系类型, 深度, 节点上限) -> 结果
+        self.subgraph_cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self.subgraph_cache_size = 1024
+        # GDS图投影是否就绪（就绪后最短路径改用投影上的Yen算法）
+        self.gds_projection_ready = False
+        # 实体关系稀疏矩阵（scipy可用且图规模不大时构建），为None时实体关系查询走Cypher
+        self.relation_matrix: Optional[RelationMatrix] = None
+        # 最短路径LRU缓存：(源名称, 目标名称, 最大跳数) -> 路径列表
+        self._shortest_path_cache: "OrderedDict[Tuple[str, str, int], List[GraphPath]]" = OrderedDict()
+        self._shortest_path_cache_size = 4096
+        # 多个查询计划会并发读写缓存
+        self._cache_lock = threading.Lock()
+
+        # 推理模式 -> 推理链构建方法
+        self._reasoning_dispatch = {
+            "地理位置推理": self._build_geographic_reasoning,
+            "旅游景点相关性推理": self._build_attraction_reasoning,
+            "旅游配套服务推理": self._build_service_reasoning,
+            "空间邻近性推理": self._build_spatial_reasoning,
+            "美食文化推理": self._build_food_reasoning,
+            "住宿便利性推理": self._build_accommodation_reasoning,
+            "节庆时间推理": self._build_festival_reasoning
+        }
+
+        # 全文索引是否可用于种子节点查找
+        self.fulltext_seed_enabled = False
+        # 全文索引不可用时的实体名称子串索引（载荷为elementId），为None时降级为CONTAINS扫描
+        self._seed_name_index: Optional[SubstringNameIndex] = None
+        self._seed_name_loaded_at = 0.0
+        # 名称索引过期后只由一个后台线程刷新，查询线程继续使用旧索引
+        self._seed_name_refresh_lock = threading.Lock()
+        # 已安装的APOC/GDS过程（多跳有界展开、页缓存预热、GDS最短路径）
+        self.server_procedures: Set[str] = set()
+
+        # 预编译的查询字符串（种子查找方式变化时重新编译）
+        self._compile_cypher()
         
     def initialize(self):
         """初始化图RAG检索系统"""
@@ -81,10 +654,15 @@ class GraphRAGRetrieval:
         try:
             self.driver = GraphDatabase.driver(
                 self.config.neo4j_uri, 
-                auth=(self.config.neo4j_user, self.config.neo4j_password)
+                auth=(self.config.neo4j_user, self.config.neo4j_password),
+                max_connection_pool_size=self.config.neo4j_max_pool_size,
+                connection_acquisition_timeout=self.config.neo4j_acquisition_timeout,
+                connection_timeout=self.config.neo4j_connection_timeout,
+                max_connection_lifetime=self.config.neo4j_max_connection_lifetime,
+                keep_alive=True
             )
             # 测试连接
-            with self.driver.session() as session:
+            with self._session() as session:
                 session.run("RETURN 1")
             logger.info("Neo4j连接成功")
         except Exception as e:
@@ -99,7 +677,7 @@ class GraphRAGRetrieval:
         logger.info("构建图结构索引...")
         
         try:
-            with self.driver.session() as session:
+            with self._session() as session:
                 # 构建实体索引 - 修复Neo4j语法兼容性问题
                 entity_query = """
                 MATCH (n)
@@ -120,6 +698,9 @@ class GraphRAGRetrieval:
                         "category": record["category"],
                         "degree": record["degree"]
                     }
+                self._degree_map = {
+                    node_id: entity["degree"] for node_id, entity in self.entity_cache.items()
+                }
                 
                 # 构建关系类型索引
                 relation_query = """
@@ -134,21 +715,341 @@ class GraphRAGRetrieval:
                     self.relation_cache[rel_type] = record["frequency"]
                     
                 logger.info(f"索引构建完成: {len(self.entity_cache)}个实体, {len(self.relation_cache)}个关系类型")
+
+            # 一次性拉取全部边构建稀疏关联矩阵，实体关系查询改在内存中完成
+            self._load_relation_matrix()
+
+            # 确保各实体标签的id唯一约束（自带索引），id精确匹配走索引查找
+            self._ensure_id_constraints()
+
+            # 创建名称全文索引，种子节点查找不再逐节点CONTAINS扫描
+            self._ensure_fulltext_index()
+            if not self.fulltext_seed_enabled:
+                self._load_seed_name_index()
+
+            # 探测APOC/GDS过程，准备GDS投影，并按种子查找方式和过程可用性重新编译查询
+            self._load_server_procedures()
+            self._ensure_gds_projection()
+            self._compile_cypher()
+            self._warm_query_plans()
+
+            # 预热页缓存，避免首次遍历时的冷启动IO
+            if self.config.pre_warm:
+                self._warm_up_page_cache()
                 
         except Exception as e:
             logger.error(f"构建图索引失败: {e}")
     
+    def _load_relation_matrix(self):
+        """拉取节点和边构建 SUB/OBJ 稀疏矩阵，scipy不可用或关系过多时保持Cypher查询"""
+        self.relation_matrix = None
+        if csc_matrix is None:
+            return
+
+        edge_total = sum(self.relation_cache.values())
+        if edge_total > RELATION_MATRIX_MAX_EDGES:
+            logger.info(f"关系数 {edge_total} 超过 {RELATION_MATRIX_MAX_EDGES}，实体关系查询使用Cypher")
+            return
+
+        try:
+            with self._session() as session:
+                node_records = session.run(_RELATION_MATRIX_NODES_CYPHER).values(
+                    "element_id", "node_id", "name", "node_labels"
+                )
+                edge_records = session.run(_RELATION_MATRIX_EDGES_CYPHER).values(
+                    "subject_id", "rel_type", "object_id"
+                )
+
+            self.relation_matrix = RelationMatrix.build(node_records, edge_records)
+            logger.info(
+                f"关系矩阵构建完成: {len(self.relation_matrix.node_ids)}个节点, "
+                f"{len(self.relation_matrix.rel_types)}条关系"
+            )
+        except Exception as e:
+            logger.warning(f"关系矩阵构建失败，实体关系查询使用Cypher: {e}")
+
+    def _ensure_id_constraints(self):
+        """为每个实体标签创建id唯一约束，约束名与导入脚本一致，已存在时不做任何操作"""
+        with self._session(WRITE_ACCESS) as session:
+            for label in ENTITY_LABELS:
+                try:
+                    session.run(
+                        f"CREATE CONSTRAINT {label.lower()}_id IF NOT EXISTS "
+                        f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+                    ).consume()
+                except Exception as e:
+                    logger.warning(f"{label}.id 唯一约束创建失败: {e}")
+
+    def _ensure_fulltext_index(self):
+        """创建实体名称全文索引并等待其可用"""
+        try:
+            with self._session(WRITE_ACCESS) as session:
+                session.run(
+                    f"CREATE FULLTEXT INDEX {FULLTEXT_NAME_INDEX} IF NOT EXISTS "
+                    f"FOR (n:{'|'.join(ENTITY_LABELS)}) ON EACH [n.name]"
+                ).consume()
+                session.run(
+                    "CALL db.awaitIndex($index_name, 300)",
+                    {"index_name": FULLTEXT_NAME_INDEX}
+                ).consume()
+
+            self.fulltext_seed_enabled = True
+            logger.info(f"全文索引 {FULLTEXT_NAME_INDEX} 已就绪")
+        except Exception as e:
+            self.fulltext_seed_enabled = False
+            logger.warning(f"全文索引不可用，种子查找降级为Python端名称解析: {e}")
+
+    def _load_seed_name_index(self):
+        """拉取实体名称表并建立子串索引，种子名称在Python端解析为elementId，替代服务端逐节点CONTAINS扫描"""
+        self._seed_name_loaded_at = time.monotonic()
+        try:
+            with self._session() as session:
+                entries = session.run(_SEED_NAME_INDEX_CYPHER % {
+                    "labels": "|".join(ENTITY_LABELS),
+                    "limit": SEED_NAME_INDEX_MAX_ENTITIES + 1
+                }).values("name", "node_id", "element_id")
+        except Exception as e:
+            # 刷新失败时保留旧名称表
+            logger.warning(f"实体名称表加载失败: {e}")
+            return
+
+        if len(entries) > SEED_NAME_INDEX_MAX_ENTITIES:
+            logger.info(f"实体数超过 {SEED_NAME_INDEX_MAX_ENTITIES}，种子查找使用CONTAINS扫描")
+            return
+
+        self._seed_name_index = SubstringNameIndex(entries)
+        logger.info(f"实体名称表加载完成: {len(entries)}个实体")
+
+    def _refresh_seed_name_index(self):
+        """后台刷新实体名称索引，完成后释放刷新锁"""
+        try:
+            self._load_seed_name_index()
+        finally:
+            self._seed_name_refresh_lock.release()
+
+    def _seed_params(self, names: List[str]) -> Dict[str, Any]:
+        """
+        种子查找所需的额外查询参数
+        使用Python端名称索引时，把每个名称解析为 名称包含它或id等于它 的实体elementId（与CONTAINS语义一致）
+        索引过期时交给后台线程刷新，本次查询仍使用当前索引
+        """
+        index = self._seed_name_index
+        if self.fulltext_seed_enabled or index is None:
+            return {}
+
+        if (time.monotonic() - self._seed_name_loaded_at > SEED_NAME_INDEX_TTL
+                and self._seed_name_refresh_lock.acquire(blocking=False)):
+            threading.Thread(target=self._refresh_seed_name_index, name="seed-name-refresh", daemon=True).start()
+
+        return {"seed_element_ids": {name: list(index.lookup(name)) for name in dict.fromkeys(names)}}
+
+    def _load_server_procedures(self):
+        """查询服务端已安装的APOC/GDS过程"""
+        try:
+            with self._session() as session:
+                record = session.run(
+                    "SHOW PROCEDURES YIELD name WHERE name STARTS WITH 'apoc.' OR name STARTS WITH 'gds.' "
+                    "RETURN collect(name) as names"
+                ).single()
+            self.server_procedures = set(record["names"]) if record else set()
+        except Exception as e:
+            self.server_procedures = set()
+            logger.warning(f"APOC/GDS过程探测失败: {e}")
+
+        if "apoc.path.expandConfig" in self.server_procedures:
+            logger.info("检测到APOC，多跳遍历使用有界展开")
+
+    def _ensure_gds_projection(self):
+        """
+        准备GDS内存图投影（实体节点 + 全部关系，无向）
+        投影保存在服务端，生命周期长于本进程：每次先删除已有投影再重新投影，
+        保证最短路径基于当前图数据，而不是之前某次运行留下的快照
+        """
+        self.gds_projection_ready = False
+        if not GDS_REQUIRED_PROCEDURES <= self.server_procedures:
+            return
+
+        try:
+            with self._session() as session:
+                session.run(
+                    "CALL gds.graph.drop($graph_name, false) YIELD graphName RETURN graphName",
+                    {"graph_name": GDS_GRAPH_NAME}
+                ).consume()
+                session.run(
+                    "CALL gds.graph.project($graph_name, $labels, {ALL: {type: '*', orientation: 'UNDIRECTED'}})",
+                    {"graph_name": GDS_GRAPH_NAME, "labels": list(ENTITY_LABELS)}
+                ).consume()
+
+            self.gds_projection_ready = True
+            logger.info(f"GDS图投影 {GDS_GRAPH_NAME} 已就绪，最短路径使用Yen算法")
+        except Exception as e:
+            logger.warning(f"GDS图投影失败，最短路径使用Cypher shortestPath: {e}")
+
+    def _warm_query_plans(self):
+        """
+        用 EXPLAIN 预先规划所有预编译查询，只规划不执行，consume() 后执行计划留在服务端缓存
+        参数取与真实调用同类型的占位值
+        """
+        placeholder_params = {
+            "source_entities": [""],
+            "target_labels": [],
+            "relation_types": [],
+            "max_depth": 1,
+            "path_cap": DEFAULT_PATH_EXPAND_CAP,
+            "label_filter": "",
+            "max_nodes": 1,
+            "hub_rho": 1.0,
+            "preserve_labels": [],
+            "pairs": [],
+            "graph_name": GDS_GRAPH_NAME,
+            "k": GDS_YENS_K,
+            "seed_element_ids": {},
+            "relation_weights": RELATION_TYPE_WEIGHTS,
+            "default_relation_weight": DEFAULT_RELATION_WEIGHT
+        }
+        queries = {
+            *self._multi_hop_cypher_by_depth.values(),
+            *self._subgraph_cypher_by_depth.values(),
+            self._entity_relation_cypher,
+            self._shortest_path_cypher
+        }
+
+        try:
+            with self._session() as session:
+                for query in queries:
+                    session.run(f"EXPLAIN {query}", placeholder_params).consume()
+            logger.info(f"已预热 {len(queries)} 条查询的执行计划")
+        except Exception as e:
+            logger.warning(f"查询计划预热失败: {e}")
+
+    def _warm_up_page_cache(self):
+        """
+        预热Neo4j页缓存
+        优先使用APOC的warmup过程，不可用时扫描一遍节点和关系属性，强制把数据页读入缓存
+        """
+        start_time = time.perf_counter()
+
+        try:
+            with self._session() as session:
+                if "apoc.warmup.run" in self.server_procedures:
+                    session.run("CALL apoc.warmup.run(true, true, true)").consume()
+                    method = "apoc.warmup.run"
+                else:
+                    session.run("MATCH (n) RETURN count(n.name) + count(labels(n)) as touched").consume()
+                    session.run("MATCH ()-[r]->() RETURN count(properties(r)) as touched").consume()
+                    method = "全量扫描"
+
+            logger.info(f"页缓存预热完成（{method}），耗时 {time.perf_counter() - start_time:.2f}s")
+        except Exception as e:
+            logger.warning(f"页缓存预热失败，跳过: {e}")
+
+    def _session(self, access_mode: str = READ_ACCESS):
+        """创建指向目标数据库的会话，省去每次的默认数据库路由查询"""
+        return self.driver.session(
+            database=self.config.neo4j_database,
+            default_access_mode=access_mode,
+            fetch_size=self.config.neo4j_fetch_size
+        )
+
+    def _compile_cypher(self):
+        """
+        预编译遍历查询字符串
+        变长匹配深度按 CYPHER_DEPTHS 各生成一份，同一深度始终复用同一字符串，便于驱动和服务端缓存执行计划
+        """
+        seed = self._seed_match("source_name", "source")
+        path_projections = {
+            "path_nodes": _PATH_NODES_PROJECTION % "path_nodes",
+            "rels": _PATH_RELS_PROJECTION % "rels"
+        }
+
+        if "apoc.path.expandConfig" in self.server_procedures:
+            # APOC展开的深度是参数，所有深度共用同一条查询
+            apoc_query = _compact_cypher(_APOC_MULTI_HOP_CYPHER_TEMPLATE % {"seed": seed, **path_projections})
+            self._multi_hop_cypher_by_depth = {depth: apoc_query for depth in CYPHER_DEPTHS}
+        else:
+            self._multi_hop_cypher_by_depth = {
+                depth: _compact_cypher(_MULTI_HOP_CYPHER_TEMPLATE % {"seed": seed, "depth": depth, **path_projections})
+                for depth in CYPHER_DEPTHS
+            }
+        self._subgraph_cypher_by_depth = {
+            depth: _compact_cypher(_SUBGRAPH_CYPHER_TEMPLATE % {
+                "seed": self._seed_match("entity_name", "source"),
+                "depth": depth
+            })
+            for depth in CYPHER_DEPTHS
+        }
+        self._entity_relation_cypher = _compact_cypher(_ENTITY_RELATION_CYPHER_TEMPLATE % {"seed": seed})
+        if self.gds_projection_ready:
+            self._shortest_path_cypher = _compact_cypher(_GDS_SHORTEST_PATH_CYPHER_TEMPLATE % {
+                "seed": seed,
+                "target_seed": self._seed_match("target_name", "target"),
+                "path_nodes": _PATH_NODES_PROJECTION % "yen_nodes",
+                "rels": _PATH_RELS_PROJECTION % "yen_rels"
+            })
+        else:
+            self._shortest_path_cypher = _compact_cypher(_SHORTEST_PATH_CYPHER_TEMPLATE % {
+                "seed": seed,
+                "target_seed": self._seed_match("target_name", "target"),
+                "max_hops": SHORTEST_PATH_MAX_HOPS,
+                "path_nodes": _PATH_NODES_PROJECTION % "nodes(path)",
+                "rels": _PATH_RELS_PROJECTION % "relationships(path)"
+            })
+
+    @staticmethod
+    def _cypher_for_depth(cypher_by_depth: Dict[int, str], depth: int) -> str:
+        """按遍历深度取预编译查询，超出范围的深度截断到最近的预编译深度"""
+        return cypher_by_depth[min(max(depth, CYPHER_DEPTHS[0]), CYPHER_DEPTHS[-1])]
+
+    def _seed_match(self, name_var: str, node_var: str) -> str:
+        """
+        生成种子节点查找的Cypher片段
+        全文索引可用时走索引，否则优先按Python端解析出的elementId定位，最后降级为CONTAINS扫描
+        """
+        if self.fulltext_seed_enabled:
+            template = _FULLTEXT_SEED_TEMPLATE
+        elif self._seed_name_index is not None:
+            template = _RESOLVED_SEED_TEMPLATE
+        else:
+            template = _CONTAINS_SEED_TEMPLATE
+        return template % {
+            "name": name_var,
+            "node": node_var,
+            "index": FULLTEXT_NAME_INDEX,
+            "labels": "|".join(ENTITY_LABELS)
+        }
+
     def understand_graph_query(self, query: str) -> GraphQuery:
         """
         理解查询的图结构意图
         这是图RAG的核心：从自然语言到图查询的转换
         """
+        return self.understand_graph_queries([query])[0]
+
+    def understand_graph_queries(self, queries: List[str]) -> List[GraphQuery]:
+        """
+        批量理解查询的图结构意图
+        查询按 INTENT_BATCH_SIZE 分组，每组合并为一次LLM请求，返回与输入顺序一致的GraphQuery列表；
+        某组请求失败只降级该组的查询
+        """
+        graph_queries = []
+        for start in range(0, len(queries), INTENT_BATCH_SIZE):
+            graph_queries.extend(self._understand_query_group(queries[start:start + INTENT_BATCH_SIZE]))
+        return graph_queries
+
+    def _understand_query_group(self, queries: List[str]) -> List[GraphQuery]:
+        """一次LLM请求理解一组查询的图结构意图，输出token数按查询数预留并受配置上限约束"""
+        if not queries:
+            return []
+
+        numbered_queries = "\n".join(f"{i + 1}. {query}" for i, query in enumerate(queries))
+
         prompt = f"""
-        作为图数据库专家，分析以下查询的图结构意图：
+        作为图数据库专家，分析以下每个查询的图结构意图：
         
-        查询：{query}
+        查询列表：
+        {numbered_queries}
         
-        请识别：
+        对每个查询请识别：
         1. 查询类型：
            - entity_relation: 询问实体间的直接关系（如：鸡肉和胡萝卜能一起做菜吗？）
            - multi_hop: 需要多跳推理（如：鸡肉配什么蔬菜？需要：鸡肉→菜品→食材→蔬菜）
@@ -165,15 +1066,17 @@ class GraphRAGRetrieval:
         查询："鸡肉配什么蔬菜好？"
         分析：这是multi_hop查询，需要通过"鸡肉→使用鸡肉的菜品→这些菜品使用的蔬菜"的路径推理
         
-        返回JSON格式：
-        {{
-            "query_type": "multi_hop",
-            "source_entities": ["鸡肉"],
-            "target_entities": ["蔬菜类食材"],
-            "relation_types": ["REQUIRES", "BELONGS_TO_CATEGORY"],
-            "max_depth": 3,
-            "reasoning": "需要多跳推理：鸡肉→菜品→食材→蔬菜"
-        }}
+        按查询编号顺序返回JSON数组，数组长度与查询数量一致，不要包含多余的文字：
+        [
+            {{
+                "query_type": "multi_hop",
+                "source_entities": ["鸡肉"],
+                "target_entities": ["蔬菜类食材"],
+                "relation_types": ["REQUIRES", "BELONGS_TO_CATEGORY"],
+                "max_depth": 3,
+                "reasoning": "需要多跳推理：鸡肉→菜品→食材→蔬菜"
+            }}
+        ]
         """
         
         try:
@@ -181,28 +1084,59 @@ class GraphRAGRetrieval:
                 model=self.config.llm_model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
-                max_tokens=1000
+                max_tokens=min(INTENT_TOKENS_PER_QUERY * len(queries), self.config.intent_max_tokens)
             )
             
-            result = json.loads(response.choices[0].message.content.strip())
-            
-            return GraphQuery(
-                query_type=QueryType(result.get("query_type", "subgraph")),
-                source_entities=result.get("source_entities", []),
-                target_entities=result.get("target_entities", []),
-                relation_types=result.get("relation_types", []),
-                max_depth=result.get("max_depth", 2),
-                max_nodes=50
-            )
+            content = response.choices[0].message.content
+            if not content:
+                raise ValueError("LLM 返回空响应")
+
+            content = content.strip()
+
+            # 清理 markdown 代码块
+            if content.startswith("```"):
+                lines = content.split("\n")
+                if lines[0].startswith("```"):
+                    lines = lines[1:]
+                if lines and lines[-1].strip() == "```":
+                    lines = lines[:-1]
+                content = "\n".join(lines).strip()
+
+            results = json.loads(content)
+            if isinstance(results, dict):
+                results = [results]
+            if not isinstance(results, list) or len(results) != len(queries):
+                raise ValueError(f"返回的意图数量与查询数量不一致: {len(queries)}")
+
+            graph_queries = []
+            for query, result in zip(queries, results):
+                try:
+                    graph_queries.append(GraphQuery(
+                        query_type=QueryType(result.get("query_type", "subgraph")),
+                        source_entities=result.get("source_entities", []),
+                        target_entities=result.get("target_entities", []),
+                        relation_types=sorted(set(result.get("relation_types") or [])),
+                        max_depth=result.get("max_depth", 2),
+                        max_nodes=50
+                    ))
+                except Exception as e:
+                    logger.error(f"查询意图解析失败: {query}, {e}")
+                    graph_queries.append(self._fallback_graph_query(query))
+
+            return graph_queries
             
         except Exception as e:
             logger.error(f"查询意图理解失败: {e}")
             # 降级方案：默认子图查询
-            return GraphQuery(
-                query_type=QueryType.SUBGRAPH,
-                source_entities=[query],
-                max_depth=2
-            )
+            return [self._fallback_graph_query(query) for query in queries]
+
+    def _fallback_graph_query(self, query: str) -> GraphQuery:
+        """意图理解失败时的降级查询：默认子图查询"""
+        return GraphQuery(
+            query_type=QueryType.SUBGRAPH,
+            source_entities=[query],
+            max_depth=2
+        )
     
     def multi_hop_traversal(self, graph_query: GraphQuery) -> List[GraphPath]:
         """
@@ -216,67 +1150,68 @@ class GraphRAGRetrieval:
         if not self.driver:
             logger.error("Neo4j连接未建立")
             return paths
+
+        cache_key = self._traversal_cache_key("paths", graph_query)
+        cached_paths = self._get_cached_traversal(cache_key)
+        if cached_paths is not None:
+            logger.info(f"多跳遍历命中缓存，共 {len(cached_paths)} 条路径")
+            return list(cached_paths)
             
         try:
-            with self.driver.session() as session:
-                # 构建多跳遍历查询
-                source_entities = graph_query.source_entities
-                target_entities = graph_query.target_entities or []
-                max_depth = graph_query.max_depth
-                
+            with self._session() as session:
                 # 根据查询类型选择不同的遍历策略
-                if graph_query.query_type == QueryType.MULTI_HOP:
-                    cypher_query = f"""
-                    // 多跳推理查询
-                    UNWIND $source_entities as source_name
-                    MATCH (source)
-                    WHERE source.name CONTAINS source_name OR source.id = source_name
-
-                    // 执行多跳遍历
-                    MATCH path = (source)-[*1..{max_depth}]-(target)
-                    WHERE NOT source = target
-                    {"AND ANY(label IN labels(target) WHERE label IN $target_labels)" if target_entities else ""}
-
-                    // 计算路径相关性
-                    WITH path, source, target,
-                         length(path) as path_len,
-                         relationships(path) as rels,
-                         nodes(path) as path_nodes
-
-                    // 路径评分：短路径 + 高度数节点 + 关系类型匹配
-                    WITH path, source, target, path_len, rels, path_nodes,
-                         (1.0 / path_len) +
-                         (REDUCE(s = 0.0, n IN path_nodes | s + COUNT { (n)--() }) / 10.0 / size(path_nodes)) +
-                         (CASE WHEN ANY(r IN rels WHERE type(r) IN $relation_types) THEN 0.3 ELSE 0.0 END) as relevance
-
-                    ORDER BY relevance DESC
-                    LIMIT 20
-
-                    RETURN path, source, target, path_len, rels, path_nodes, relevance
-                    """
-                    
-                    result = session.run(cypher_query, {
-                        "source_entities": source_entities,
-                        "target_labels": target_entities,
-                        "relation_types": graph_query.relation_types or []
-                    })
-                    
-                    for record in result:
-                        path_data = self._parse_neo4j_path(record)
-                        if path_data:
-                            paths.append(path_data)
-                
-                elif graph_query.query_type == QueryType.ENTITY_RELATION:
+                # 所有分支都返回统一的 path_nodes / rels / path_len / relevance 列，
+                # 每次调用只发出一条Cypher，并复用同一套路径解析逻辑
+                if graph_query.query_type == QueryType.ENTITY_RELATION:
                     # 实体间关系查询
                     paths.extend(self._find_entity_relations(graph_query, session))
                 
                 elif graph_query.query_type == QueryType.PATH_FINDING:
                     # 最短路径查找
                     paths.extend(self._find_shortest_paths(graph_query, session))
+
+                else:
+                    # 多跳推理查询（其余查询类型同样走多跳遍历）
+                    cypher_query = self._cypher_for_depth(self._multi_hop_cypher_by_depth, graph_query.max_depth)
+                    
+                    target_labels = graph_query.target_entities or []
+                    records = _execute_read(session, cypher_query, {
+                        "source_entities": graph_query.source_entities,
+                        "target_labels": target_labels,
+                        "relation_types": graph_query.relation_types or [],
+                        "max_depth": graph_query.max_depth,
+                        "path_cap": self._path_expand_cap(graph_query),
+                        # APOC终点标签过滤：>Label 表示只返回以该标签结尾的路径
+                        "label_filter": "|".join(f">{label}" for label in target_labels) or None,
+                        **self._seed_params(graph_query.source_entities)
+                    })
+                    
+                    # 二阶段重排：叠加节点度数加权后按最终得分排序
+                    ranked_paths = []
+                    for record in records:
+                        path_data = self._parse_neo4j_path(record)
+                        if path_data:
+                            path_data.relevance_score += self._degree_boost(path_data)
+                            ranked_paths.append(path_data)
+                    ranked_paths.sort(key=lambda p: p.relevance_score, reverse=True)
+
+                    # 端点对去重：按最终得分，同一对端点节点（不分方向）只保留最优路径
+                    seen_pairs: Set[Tuple[str, str]] = set()
+                    for path in ranked_paths:
+                        source_id, target_id = path.nodes[0]["element_id"], path.nodes[-1]["element_id"]
+                        pair = (source_id, target_id) if source_id <= target_id else (target_id, source_id)
+                        if pair in seen_pairs:
+                            continue
+                        seen_pairs.add(pair)
+                        paths.append(path)
                     
         except Exception as e:
             logger.error(f"多跳遍历失败: {e}")
             
+        # 只缓存非空结果，避免把查询失败的空结果固定下来
+        if paths:
+            self._cache_traversal(cache_key, list(paths))
+            
         logger.info(f"多跳遍历完成，找到 {len(paths)} 条路径")
         return paths
     
@@ -290,47 +1225,29 @@ class GraphRAGRetrieval:
         if not self.driver:
             logger.error("Neo4j连接未建立")
             return self._fallback_subgraph_extraction(graph_query)
+
+        cache_key = self._traversal_cache_key("subgraph", graph_query)
+        cached_subgraph = self._get_cached_traversal(cache_key)
+        if cached_subgraph is not None:
+            logger.info("知识子图命中缓存")
+            return cached_subgraph
         
         try:
-            with self.driver.session() as session:
-                # 简化的子图提取（不依赖APOC）
-                cypher_query = f"""
-                // 找到源实体
-                UNWIND $source_entities as entity_name
-                MATCH (source)
-                WHERE source.name CONTAINS entity_name
-                   OR source.id = entity_name
-                
-                // 获取指定深度的邻居
-                MATCH (source)-[r*1..{graph_query.max_depth}]-(neighbor)
-                WITH source, collect(DISTINCT neighbor) as neighbors, 
-                     collect(DISTINCT r) as relationships
-                WHERE size(neighbors) <= $max_nodes
+            with self._session() as session:
+                cypher_query = self._cypher_for_depth(self._subgraph_cypher_by_depth, graph_query.max_depth)
                 
-                // 计算图指标
-                WITH source, neighbors, relationships,
-                     size(neighbors) as node_count,
-                     size(relationships) as rel_count
-                
-                RETURN 
-                    source,
-                    neighbors[0..{graph_query.max_nodes}] as nodes,
-                    relationships[0..{graph_query.max_nodes}] as rels,
-                    {{
-                        node_count: node_count,
-                        relationship_count: rel_count,
-                        density: CASE WHEN node_count > 1 THEN toFloat(rel_count) / (node_count * (node_count - 1) / 2) ELSE 0.0 END
-                    }} as metrics
-                """
-                
-                result = session.run(cypher_query, {
+                records = _execute_read(session, cypher_query, {
                     "source_entities": graph_query.source_entities,
-                    "max_nodes": graph_query.max_nodes
+                    "max_nodes": graph_query.max_nodes,
+                    "hub_rho": self.config.hub_penalty_rho,
+                    "preserve_labels": list(HUB_PRESERVE_LABELS),
+                    **self._seed_params(graph_query.source_entities)
                 })
                 
-                record = result.single()
-                if record:
-                    return self._build_knowledge_subgraph(record)
+                if records:
+                    subgraph = self._build_knowledge_subgraph(records[0])
+                    self._cache_traversal(cache_key, subgraph)
+                    return subgraph
                     
         except Exception as e:
             logger.error(f"子图提取失败: {e}")
@@ -412,6 +1329,27 @@ class GraphRAGRetrieval:
             
         return query_plans
     
+    def execute_query_plans(self, query_plans: List[GraphQuery]) -> List[Union[List[GraphPath], KnowledgeSubgraph]]:
+        """
+        并发执行多个查询计划
+        各计划相互独立，每个计划在自己的线程中打开独立的session，
+        总耗时取决于最慢的计划而不是所有计划之和
+
+        Returns:
+            与输入顺序一致的结果列表：子图计划返回KnowledgeSubgraph，其余返回路径列表
+        """
+        if len(query_plans) <= 1:
+            return [self._dispatch_query_plan(plan) for plan in query_plans]
+
+        with ThreadPoolExecutor(max_workers=len(query_plans)) as executor:
+            return list(executor.map(self._dispatch_query_plan, query_plans))
+
+    def _dispatch_query_plan(self, plan: GraphQuery) -> Union[List[GraphPath], KnowledgeSubgraph]:
+        """按查询类型执行单个查询计划"""
+        if plan.query_type == QueryType.SUBGRAPH:
+            return self.extract_knowledge_subgraph(plan)
+        return self.multi_hop_traversal(plan)
+    
     def graph_rag_search(self, query: str, top_k: int = 5) -> List[Document]:
         """
         图RAG主搜索接口：整合所有图RAG能力
@@ -424,13 +1362,44 @@ class GraphRAGRetrieval:
         
         # 1. 查询意图理解
         graph_query = self.understand_graph_query(query)
+        
+        return self._execute_graph_query(query, graph_query, top_k)
+
+    def graph_rag_search_batch(self, queries: List[str], top_k: int = 5, max_workers: int = 8) -> List[List[Document]]:
+        """
+        批量图RAG检索：一次LLM请求理解所有查询意图，再用线程池并发执行图检索
+        驱动是线程安全的，每个图检索在自己的线程里打开独立session，Bolt IO期间释放GIL
+        返回与输入顺序一致的结果列表
+        """
+        logger.info(f"开始批量图RAG检索: {len(queries)} 个查询")
+
+        if not self.driver:
+            logger.warning("Neo4j连接未建立，返回空结果")
+            return [[] for _ in queries]
+
+        graph_queries = self.understand_graph_queries(queries)
+
+        if len(queries) <= 1 or max_workers <= 1:
+            return [
+                self._execute_graph_query(query, graph_query, top_k)
+                for query, graph_query in zip(queries, graph_queries)
+            ]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+            return list(executor.map(
+                lambda item: self._execute_graph_query(item[0], item[1], top_k),
+                zip(queries, graph_queries)
+            ))
+
+    def _execute_graph_query(self, query: str, graph_query: GraphQuery, top_k: int) -> List[Document]:
+        """根据已理解的查询意图执行图检索"""
         logger.info(f"查询类型: {graph_query.query_type.value}")
         
         results = []
         
         try:
             # 2. 根据查询类型执行不同策略
-            if graph_query.query_type in [QueryType.MULTI_HOP, QueryType.PATH_FINDING]:
+            if graph_query.query_type in [QueryType.MULTI_HOP, QueryType.PATH_FINDING, QueryType.CLUSTERING]:
                 # 多跳遍历
                 paths = self.multi_hop_traversal(graph_query)
                 results.extend(self._paths_to_documents(paths, query))
@@ -459,33 +1428,76 @@ class GraphRAGRetrieval:
             logger.error(f"图RAG检索失败: {e}")
             return []
     
+    def invalidate_cache(self):
+        """清空遍历结果缓存（图数据发生写入后调用）"""
+        with self._cache_lock:
+            self.subgraph_cache.clear()
+            self._shortest_path_cache.clear()
+        logger.info("图遍历缓存已清空")
+
+        # 关系矩阵是图数据的快照，写入后需要重新拉取
+        if self.relation_matrix is not None:
+            self._load_relation_matrix()
+
+        # GDS投影同样是快照：先切换到Cypher shortestPath，再重建投影，
+        # 重建期间的最短路径查询不会落到已删除的投影上
+        if self.gds_projection_ready:
+            self.gds_projection_ready = False
+            self._compile_cypher()
+            self._ensure_gds_projection()
+            self._compile_cypher()
+
     # ========== 辅助方法 ==========
+
+    def _traversal_cache_key(self, kind: str, graph_query: GraphQuery) -> Tuple:
+        """构建遍历结果缓存键，实体和关系列表排序后参与比较"""
+        return (
+            kind,
+            graph_query.query_type.value,
+            tuple(sorted(graph_query.source_entities or [])),
+            tuple(sorted(graph_query.target_entities or [])),
+            tuple(sorted(graph_query.relation_types or [])),
+            graph_query.max_depth,
+            graph_query.max_nodes,
+            self._path_expand_cap(graph_query)
+        )
+
+    @staticmethod
+    def _path_expand_cap(graph_query: GraphQuery) -> int:
+        """多跳展开的路径上限"""
+        return int((graph_query.constraints or {}).get("path_cap", DEFAULT_PATH_EXPAND_CAP))
+
+    def _degree_boost(self, path: GraphPath) -> float:
+        """路径节点平均度数加权（度数/10），度数取自实体缓存，未缓存的节点按0计"""
+        if not path.nodes:
+            return 0.0
+        return sum(self._degree_map.get(node["id"], 0) for node in path.nodes) / 10.0 / len(path.nodes)
+
+    def _get_cached_traversal(self, cache_key: Tuple) -> Optional[Any]:
+        """读取遍历缓存，命中时刷新LRU顺序"""
+        with self._cache_lock:
+            cached = self.subgraph_cache.get(cache_key)
+            if cached is not None:
+                self.subgraph_cache.move_to_end(cache_key)
+            return cached
+
+    def _cache_traversal(self, cache_key: Tuple, value: Any):
+        """写入遍历缓存，超出容量时淘汰最久未使用的条目"""
+        with self._cache_lock:
+            self.subgraph_cache[cache_key] = value
+            self.subgraph_cache.move_to_end(cache_key)
+            while len(self.subgraph_cache) > self.subgraph_cache_size:
+                self.subgraph_cache.popitem(last=False)
     
-    def _parse_neo4j_path(self, record) -> Optional[GraphPath]:
-        """解析Neo4j路径记录"""
+    def _parse_neo4j_path(self, record, path_type: str = "multi_hop") -> Optional[GraphPath]:
+        """解析Neo4j路径记录（path_nodes / rels 已在Cypher中投影为映射）"""
         try:
-            path_nodes = []
-            for node in record["path_nodes"]:
-                path_nodes.append({
-                    "id": node.get("nodeId", ""),
-                    "name": node.get("name", ""),
-                    "labels": list(node.labels),
-                    "properties": dict(node)
-                })
-            
-            relationships = []
-            for rel in record["rels"]:
-                relationships.append({
-                    "type": type(rel).__name__,
-                    "properties": dict(rel)
-                })
-            
             return GraphPath(
-                nodes=path_nodes,
-                relationships=relationships,
+                nodes=record["path_nodes"],
+                relationships=record["rels"],
                 path_length=record["path_len"],
                 relevance_score=record["relevance"],
-                path_type="multi_hop"
+                path_type=path_type
             )
             
         except Exception as e:
@@ -495,16 +1507,29 @@ class GraphRAGRetrieval:
     def _build_knowledge_subgraph(self, record) -> KnowledgeSubgraph:
         """构建知识子图对象"""
         try:
-            central_nodes = [dict(record["source"])]
-            connected_nodes = [dict(node) for node in record["nodes"]]
-            relationships = [dict(rel) for rel in record["rels"]]
+            # 节点/关系已在Cypher中投影为映射（含labels/type），直接使用
+            central_nodes = [record["source"]]
+            connected_nodes = record["nodes"]
+            relationships = record["rels"]
+
+            # 一次遍历建立标签和关系类型索引
+            by_label = defaultdict(list)
+            for node in itertools.chain(central_nodes, connected_nodes):
+                for label in node["labels"]:
+                    by_label[label].append(node)
+
+            rel_by_type = defaultdict(list)
+            for rel in relationships:
+                rel_by_type[rel["type"]].append(rel)
             
             return KnowledgeSubgraph(
                 central_nodes=central_nodes,
                 connected_nodes=connected_nodes,
                 relationships=relationships,
                 graph_metrics=record["metrics"],
-                reasoning_chains=[]
+                reasoning_chains=[],
+                by_label=dict(by_label),
+                rel_by_type=dict(rel_by_type)
             )
         except Exception as e:
             logger.error(f"构建知识子图失败: {e}")
@@ -518,16 +1543,14 @@ class GraphRAGRetrieval:
     
     def _paths_to_documents(self, paths: List[GraphPath], query: str) -> List[Document]:
         """将图路径转换为Document对象"""
-        documents = []
-        
-        for i, path in enumerate(paths):
-            # 构建路径描述
-            path_desc = self._build_path_description(path)
-            
-            doc = Document(
-                page_content=path_desc,
+        # 所有路径文档共享的元数据字段，循环外只构建一次
+        common = {"search_type": "graph_path"}
+
+        return [
+            Document(
+                page_content=self._build_path_description(path),
                 metadata={
-                    "search_type": "graph_path",
+                    **common,
                     "path_length": path.path_length,
                     "relevance_score": path.relevance_score,
                     "path_type": path.path_type,
@@ -536,9 +1559,8 @@ class GraphRAGRetrieval:
                     "recipe_name": path.nodes[0].get("name", "图结构结果") if path.nodes else "图结构结果"
                 }
             )
-            documents.append(doc)
-            
-        return documents
+            for path in paths
+        ]
     
     def _subgraph_to_documents(self, subgraph: KnowledgeSubgraph, 
                               reasoning_chains: List[str], query: str) -> List[Document]:
@@ -567,15 +1589,8 @@ class GraphRAGRetrieval:
         """构建路径的自然语言描述"""
         if not path.nodes:
             return "空路径"
-            
-        desc_parts = []
-        for i, node in enumerate(path.nodes):
-            desc_parts.append(node.get("name", f"节点{i}"))
-            if i < len(path.relationships):
-                rel_type = path.relationships[i].get("type", "相关")
-                desc_parts.append(f" --{rel_type}--> ")
-        
-        return "".join(desc_parts)
+
+        return "".join(_iter_path_segments(path))
     
     def _build_subgraph_description(self, subgraph: KnowledgeSubgraph) -> str:
         """构建子图的自然语言描述"""
@@ -586,10 +1601,13 @@ class GraphRAGRetrieval:
         return f"关于 {', '.join(central_names)} 的知识网络，包含 {node_count} 个相关概念和 {rel_count} 个关系。"
     
     def _rank_by_graph_relevance(self, documents: List[Document], query: str) -> List[Document]:
-        """基于图结构相关性排序"""
-        return sorted(documents, 
-                     key=lambda x: x.metadata.get("relevance_score", 0.0), 
-                     reverse=True)
+        """基于图结构相关性排序（稳定排序，同分文档保持原有顺序）"""
+        scores = np.fromiter(
+            (doc.metadata.get("relevance_score", 0.0) for doc in documents),
+            dtype=np.float64,
+            count=len(documents)
+        )
+        return [documents[i] for i in np.argsort(-scores, kind="stable")]
     
     def _analyze_query_complexity(self, query: str) -> float:
         """分析查询复杂度"""
@@ -602,39 +1620,15 @@ class GraphRAGRetrieval:
         patterns = []
 
         try:
-            # 分析子图中的节点类型
-            node_types = set()
-            relationship_types = set()
-
-            for node in subgraph.central_nodes + subgraph.connected_nodes:
-                if 'labels' in node:
-                    node_types.update(node['labels'])
-
-            for rel in subgraph.relationships:
-                if isinstance(rel, dict) and 'type' in rel:
-                    relationship_types.add(rel['type'])
+            # 分析子图中的节点类型（直接读取按标签/关系类型分组的索引）
+            node_types = subgraph.by_label.keys()
+            relationship_types = subgraph.rel_by_type.keys()
 
             # 基于旅游领域的推理模式
-            if 'City' in node_types or 'Region' in node_types:
-                patterns.append("地理位置推理")
-
-            if 'Attraction' in node_types:
-                patterns.append("旅游景点相关性推理")
-
-            if any(rel_type in ['HAS_ATTRACTION', 'HAS_FOOD', 'HAS_HOTEL'] for rel_type in relationship_types):
-                patterns.append("旅游配套服务推理")
-
-            if 'NEARBY' in relationship_types:
-                patterns.append("空间邻近性推理")
-
-            if 'Food' in node_types or 'Restaurant' in node_types:
-                patterns.append("美食文化推理")
-
-            if 'Hotel' in node_types:
-                patterns.append("住宿便利性推理")
-
-            if 'Festival' in node_types:
-                patterns.append("节庆时间推理")
+            patterns = [
+                pattern for pattern, trigger_labels, trigger_rels in REASONING_PATTERN_TRIGGERS
+                if not trigger_labels.isdisjoint(node_types) or not trigger_rels.isdisjoint(relationship_types)
+            ]
 
             # 默认推理模式
             if not patterns:
@@ -650,22 +1644,10 @@ class GraphRAGRetrieval:
         """构建推理链 - 针对旅游领域优化"""
         try:
             # 根据推理模式构建具体的推理链
-            if pattern == "地理位置推理":
-                return self._build_geographic_reasoning(subgraph)
-            elif pattern == "旅游景点相关性推理":
-                return self._build_attraction_reasoning(subgraph)
-            elif pattern == "旅游配套服务推理":
-                return self._build_service_reasoning(subgraph)
-            elif pattern == "空间邻近性推理":
-                return self._build_spatial_reasoning(subgraph)
-            elif pattern == "美食文化推理":
-                return self._build_food_reasoning(subgraph)
-            elif pattern == "住宿便利性推理":
-                return self._build_accommodation_reasoning(subgraph)
-            elif pattern == "节庆时间推理":
-                return self._build_festival_reasoning(subgraph)
-            else:
+            builder = self._reasoning_dispatch.get(pattern)
+            if builder is None:
                 return f"基于{pattern}的旅游推理链"
+            return builder(subgraph)
 
         except Exception as e:
             logger.error(f"推理链构建失败: {e}")
@@ -673,16 +1655,13 @@ class GraphRAGRetrieval:
 
     def _build_geographic_reasoning(self, subgraph: KnowledgeSubgraph) -> str:
         """构建地理位置推理链"""
-        locations = []
-        regions = []
-
-        for node in subgraph.central_nodes + subgraph.connected_nodes:
-            if isinstance(node, dict):
-                labels = node.get('labels', [])
-                if 'City' in labels:
-                    locations.append(node.get('name', '未知城市'))
-                elif 'Region' in labels or 'SubRegion' in labels:
-                    regions.append(node.get('name', '未知地区'))
+        locations = [node.get('name', '未知城市') for node in subgraph.by_label.get('City', ())]
+        regions = [
+            node.get('name', '未知地区')
+            for label in ('Region', 'SubRegion')
+            for node in subgraph.by_label.get(label, ())
+            if 'City' not in node['labels']
+        ]
 
         if locations and regions:
             return f"地理位置推理：{', '.join(locations)}位于{', '.join(regions)}，形成区域旅游集群"
@@ -693,16 +1672,9 @@ class GraphRAGRetrieval:
 
     def _build_attraction_reasoning(self, subgraph: KnowledgeSubgraph) -> str:
         """构建旅游景点相关性推理链"""
-        attractions = []
-        categories = set()
-
-        for node in subgraph.central_nodes + subgraph.connected_nodes:
-            if isinstance(node, dict):
-                labels = node.get('labels', [])
-                if 'Attraction' in labels:
-                    attractions.append(node.get('name', '未知景点'))
-                    if 'category' in node:
-                        categories.add(node['category'])
+        attraction_nodes = subgraph.by_label.get('Attraction', ())
+        attractions = [node.get('name', '未知景点') for node in attraction_nodes]
+        categories = {node['category'] for node in attraction_nodes if 'category' in node}
 
         reasoning = f"景点相关性推理：{', '.join(attractions)}"
         if categories:
@@ -715,14 +1687,16 @@ class GraphRAGRetrieval:
         """构建旅游配套服务推理链"""
         services = {'餐饮': [], '住宿': [], '购物': [], '交通': []}
 
-        for node in subgraph.central_nodes + subgraph.connected_nodes:
-            if isinstance(node, dict):
-                labels = node.get('labels', [])
-                if 'Food' in labels or 'Restaurant' in labels:
-                    services['餐饮'].append(node.get('name', '未知餐饮'))
-                elif 'Hotel' in labels:
-                    services['住宿'].append(node.get('name', '未知住宿'))
-                # 可以根据需要扩展其他服务类型
+        services['餐饮'] = [node.get('name', '未知餐饮') for node in subgraph.by_label.get('Food', ())]
+        services['餐饮'] += [
+            node.get('name', '未知餐饮') for node in subgraph.by_label.get('Restaurant', ())
+            if 'Food' not in node['labels']
+        ]
+        services['住宿'] = [
+            node.get('name', '未知住宿') for node in subgraph.by_label.get('Hotel', ())
+            if 'Food' not in node['labels'] and 'Restaurant' not in node['labels']
+        ]
+        # 可以根据需要扩展其他服务类型
 
         service_desc = []
         for service_type, items in services.items():
@@ -733,11 +1707,7 @@ class GraphRAGRetrieval:
 
     def _build_spatial_reasoning(self, subgraph: KnowledgeSubgraph) -> str:
         """构建空间邻近性推理链"""
-        nearby_pairs = []
-
-        for rel in subgraph.relationships:
-            if isinstance(rel, dict) and rel.get('type') == 'NEARBY':
-                nearby_pairs.append(f"邻近区域")
+        nearby_pairs = subgraph.rel_by_type.get('NEARBY', ())
 
         if nearby_pairs:
             return f"空间邻近性推理：存在{len(nearby_pairs)}组邻近关系，适合步行游览或短途出行"
@@ -746,16 +1716,11 @@ class GraphRAGRetrieval:
 
     def _build_food_reasoning(self, subgraph: KnowledgeSubgraph) -> str:
         """构建美食文化推理链"""
-        foods = []
-        restaurants = []
-
-        for node in subgraph.central_nodes + subgraph.connected_nodes:
-            if isinstance(node, dict):
-                labels = node.get('labels', [])
-                if 'Food' in labels:
-                    foods.append(node.get('name', '未知美食'))
-                elif 'Restaurant' in labels:
-                    restaurants.append(node.get('name', '未知餐厅'))
+        foods = [node.get('name', '未知美食') for node in subgraph.by_label.get('Food', ())]
+        restaurants = [
+            node.get('name', '未知餐厅') for node in subgraph.by_label.get('Restaurant', ())
+            if 'Food' not in node['labels']
+        ]
 
         reasoning = "美食文化推理："
         if foods:
@@ -771,11 +1736,7 @@ class GraphRAGRetrieval:
 
     def _build_accommodation_reasoning(self, subgraph: KnowledgeSubgraph) -> str:
         """构建住宿便利性推理链"""
-        hotels = []
-
-        for node in subgraph.central_nodes + subgraph.connected_nodes:
-            if isinstance(node, dict) and 'Hotel' in node.get('labels', []):
-                hotels.append(node.get('name', '未知酒店'))
+        hotels = [node.get('name', '未知酒店') for node in subgraph.by_label.get('Hotel', ())]
 
         if hotels:
             return f"住宿便利性推理：提供{', '.join(hotels)}等住宿选择，满足不同层次需求"
@@ -784,13 +1745,10 @@ class GraphRAGRetrieval:
 
     def _build_festival_reasoning(self, subgraph: KnowledgeSubgraph) -> str:
         """构建节庆时间推理链"""
-        festivals = []
-
-        for node in subgraph.central_nodes + subgraph.connected_nodes:
-            if isinstance(node, dict) and 'Festival' in node.get('labels', []):
-                festival_name = node.get('name', '未知节庆')
-                festival_time = node.get('time', '时间待定')
-                festivals.append(f"{festival_name}({festival_time})")
+        festivals = [
+            f"{node.get('name', '未知节庆')}({node.get('time', '时间待定')})"
+            for node in subgraph.by_label.get('Festival', ())
+        ]
 
         if festivals:
             return f"节庆时间推理：最佳旅游时间为{', '.join(festivals)}期间，体验当地特色文化"
@@ -799,31 +1757,27 @@ class GraphRAGRetrieval:
 
     def _validate_reasoning_chains(self, chains: List[str], query: str) -> List[str]:
         """验证推理链 - 针对旅游领域优化"""
-        validated_chains = []
+        if not chains:
+            return []
 
-        # 旅游关键词集合
-        tourism_keywords = {
-            '旅游', '景点', '酒店', '美食', '餐厅', '交通', '路线',
-            '门票', '开放时间', '地址', '推荐', '攻略', '体验',
-            '文化', '历史', '自然', '风光', '住宿', '购物'
-        }
+        # 关键词指示矩阵：行=推理链，列=旅游关键词
+        hit_matrix = np.zeros((len(chains), len(_TOURISM_KEYWORD_INDEX)), dtype=np.uint16)
+        for row, chain in enumerate(chains):
+            columns = [_TOURISM_KEYWORD_INDEX[keyword] for keyword in _TOURISM_KEYWORD_RE.findall(chain.lower())]
+            hit_matrix[row, columns] = 1
 
-        # 验证推理链与查询的相关性
-        query_lower = query.lower()
-        for chain in chains:
-            # 检查推理链是否包含旅游相关内容
-            chain_lower = chain.lower()
-            relevance_score = 0
+        query_vector = np.zeros(len(_TOURISM_KEYWORD_INDEX), dtype=np.uint16)
+        query_vector[[_TOURISM_KEYWORD_INDEX[keyword] for keyword in _TOURISM_KEYWORD_RE.findall(query.lower())]] = 1
 
-            for keyword in tourism_keywords:
-                if keyword in query_lower and keyword in chain_lower:
-                    relevance_score += 2
-                elif keyword in chain_lower:
-                    relevance_score += 1
+        # 验证推理链与查询的相关性：同时出现在查询和推理链中的关键词计2分，仅出现在推理链中的计1分
+        # 即 推理链关键词数 + 共有关键词数，一次矩阵乘法得到全部得分
+        relevance_scores = hit_matrix.sum(axis=1) + hit_matrix @ query_vector
 
-            # 选择相关性高的推理链
-            if relevance_score >= 2 or len(chains) <= 3:
-                validated_chains.append(chain)
+        # 选择相关性高的推理链
+        if len(chains) <= 3:
+            validated_chains = list(chains)
+        else:
+            validated_chains = [chain for chain, score in zip(chains, relevance_scores) if score >= 2]
 
         # 如果验证通过的链太少，返回前几个
         if len(validated_chains) < 2 and chains:
@@ -831,133 +1785,160 @@ class GraphRAGRetrieval:
 
         return validated_chains[:3]  # 最多返回3条推理链
     
+    @staticmethod
+    def _shortest_path_relevances(paths_nodes: List[List[Dict[str, Any]]], path_lens: List[int]) -> np.ndarray:
+        """
+        批量计算最短路径相关性：节点类型平均得分 * 2 / 路径长度（路径越短、节点类型越相关越好）
+        所有路径的节点得分展平成一维数组，按路径偏移分段求和
+        """
+        if not paths_nodes:
+            return np.empty(0, dtype=np.float64)
+
+        node_counts = np.fromiter((len(nodes) for nodes in paths_nodes), dtype=np.int64, count=len(paths_nodes))
+        node_scores = np.fromiter(
+            (
+                _node_label_score(tuple(node["labels"]))
+                for nodes in paths_nodes
+                for node in nodes
+            ),
+            dtype=np.float64,
+            count=int(node_counts.sum())
+        )
+        offsets = np.concatenate(([0], np.cumsum(node_counts)[:-1]))
+        avg_scores = np.add.reduceat(node_scores, offsets) / node_counts
+        return avg_scores * 2.0 / np.asarray(path_lens, dtype=np.float64)
+
     def _find_entity_relations(self, graph_query: GraphQuery, session) -> List[GraphPath]:
-        """查找实体间关系"""
+        """查找实体间关系，关系矩阵就绪时在内存中完成，否则执行Cypher查询"""
+        if self.relation_matrix is not None:
+            return self._find_entity_relations_fast(graph_query)
+
         paths = []
 
         try:
-            # 旅游场景的实体关系查询
-            cypher_query = """
-            UNWIND $source_entities as source_name
-            MATCH (source)
-            WHERE source.name CONTAINS source_name OR source.id = source_name
-
-            // 查找直接关系
-            MATCH (source)-[r]-(target)
-            WHERE target.name IS NOT NULL
-
-            // 计算关系权重
-            WITH source, target, r,
-                 CASE
-                     WHEN type(r) = 'NEARBY' THEN 0.9
-                     WHEN type(r) = 'HAS_ATTRACTION' THEN 0.8
-                     WHEN type(r) = 'HAS_FOOD' THEN 0.7
-                     WHEN type(r) = 'HAS_SPECIALTY' THEN 0.6
-                     ELSE 0.5
-                 END as weight
-
-            RETURN source, target, type(r) as rel_type, weight,
-                   [source.name, type(r), target.name] as path_names,
-                   1 as path_len, weight as relevance
-            ORDER BY weight DESC
-            LIMIT 15
-            """
-
-            result = session.run(cypher_query, {
-                "source_entities": graph_query.source_entities
-            })
-
-            for record in result:
-                # 构建简单路径
-                nodes = [
-                    {"name": record["source"].get("name", ""), "id": record["source"].get("id", "")},
-                    {"name": record["target"].get("name", ""), "id": record["target"].get("id", "")}
-                ]
-
-                relationships = [{
-                    "type": record["rel_type"],
-                    "weight": record["weight"]
-                }]
-
-                path = GraphPath(
-                    nodes=nodes,
-                    relationships=relationships,
-                    path_length=record["path_len"],
-                    relevance_score=record["relevance"],
+            rows = _execute_read(session, self._entity_relation_cypher, {
+                "source_entities": graph_query.source_entities,
+                "relation_weights": RELATION_TYPE_WEIGHTS,
+                "default_relation_weight": DEFAULT_RELATION_WEIGHT,
+                **self._seed_params(graph_query.source_entities)
+            }, _ENTITY_RELATION_COLUMNS)
+
+            # 按列顺序一次取出标量元组并解包，直接关系的权重即为路径得分
+            paths = [
+                GraphPath(
+                    nodes=[
+                        {"id": source_id, "name": source_name, "labels": source_labels},
+                        {"id": target_id, "name": target_name, "labels": target_labels}
+                    ],
+                    relationships=[{"type": rel_type, "weight": relevance}],
+                    path_length=1,
+                    relevance_score=relevance,
                     path_type="entity_relation"
                 )
-                paths.append(path)
+                for source_id, source_name, source_labels, target_id, target_name, target_labels, rel_type, relevance
+                in rows
+            ]
 
         except Exception as e:
             logger.error(f"实体关系查询失败: {e}")
 
         return paths
 
-    def _find_shortest_paths(self, graph_query: GraphQuery, session) -> List[GraphPath]:
-        """查找最短路径"""
+    def _find_entity_relations_fast(self, graph_query: GraphQuery) -> List[GraphPath]:
+        """基于 SUB/OBJ 稀疏矩阵的实体关系查找，结果结构与Cypher查询一致"""
+        matrix = self.relation_matrix
         paths = []
 
         try:
-            # 旅游场景的最短路径查询
-            cypher_query = """
-            UNWIND $source_entities as source_name
-            MATCH (source)
-            WHERE source.name CONTAINS source_name OR source.id = source_name
-
-            UNWIND $target_entities as target_name
-            MATCH (target)
-            WHERE target.name CONTAINS target_name OR target.id = target_name
-
-            // 使用最短路径算法
-            MATCH path = shortestPath((source)-[*1..4]-(target))
-            WHERE source <> target
-
-            // 计算路径得分（考虑路径长度和节点类型）
-            WITH path, length(path) as path_len,
-                 nodes(path) as path_nodes,
-                 relationships(path) as path_rels
-
-            // 旅游相关性评分
-            CALL {
-                WITH path_nodes
-                UNWIND path_nodes as node
-                RETURN
-                    CASE
-                        WHEN 'City' IN labels(node) THEN 1.0
-                        WHEN 'Attraction' IN labels(node) THEN 0.9
-                        WHEN 'Food' IN labels(node) OR 'Restaurant' IN labels(node) THEN 0.8
-                        WHEN 'Hotel' IN labels(node) THEN 0.7
-                        WHEN 'Region' IN labels(node) OR 'SubRegion' IN labels(node) THEN 0.6
-                        ELSE 0.5
-                    END as node_score
-            }
+            seed_rows = matrix.find_seed_rows(graph_query.source_entities)
+            for source_row, target_row, edge_row in matrix.one_hop(seed_rows, ENTITY_RELATION_LIMIT):
+                relevance = float(matrix.weights[edge_row])
+                paths.append(GraphPath(
+                    nodes=[
+                        {"id": matrix.node_ids[source_row], "name": matrix.node_names[source_row] or '',
+                         "labels": matrix.node_labels[source_row]},
+                        {"id": matrix.node_ids[target_row], "name": matrix.node_names[target_row],
+                         "labels": matrix.node_labels[target_row]}
+                    ],
+                    relationships=[{"type": matrix.rel_types[edge_row], "weight": relevance}],
+                    path_length=1,
+                    relevance_score=relevance,
+                    path_type="entity_relation"
+                ))
+
+        except Exception as e:
+            logger.error(f"实体关系矩阵查询失败: {e}")
 
-            WITH path, path_len, path_nodes, path_rels, avg(node_score) as avg_node_score
+        return paths
 
-            // 计算总相关性（路径越短，节点得分越高越好）
-            WITH path, path_len, path_nodes, path_rels,
-                 (avg_node_score * 2.0 / path_len) as relevance
+    def _find_shortest_paths(self, graph_query: GraphQuery, session) -> List[GraphPath]:
+        """
+        查找最短路径
+        按(源名称, 目标名称)逐对查缓存，只把未命中的名称对发给Neo4j
+        """
+        paths = []
+        # 名称对在Python端预先去重，并跳过源和目标相同的名称对（查询要求 source <> target）
+        pairs = list(dict.fromkeys(
+            (source_name, target_name)
+            for source_name in graph_query.source_entities
+            for target_name in graph_query.target_entities or []
+            if source_name != target_name
+        ))
+
+        misses = []
+        with self._cache_lock:
+            for pair in pairs:
+                cache_key = (*pair, SHORTEST_PATH_MAX_HOPS)
+                cached_paths = self._shortest_path_cache.get(cache_key)
+                if cached_paths is None:
+                    misses.append(pair)
+                else:
+                    self._shortest_path_cache.move_to_end(cache_key)
+                    paths.extend(cached_paths)
+
+        if misses:
+            try:
+                records = _execute_read(session, self._shortest_path_cypher, {
+                    "pairs": [{"s": source_name, "t": target_name} for source_name, target_name in misses],
+                    "graph_name": GDS_GRAPH_NAME,
+                    "k": GDS_YENS_K,
+                    **self._seed_params([name for pair in misses for name in pair])
+                })
+                relevance_scores = self._shortest_path_relevances(
+                    [record["path_nodes"] for record in records],
+                    [record["path_len"] for record in records]
+                )
 
-            RETURN path, path_len, path_nodes, path_rels, relevance
-            ORDER BY relevance DESC
-            LIMIT 10
-            """
+                # 没有路径的名称对也缓存为空列表，避免重复查询
+                fetched = {pair: [] for pair in misses}
+                for record, relevance in zip(records, relevance_scores.tolist()):
+                    fetched.setdefault((record["source_name"], record["target_name"]), []).append(GraphPath(
+                        nodes=record["path_nodes"],
+                        relationships=record["rels"],
+                        path_length=record["path_len"],
+                        relevance_score=relevance,
+                        path_type="shortest_path"
+                    ))
+
+                # 每个名称对只保留得分最高的若干条路径（堆选前K，无需整体排序）
+                fetched = {
+                    pair: heapq.nlargest(SHORTEST_PATH_LIMIT, pair_paths, key=_path_relevance)
+                    for pair, pair_paths in fetched.items()
+                }
 
-            result = session.run(cypher_query, {
-                "source_entities": graph_query.source_entities,
-                "target_entities": graph_query.target_entities or []
-            })
+                with self._cache_lock:
+                    for pair, pair_paths in fetched.items():
+                        self._shortest_path_cache[(*pair, SHORTEST_PATH_MAX_HOPS)] = pair_paths
+                    while len(self._shortest_path_cache) > self._shortest_path_cache_size:
+                        self._shortest_path_cache.popitem(last=False)
 
-            for record in result:
-                path_data = self._parse_neo4j_path(record)
-                if path_data:
-                    path_data.path_type = "shortest_path"
-                    paths.append(path_data)
+                for pair_paths in fetched.values():
+                    paths.extend(pair_paths)
 
-        except Exception as e:
-            logger.error(f"最短路径查询失败: {e}")
+            except Exception as e:
+                logger.error(f"最短路径查询失败: {e}")
 
-        return paths
+        return heapq.nlargest(SHORTEST_PATH_LIMIT, paths, key=_path_relevance)
     
     def _fallback_subgraph_extraction(self, graph_query: GraphQuery) -> KnowledgeSubgraph:
         """降级子图提取"""
@@ -4,18 +4,326 @@
 结合图结构检索和向量检索，使用Round-robin轮询策略
 """
 
+import heapq
 import json
 import logging
-from typing import List, Dict, Tuple, Any
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from itertools import zip_longest
+from typing import Iterator, List, Dict, Tuple, Any, Optional
 from dataclasses import dataclass
 
 from langchain_core.documents import Document
 from langchain_community.retrievers import BM25Retriever
-from neo4j import GraphDatabase
-from .graph_indexing import GraphIndexingModule
+from neo4j import GraphDatabase, READ_ACCESS, RoutingControl
+from .graph_indexing import ENTITY_SCHEMA, GraphIndexingModule
+
+# bm25s为可选依赖（NumPy向量化的BM25打分），未安装时回退到langchain的BM25Retriever
+try:
+    import bm25s
+except ImportError:
+    bm25s = None
+
+# orjson为可选依赖（C实现的JSON解析），未安装时使用标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# markdown代码块围栏：开头的 ```json / ``` 整行，以及结尾单独一行的 ```
+_CODE_FENCE_RE = re.compile(r"^```[^\n]*(?:\n|$)|\n[ \t]*```[ \t]*$")
+
+# 检索线程池大小：混合检索层（双层检索 ∥ 向量检索）与双层检索内部（实体/主题/补充检索）各用一个池，
+# 外层任务等待内层任务时不会占满同一个池而互相等待
+SEARCH_POOL_SIZE = 4
+RETRIEVAL_POOL_SIZE = 8
+
+# 双层检索结果缓存：命中时跳过关键词提取和全部图检索；结果相关性随图数据变化，过期时间短于关键词缓存
+RESULT_CACHE_SIZE = 2048
+RESULT_CACHE_TTL = 600
+
+# 本地词典关键词提取：不超过该长度的短查询只要命中任一已知实体即跳过LLM
+LOCAL_KEYWORD_MAX_QUERY_LEN = 12
+# 词典最短词长，过滤单字名称避免误匹配
+GAZETTEER_MIN_TERM_LEN = 2
+# 多值分类字段的分隔符
+_CATEGORY_SPLIT_RE = re.compile(r"[、,，/;；\s]+")
+
+# 关键词提取结果缓存：容量和过期时间（秒）
+KEYWORD_CACHE_SIZE = 1024
+KEYWORD_CACHE_TTL = 3600
+
+# 关键词提取提示词：模板在模块加载时构建一次，查询放在末尾，
+# 前面的说明和示例每次请求逐字节相同，可命中LLM服务端的提示词前缀缓存
+_KEYWORD_PROMPT_TEMPLATE = """作为旅游知识助手，请分析以下查询并提取关键词，分为两个层次：
+
+提取规则：
+1. 实体级关键词：具体的地点、景点、城市、酒店、餐厅、特产、建筑等有形实体
+   - 例如：故宫、长城、北京、布达拉宫、香格里拉、天安门、东方明珠
+   - 对于抽象查询，推测相关的具体地点/景点
+
+2. 主题级关键词：抽象概念、旅游主题、活动类型、旅游风格、季节等
+   - 例如：历史古迹、自然风光、美食之旅、亲子游、探险、浪漫、文化体验
+   - 排除动作词：推荐、介绍、怎么去、路线规划等
+
+示例：
+查询："推荐几个历史古迹"
+{{
+    "entity_keywords": ["故宫", "天坛", "明十三陵", "颐和园", "长城"],
+    "topic_keywords": ["历史古迹", "皇城", "古建筑", "文化遗产", "明清"]
+}}
+
+查询："北京有什么好玩的地方"
+{{
+    "entity_keywords": ["故宫", "长城", "天安门", "颐和园", "北海公园"],
+    "topic_keywords": ["旅游景点", "北京", "必去景点", "历史文化", "皇家园林"]
+}}
+
+查询："西藏旅游最佳时间"
+{{
+    "entity_keywords": ["布达拉宫", "纳木错", "珠峰", "拉萨", "林芝"],
+    "topic_keywords": ["西藏", "最佳旅游时间", "高海拔", "藏文化", "自然风光"]
+}}
+
+请严格按照JSON格式返回，不要包含多余的文字：
+{{
+    "entity_keywords": ["实体1", "实体2", ...],
+    "topic_keywords": ["主题1", "主题2", ...]
+}}
+
+查询：{query}
+"""
+
+# 补充检索中做CONTAINS匹配的属性，逐一建立TEXT索引（CONTAINS只能走TEXT索引）
+TEXT_INDEXED_PROPERTIES = {
+    "Attraction": ("name", "description", "category"),
+    "City": ("name", "description", "highlights"),
+    "Region": ("name", "description", "highlights")
+}
+
+# 按 nodeId 查找/范围过滤的标签，建立RANGE索引
+NODE_ID_INDEXED_LABELS = ("City", "Region", "SubRegion", "Attraction", "Food",
+                          "Restaurant", "Hotel", "Festival", "Specialty")
+
+# 一跳邻居缓存容量
+NEIGHBOR_CACHE_SIZE = 10000
+
+# 以下查询均为模块常量：查询文本逐字节不变，Neo4j按文本缓存的执行计划可以反复命中
+
+# 降级加载：未复用图数据模块时直接从Neo4j读取城市和景点节点
+_CITY_ENTITIES_CYPHER = "MATCH (c:City) RETURN c as city_data LIMIT 50"
+_ATTRACTION_ENTITIES_CYPHER = "MATCH (a:Attraction) RETURN a as attraction_data LIMIT 100"
+
+# 图索引构建时提取的关系
+_GRAPH_RELATIONSHIPS_CYPHER = """
+    MATCH (source)-[r]->(target)
+    WHERE source.nodeId >= '200000000' OR target.nodeId >= '200000000'
+    RETURN source.nodeId as source_id, type(r) as relation_type, target.nodeId as target_id
+    LIMIT 1000
+"""
+
+# 按 nodeId 定位起点：每个标签一个分支（UNION去重多标签节点），各分支都走 nodeId 的RANGE索引，
+# 无标签的 MATCH (n {nodeId: ...}) 只能全节点扫描
+_NODE_ID_SEEK_CYPHER = "\n        UNION\n".join(
+    f"        WITH node_id\n        MATCH (n:{label} {{nodeId: node_id}}) RETURN n"
+    for label in NODE_ID_INDEXED_LABELS
+)
+
+# 批量一跳邻居查询：子查询内按节点LIMIT，高度数节点（如城市）展开到上限即停止，不再先收集全部邻居再截断
+_BATCH_NEIGHBORS_CYPHER = """
+    UNWIND $node_ids as node_id
+    CALL {
+%s
+    }
+    CALL {
+        WITH n
+        MATCH (n)--(neighbor)
+        WHERE neighbor.name IS NOT NULL
+        RETURN DISTINCT neighbor.name as name
+        LIMIT $limit
+    }
+    RETURN node_id, collect(name) as names
+""" % _NODE_ID_SEEK_CYPHER
+
+# 实体级补充检索失败时的简化查询：只按名称CONTAINS匹配
+_ENTITY_FALLBACK_CYPHER = """
+    UNWIND $keywords as keyword
+    MATCH (n)
+    WHERE (n:City OR n:Attraction OR n:Region)
+      AND n.name CONTAINS keyword
+    RETURN DISTINCT
+        n.nodeId as node_id,
+        n.name as name,
+        n.description as description,
+        labels(n) as labels,
+        head(labels(n)) as node_type
+    LIMIT $limit
+"""
+
+# 实体级补充检索：景点/城市/地区的名称和描述CONTAINS匹配
+_ENTITY_SUPPLEMENT_CYPHER = """
+    UNWIND $entity_keywords as keyword
+    // 搜索景点
+    OPTIONAL MATCH (a:Attraction)
+    WHERE a.name CONTAINS keyword OR a.description CONTAINS keyword
+    WITH keyword, collect(DISTINCT a)[0..$per_type_limit] as attractions
+
+    // 搜索城市
+    OPTIONAL MATCH (c:City)
+    WHERE c.name CONTAINS keyword OR c.description CONTAINS keyword
+    WITH keyword, attractions, collect(DISTINCT c)[0..$per_type_limit] as cities
+
+    // 搜索地区
+    OPTIONAL MATCH (r:Region)
+    WHERE r.name CONTAINS keyword OR r.description CONTAINS keyword
+    WITH keyword, attractions, cities, collect(DISTINCT r)[0..$per_type_limit] as regions
+
+    // 合并结果
+    UNWIND attractions + cities + regions as node
+    WITH keyword, node
+    WHERE node IS NOT NULL
+    RETURN DISTINCT
+        node.nodeId as node_id,
+        node.name as name,
+        node.description as description,
+        node.category as category,
+        node.ticket_price as ticket_price,
+        node.address as address,
+        node.best_time as best_time,
+        node.highlights as highlights,
+        labels(node) as labels,
+        head(labels(node)) as node_type,
+        keyword as matched_keyword,
+        1.0 as score
+    LIMIT $entity_limit
+"""
+_ENTITY_SUPPLEMENT_COLUMNS = (
+    "node_id", "name", "description", "category",
+    "ticket_price", "address", "best_time", "highlights",
+    "labels", "node_type", "matched_keyword", "score"
+)
+
+# 主题级补充检索：按分类/特色/描述匹配景点、城市、地区
+_TOPIC_SUPPLEMENT_CYPHER = """
+    UNWIND $topic_keywords as keyword
+    // 景点按类别、城市/地区按亮点和描述匹配，三类节点在同一次扫描中完成
+    MATCH (n)
+    WHERE (n:Attraction AND n.category CONTAINS keyword)
+       OR (n:City AND (n.highlights CONTAINS keyword OR n.description CONTAINS keyword))
+       OR (n:Region AND (n.description CONTAINS keyword OR n.highlights CONTAINS keyword))
+    WITH n, keyword,
+         CASE
+             WHEN n:Attraction THEN 'Attraction'
+             WHEN n:City THEN 'City'
+             ELSE 'Region'
+         END as node_type
+    OPTIONAL MATCH (n)-[:HAS_ATTRACTION]->(a:Attraction)
+    WITH n, node_type, keyword, collect(a.name)[0..3] as related_attractions
+    RETURN
+        n.nodeId as node_id,
+        n.name as name,
+        node_type as node_type,
+        CASE node_type
+            WHEN 'Attraction' THEN n.category
+            WHEN 'City' THEN '旅游城市'
+            ELSE '旅游地区'
+        END as category_info,
+        n.description as description,
+        n.ticket_price as ticket_price,
+        n.best_time as best_time,
+        related_attractions,
+        keyword as matched_keyword
+    ORDER BY name
+    LIMIT $topic_limit
+"""
+_TOPIC_SUPPLEMENT_COLUMNS = (
+    "node_id", "name", "node_type", "category_info",
+    "description", "ticket_price", "best_time", "related_attractions",
+    "matched_keyword"
+)
+
+# 实体级 + 主题级补充检索合并为一次往返，level 列区分两类结果
+_SUPPLEMENTARY_SEARCH_CYPHER = """
+CALL {
+%s
+}
+RETURN 'entity' as level, {%s} as row
+UNION ALL
+CALL {
+%s
+}
+RETURN 'topic' as level, {%s} as row
+""" % (
+    _ENTITY_SUPPLEMENT_CYPHER,
+    ", ".join(f"{column}: {column}" for column in _ENTITY_SUPPLEMENT_COLUMNS),
+    _TOPIC_SUPPLEMENT_CYPHER,
+    ", ".join(f"{column}: {column}" for column in _TOPIC_SUPPLEMENT_COLUMNS)
+)
+
+# 补充检索结果的内容模板：节点类型 -> ((字段, 行前缀), ...)，字段非空时按顺序输出一行
+_ENTITY_CONTENT_FIELDS = {
+    "Attraction": (("name", "景点: "), ("category", "类型: "), ("description", "描述: "),
+                   ("ticket_price", "门票: "), ("address", "地址: ")),
+    "City": (("name", "城市: "), ("description", "描述: "),
+             ("best_time", "最佳旅游时间: "), ("highlights", "特色: ")),
+    "Region": (("name", "地区: "), ("description", "描述: "))
+}
+
+# 主题级结果名称行总是输出，其余字段同上
+_TOPIC_CONTENT_FIELDS = {
+    "Attraction": ("景点: ", (("description", "描述: "), ("ticket_price", "门票: "))),
+    "City": ("城市: ", (("description", "描述: "), ("best_time", "最佳旅游时间: "))),
+    "Region": ("地区: ", (("description", "描述: "),))
+}
+
+
+def _relevance(result: "RetrievalResult") -> float:
+    """检索结果排序键"""
+    return result.relevance_score
+
+
+def _best_per_node(results: List["RetrievalResult"]) -> List["RetrievalResult"]:
+    """按节点去重，每个节点保留得分最高的一条（同分保留先出现的），结果保持首次出现顺序"""
+    best_by_node: Dict[str, RetrievalResult] = {}
+    for result in results:
+        current = best_by_node.get(result.node_id)
+        if current is None or result.relevance_score > current.relevance_score:
+            best_by_node[result.node_id] = result
+    return list(best_by_node.values())
+
+
+def _content_key(doc: Document) -> int:
+    """
+    没有node_id的文档按正文哈希去重；哈希值缓存在元数据 _doc_key 中，
+    同一文档（包括结果缓存中的副本）再次去重时不必重新哈希整段正文
+    """
+    doc_key = doc.metadata.get("_doc_key")
+    if doc_key is None:
+        doc_key = doc.metadata["_doc_key"] = hash(doc.page_content)
+    return doc_key
+
+
+def _doc_key(doc: Document) -> int:
+    """合并去重用的整数键：有node_id时取其哈希，否则取（缓存的）正文哈希，去重集合中只有int"""
+    node_id = doc.metadata.get("node_id")
+    if node_id is not None:
+        return hash(node_id)
+    return _content_key(doc)
+
+
+def _content_lines(record, fields: Tuple[Tuple[str, str], ...]) -> List[str]:
+    """按模板顺序取出记录中的非空字段，拼成 '前缀值' 形式的内容行"""
+    return [prefix + str(value) for key, prefix in fields if (value := record.get(key))]
+
+
 @dataclass
 class RetrievalResult:
     """检索结果数据结构"""
@@ -26,6 +334,14 @@ class RetrievalResult:
     retrieval_level: str  # 'low' or 'high'
     metadata: Dict[str, Any]
 
+@dataclass(slots=True)
+class RetrievalHit:
+    """混合检索合并阶段的候选：合并只读写这几个固定字段，入选的文档最后才统一写回元数据"""
+    doc_id: int
+    score: float
+    method: str
+    doc: Document
+
 class HybridRetrievalModule:
     """
     混合检索模块
@@ -44,41 +360,171 @@ class HybridRetrievalModule:
         self.llm_client = llm_client
         self.driver = None
         self.bm25_retriever = None
+        self._bm25_docs: List[Document] = []
         
         # 图索引模块
         self.graph_indexing = GraphIndexingModule(config, llm_client)
         self.graph_indexed = False
         self.graph_data_module = None
 
+        # 倒排索引：索引键 -> 实体/关系键值对列表，去重完成后一次性构建
+        self._kw_to_entities: Dict[str, List[Any]] = {}
+        self._kw_to_relations: Dict[str, List[Any]] = {}
+
+        # 本地关键词词典：实体名称 / 实体分类各编译为一个正则，随倒排索引一起构建
+        self._entity_gazetteer_re: Optional[re.Pattern] = None
+        self._topic_gazetteer_re: Optional[re.Pattern] = None
+        # 图数据模块是否由本模块创建（复用外部模块时不负责关闭）
+        self._owns_graph_data_module = False
+
+        # 关键词提取LRU缓存：(模型, 规范化查询) -> (实体关键词, 主题关键词, 写入时间)
+        self._keyword_cache: "OrderedDict[Tuple[str, str], Tuple[List[str], List[str], float]]" = OrderedDict()
+        self._keyword_cache_lock = threading.Lock()
+        self._keyword_cache_hits = 0
+        self._keyword_cache_misses = 0
+
+        # 一跳邻居LRU缓存：(节点ID, 邻居上限) -> 邻居名称元组，图索引重建时清空
+        self._neighbor_cache: "OrderedDict[Tuple[str, int], Tuple[str, ...]]" = OrderedDict()
+        self._neighbor_cache_lock = threading.Lock()
+
+        # 双层检索结果LRU缓存：(模型, 规范化查询, top_k) -> (文档列表, 写入时间)，图索引重建时清空
+        self._result_cache: "OrderedDict[Tuple[str, str, int], Tuple[List[Document], float]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        self._result_cache_hits = 0
+        self._result_cache_misses = 0
+
+        # 常驻检索线程池，避免每次查询都创建和销毁线程；按需创建，close()后置空，重新初始化时重建
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+        self._retrieval_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
     def initialize(self, chunks: List[Document]):
         """初始化检索系统"""
         logger.info("初始化混合检索模块...")
 
+        self._get_search_executor()
+        self._get_retrieval_executor()
+
         # 连接Neo4j
         self.driver = GraphDatabase.driver(
             self.config.neo4j_uri,
-            auth=(self.config.neo4j_user, self.config.neo4j_password)
+            auth=(self.config.neo4j_user, self.config.neo4j_password),
+            max_connection_pool_size=self.config.neo4j_max_pool_size,
+            connection_acquisition_timeout=self.config.neo4j_acquisition_timeout,
+            connection_timeout=self.config.neo4j_connection_timeout,
+            max_connection_lifetime=self.config.neo4j_max_connection_lifetime,
+            keep_alive=True
         )
 
-        # 初始化图数据模块
-        try:
-            from .graph_data_preparation import GraphDataPreparationModule
-            self.graph_data_module = GraphDataPreparationModule(
-                self.config.neo4j_uri,
-                self.config.neo4j_user,
-                self.config.neo4j_password
-            )
-            logger.info("图数据准备模块初始化成功")
-        except Exception as e:
-            logger.warning(f"图数据准备模块初始化失败: {e}")
+        # 确保CONTAINS匹配和nodeId查找有索引可用
+        self._ensure_schema_indexes()
+
+        # 初始化图数据模块：优先复用已连接的数据模块，避免再建一个驱动和连接池
+        if getattr(self.data_module, "driver", None):
+            self.graph_data_module = self.data_module
+            logger.info("复用已有的图数据准备模块")
+        else:
+            try:
+                from .graph_data_preparation import GraphDataPreparationModule
+                self.graph_data_module = GraphDataPreparationModule(
+                    self.config.neo4j_uri,
+                    self.config.neo4j_user,
+                    self.config.neo4j_password,
+                    self.config.neo4j_database
+                )
+                self._owns_graph_data_module = True
+                logger.info("图数据准备模块初始化成功")
+            except Exception as e:
+                logger.warning(f"图数据准备模块初始化失败: {e}")
 
-        # 初始化BM25检索器
+        # 初始化BM25检索器：语料只分词一次，bm25s可用时预先计算好稀疏得分矩阵
         if chunks:
-            self.bm25_retriever = BM25Retriever.from_documents(chunks)
+            self._bm25_docs = list(chunks)
+            if bm25s is not None:
+                self.bm25_retriever = bm25s.BM25()
+                self.bm25_retriever.index(
+                    [self._bm25_tokenize(chunk.page_content) for chunk in self._bm25_docs],
+                    show_progress=False
+                )
+            else:
+                self.bm25_retriever = BM25Retriever.from_documents(self._bm25_docs)
             logger.info(f"BM25检索器初始化完成，文档数量: {len(chunks)}")
 
         # 初始化图索引
         self._build_graph_index()
+
+    def _ensure_schema_indexes(self):
+        """
+        创建补充检索所需的索引，已存在时不做任何操作
+        TEXT索引让 name/description 等属性的CONTAINS走IndexContainsScan，
+        nodeId的RANGE索引同时服务等值查找和关系提取中的 nodeId >= ... 范围过滤
+        """
+        statements = [
+            f"CREATE TEXT INDEX {label.lower()}_{prop}_text IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+            for label, props in TEXT_INDEXED_PROPERTIES.items()
+            for prop in props
+        ]
+        statements.extend(
+            f"CREATE RANGE INDEX {label.lower()}_node_id IF NOT EXISTS FOR (n:{label}) ON (n.nodeId)"
+            for label in NODE_ID_INDEXED_LABELS
+        )
+
+        for statement in statements:
+            try:
+                self.driver.execute_query(
+                    statement,
+                    database_=self.config.neo4j_database,
+                    routing_=RoutingControl.WRITE
+                )
+            except Exception as e:
+                logger.warning(f"索引创建失败: {statement}: {e}")
+
+    @staticmethod
+    def _bm25_tokenize(text: str) -> List[str]:
+        """BM25分词，与BM25Retriever的默认预处理一致（按空白切分）"""
+        return text.split()
+
+    def bm25_topk(self, query: str, k: int = 5) -> List[Document]:
+        """BM25关键词检索，返回得分最高的k个文档块"""
+        if self.bm25_retriever is None:
+            return []
+
+        if bm25s is not None:
+            k = min(k, len(self._bm25_docs))
+            doc_indices, _ = self.bm25_retriever.retrieve(
+                [self._bm25_tokenize(query)], k=k, show_progress=False
+            )
+            return [self._bm25_docs[index] for index in doc_indices[0].tolist()]
+
+        self.bm25_retriever.k = k
+        return self.bm25_retriever.invoke(query)
+
+    def _run_read(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        执行只读查询并返回全部记录
+        driver.execute_query 自动从连接池借还连接、按读路由并重试瞬时错误，无需逐次管理会话；
+        检索只读取导入后不再变化的图数据，不需要因果一致性，关闭书签管理，
+        每次查询不再收发和合并书签，集群下读请求也不必等待副本追上最新写入
+        """
+        return self.driver.execute_query(
+            query,
+            parameters or {},
+            database_=self.config.neo4j_database,
+            routing_=RoutingControl.READ,
+            bookmark_manager_=None
+        ).records
+
+    def _iter_read(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """
+        执行只读查询并逐条产出记录
+        记录按fetch_size分批从服务端拉取，调用方边消费边处理，内存中只保留当前批次；
+        会话在首次迭代时才打开，迭代结束后关闭
+        """
+        with self.driver.session(
+            database=self.config.neo4j_database,
+            default_access_mode=READ_ACCESS
+        ) as session:
+            yield from session.run(query, parameters or {})
         
     def _build_graph_index(self):
         """构建图索引"""
@@ -111,251 +557,330 @@ class HybridRetrievalModule:
                 self._load_entities_from_neo4j()
 
             # 创建关系键值对（这里需要从Neo4j获取关系数据）
-            relationships = self._extract_relationships_from_graph()
-            if relationships:
-                self.graph_indexing.create_relation_key_values(relationships)
+            self.graph_indexing.create_relation_key_values(
+                self._extract_relationships_from_graph()
+            )
 
             # 去重优化
             self.graph_indexing.deduplicate_entities_and_relations()
+            self._build_keyword_index()
 
             self.graph_indexed = True
+            self.clear_neighbor_cache()
+            self.clear_result_cache()
             stats = self.graph_indexing.get_statistics()
             logger.info(f"图索引构建完成: {stats}")
 
         except Exception as e:
             logger.error(f"构建图索引失败: {e}")
 
+    def _build_keyword_index(self):
+        """
+        遍历一次去重后的键值对，构建 索引键 -> 键值对 的倒排索引
+        新字典构建完成后整体替换，检索线程不会读到构建到一半的索引
+        """
+        kw_to_entities: Dict[str, List[Any]] = {}
+        for entity in self.graph_indexing.entity_kv_store.values():
+            for key in entity.index_keys:
+                kw_to_entities.setdefault(key, []).append(entity)
+
+        kw_to_relations: Dict[str, List[Any]] = {}
+        for relation in self.graph_indexing.relation_kv_store.values():
+            for key in relation.index_keys:
+                kw_to_relations.setdefault(key, []).append(relation)
+
+        self._kw_to_entities = kw_to_entities
+        self._kw_to_relations = kw_to_relations
+        logger.info(f"倒排索引构建完成: {len(kw_to_entities)} 个实体键, {len(kw_to_relations)} 个关系键")
+
+        self._build_gazetteers()
+
+    def _build_gazetteers(self):
+        """
+        构建本地关键词词典
+        实体词典取全部实体名称，主题词典取各实体的分类字段（景点类型、美食类型等）；
+        每个词典编译为一个长词优先的正则，一次扫描找出查询中出现的所有词
+        """
+        category_labels = {
+            entity_type: label
+            for entity_type, (_, fields) in ENTITY_SCHEMA.items()
+            for attr_name, label in fields
+            if attr_name == "category"
+        }
+
+        entity_terms = set()
+        topic_terms = set()
+        for entity in self.graph_indexing.entity_kv_store.values():
+            entity_terms.update(entity.index_keys)
+
+            label = category_labels.get(entity.entity_type)
+            if not label:
+                continue
+            for line in entity.value_content.split("\n"):
+                if line.startswith(label):
+                    topic_terms.update(_CATEGORY_SPLIT_RE.split(line[len(label):]))
+                    break
+
+        self._entity_gazetteer_re = self._compile_gazetteer(entity_terms)
+        self._topic_gazetteer_re = self._compile_gazetteer(topic_terms - entity_terms)
+
+    @staticmethod
+    def _compile_gazetteer(terms) -> Optional[re.Pattern]:
+        """把词集合编译为交替正则，长词在前保证优先匹配最长的名称"""
+        terms = sorted(
+            (term for term in terms if term and len(term) >= GAZETTEER_MIN_TERM_LEN),
+            key=len, reverse=True
+        )
+        if not terms:
+            return None
+        return re.compile("|".join(map(re.escape, terms)))
+
+    def _extract_query_keywords_local(self, query: str) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        基于本地词典提取关键词，结果足够可信时返回，否则返回None交给LLM
+        可信条件：实体词和主题词都命中，或短查询命中了至少一个实体词
+        """
+        if self._entity_gazetteer_re is None:
+            return None
+
+        entity_keywords = list(dict.fromkeys(map(sys.intern, self._entity_gazetteer_re.findall(query))))
+        if not entity_keywords:
+            return None
+
+        topic_keywords = []
+        if self._topic_gazetteer_re is not None:
+            topic_keywords = list(dict.fromkeys(map(sys.intern, self._topic_gazetteer_re.findall(query))))
+
+        if topic_keywords or len(query.strip()) <= LOCAL_KEYWORD_MAX_QUERY_LEN:
+            return entity_keywords, topic_keywords
+        return None
+
+    def _lookup_entities(self, keyword: str) -> List[Any]:
+        """按关键词查找实体：命中倒排索引直接返回，否则回退到图索引模块的模糊匹配"""
+        entities = self._kw_to_entities.get(keyword)
+        if entities is not None:
+            return entities
+        return self.graph_indexing.get_entities_by_key(keyword)
+
+    def _lookup_relations(self, keyword: str) -> List[Any]:
+        """按关键词查找关系：命中倒排索引直接返回，否则回退到图索引模块的模糊匹配"""
+        relations = self._kw_to_relations.get(keyword)
+        if relations is not None:
+            return relations
+        return self.graph_indexing.get_relations_by_key(keyword)
+
     def _load_entities_from_neo4j(self):
-        """降级方案：直接从Neo4j加载实体数据"""
+        """
+        降级方案：直接从Neo4j加载实体数据
+        查询结果以生成器形式直接交给索引模块，实体逐条建索引，不再整体收集成列表
+        """
         logger.info("使用降级方案：直接从Neo4j加载实体数据")
 
         try:
-            with self.driver.session() as session:
-                # 加载城市数据
-                city_query = "MATCH (c:City) RETURN c as city_data LIMIT 50"
-                cities_data = []
-                for record in session.run(city_query):
-                    city_data = record["city_data"]
-                    cities_data.append(city_data)
-
-                # 加载景点数据
-                attraction_query = "MATCH (a:Attraction) RETURN a as attraction_data LIMIT 100"
-                attractions_data = []
-                for record in session.run(attraction_query):
-                    attraction_data = record["attraction_data"]
-                    attractions_data.append(attraction_data)
-
-                # 创建实体键值对
-                self.graph_indexing.create_entity_key_values(
-                    cities=cities_data,
-                    attractions=attractions_data
-                )
+            # 创建实体键值对：城市与景点数据按类型依次流式消费，同一时刻只有一个会话打开
+            self.graph_indexing.create_entity_key_values(
+                cities=(record["city_data"] for record in self._iter_read(_CITY_ENTITIES_CYPHER)),
+                attractions=(record["attraction_data"] for record in self._iter_read(_ATTRACTION_ENTITIES_CYPHER))
+            )
 
         except Exception as e:
             logger.error(f"从Neo4j加载实体数据失败: {e}")
             
-    def _extract_relationships_from_graph(self) -> List[Tuple[str, str, str]]:
-        """从Neo4j图中提取关系"""
-        relationships = []
-        
+    def _extract_relationships_from_graph(self) -> Iterator[Tuple[str, str, str]]:
+        """
+        从Neo4j图中提取关系
+        以生成器逐条产出 (source_id, relation_type, target_id)，查询出错时记录日志并停止产出
+        """
         try:
-            with self.driver.session() as session:
-                query = """
-                MATCH (source)-[r]->(target)
-                WHERE source.nodeId >= '200000000' OR target.nodeId >= '200000000'
-                RETURN source.nodeId as source_id, type(r) as relation_type, target.nodeId as target_id
-                LIMIT 1000
-                """
-                result = session.run(query)
-                
-                for record in result:
-                    relationships.append((
-                        record["source_id"],
-                        record["relation_type"],
-                        record["target_id"]
-                    ))
-                    
+            for record in self._iter_read(_GRAPH_RELATIONSHIPS_CYPHER):
+                yield (
+                    record["source_id"],
+                    record["relation_type"],
+                    record["target_id"]
+                )
+
         except Exception as e:
             logger.error(f"提取图关系失败: {e}")
             
-        return relationships
-            
     def extract_query_keywords(self, query: str) -> Tuple[List[str], List[str]]:
         """
         提取查询关键词：实体级 + 主题级
+        按 (模型, 规范化查询) 缓存LLM提取结果，相同查询在过期前不再调用LLM；
+        本地词典能可靠提取时（短查询、实体与主题都命中）直接返回，不调用LLM
         """
-        prompt = f"""
-        作为旅游知识助手，请分析以下查询并提取关键词，分为两个层次：
-
-        查询：{query}
-
-        提取规则：
-        1. 实体级关键词：具体的地点、景点、城市、酒店、餐厅、特产、建筑等有形实体
-           - 例如：故宫、长城、北京、布达拉宫、香格里拉、天安门、东方明珠
-           - 对于抽象查询，推测相关的具体地点/景点
-
-        2. 主题级关键词：抽象概念、旅游主题、活动类型、旅游风格、季节等
-           - 例如：历史古迹、自然风光、美食之旅、亲子游、探险、浪漫、文化体验
-           - 排除动作词：推荐、介绍、怎么去、路线规划等
-
-        示例：
-        查询："推荐几个历史古迹"
-        {{
-            "entity_keywords": ["故宫", "天坛", "明十三陵", "颐和园", "长城"],
-            "topic_keywords": ["历史古迹", "皇城", "古建筑", "文化遗产", "明清"]
-        }}
-
-        查询："北京有什么好玩的地方"
-        {{
-            "entity_keywords": ["故宫", "长城", "天安门", "颐和园", "北海公园"],
-            "topic_keywords": ["旅游景点", "北京", "必去景点", "历史文化", "皇家园林"]
-        }}
-
-        查询："西藏旅游最佳时间"
-        {{
-            "entity_keywords": ["布达拉宫", "纳木错", "珠峰", "拉萨", "林芝"],
-            "topic_keywords": ["西藏", "最佳旅游时间", "高海拔", "藏文化", "自然风光"]
-        }}
-
-        请严格按照JSON格式返回，不要包含多余的文字：
-        {{
-            "entity_keywords": ["实体1", "实体2", ...],
-            "topic_keywords": ["主题1", "主题2", ...]
-        }}
-        """
-        
+        # 关键词统一驻留，与图索引中驻留的索引键做字典查找时可按指针比较
+        local = self._extract_query_keywords_local(query)
+        if local is not None:
+            logger.info("关键词提取命中本地词典 - 实体级: %s, 主题级: %s", local[0], local[1])
+            return local
+
+        cache_key = (self.config.llm_model, " ".join(query.lower().split()))
+        cached = self._get_cached_keywords(cache_key)
+        if cached is not None:
+            logger.info("关键词提取命中缓存 - 实体级: %s, 主题级: %s", cached[0], cached[1])
+            return cached
+
         try:
-            response = self.llm_client.chat.completions.create(
-                model=self.config.llm_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=500
-            )
-            
-            # 获取响应内容
-            content = response.choices[0].message.content
-            if not content:
-                raise ValueError("LLM 返回空响应")
-            
-            content = content.strip()
-            
-            # 清理 markdown 代码块
-            if content.startswith("```"):
-                # 移除开头的 ```json 或 ```
-                lines = content.split("\n")
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                # 移除结尾的 ```
-                if lines and lines[-1].strip() == "```":
-                    lines = lines[:-1]
-                content = "\n".join(lines).strip()
-            
-            result = json.loads(content)
-            entity_keywords = result.get("entity_keywords", [])
-            topic_keywords = result.get("topic_keywords", [])
-            
-            logger.info(f"关键词提取完成 - 实体级: {entity_keywords}, 主题级: {topic_keywords}")
-            return entity_keywords, topic_keywords
-            
+            entity_keywords, topic_keywords = self._extract_query_keywords_llm(query)
+            entity_keywords = [sys.intern(keyword) for keyword in entity_keywords if isinstance(keyword, str)]
+            topic_keywords = [sys.intern(keyword) for keyword in topic_keywords if isinstance(keyword, str)]
         except Exception as e:
             logger.error(f"关键词提取失败: {e}")
-            # 降级方案：简单的关键词分割
+            # 降级方案：简单的关键词分割（降级结果不缓存）
             keywords = query.split()
             return keywords[:3], keywords[3:6] if len(keywords) > 3 else keywords
+
+        with self._keyword_cache_lock:
+            self._keyword_cache[cache_key] = (entity_keywords, topic_keywords, time.monotonic())
+            self._keyword_cache.move_to_end(cache_key)
+            while len(self._keyword_cache) > KEYWORD_CACHE_SIZE:
+                self._keyword_cache.popitem(last=False)
+
+        logger.info("关键词提取完成 - 实体级: %s, 主题级: %s", entity_keywords, topic_keywords)
+        return entity_keywords, topic_keywords
+
+    def _get_cached_keywords(self, cache_key: Tuple[str, str]) -> Optional[Tuple[List[str], List[str]]]:
+        """读取未过期的关键词缓存，命中时刷新LRU顺序"""
+        with self._keyword_cache_lock:
+            entry = self._keyword_cache.get(cache_key)
+            if entry is not None and time.monotonic() - entry[2] > KEYWORD_CACHE_TTL:
+                del self._keyword_cache[cache_key]
+                entry = None
+
+            if entry is None:
+                self._keyword_cache_misses += 1
+                return None
+
+            self._keyword_cache.move_to_end(cache_key)
+            self._keyword_cache_hits += 1
+            # 返回副本，调用方修改列表不影响缓存
+            return list(entry[0]), list(entry[1])
+
+    def keyword_cache_stats(self) -> Dict[str, int]:
+        """关键词缓存统计"""
+        with self._keyword_cache_lock:
+            return {
+                "hits": self._keyword_cache_hits,
+                "misses": self._keyword_cache_misses,
+                "size": len(self._keyword_cache),
+                "max_size": KEYWORD_CACHE_SIZE
+            }
+
+    def clear_keyword_cache(self):
+        """清空关键词缓存（更换模型或提示词后调用）"""
+        with self._keyword_cache_lock:
+            self._keyword_cache.clear()
+            self._keyword_cache_hits = 0
+            self._keyword_cache_misses = 0
+        logger.info("关键词提取缓存已清空")
+
+    def _extract_query_keywords_llm(self, query: str) -> Tuple[List[str], List[str]]:
+        """调用LLM提取关键词，失败时抛出异常"""
+        prompt = _KEYWORD_PROMPT_TEMPLATE.format(query=query)
+        
+        response = self.llm_client.chat.completions.create(
+            model=self.config.llm_model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=500
+        )
+        
+        # 获取响应内容
+        content = response.choices[0].message.content
+        if not content:
+            raise ValueError("LLM 返回空响应")
+        
+        content = content.strip()
+        
+        # 清理 markdown 代码块
+        if content.startswith("```"):
+            content = _CODE_FENCE_RE.sub("", content).strip()
+        
+        result = _json_loads(content)
+        return result.get("entity_keywords", []), result.get("topic_keywords", [])
     
     def entity_level_retrieval(self, entity_keywords: List[str], top_k: int = 5) -> List[RetrievalResult]:
         """
         实体级检索：专注于具体实体和关系
         使用图索引的键值对结构进行检索
         """
+        # 1. 图索引检索（已按节点去重）
+        results = self._entity_index_results(entity_keywords)
+
+        # 2. 如果去重后的图索引结果不足，使用Neo4j进行补充检索
+        if len(results) < top_k:
+            neo4j_results = self._neo4j_entity_level_search(entity_keywords, top_k - len(results))
+            results = _best_per_node(results + neo4j_results)
+            
+        # 3. 按相关性取前top_k个返回
+        results = heapq.nlargest(top_k, results, key=_relevance)
+        
+        logger.info("实体级检索完成，返回 %d 个结果", len(results))
+        return results
+
+    def _entity_index_results(self, entity_keywords: List[str]) -> List[RetrievalResult]:
+        """实体级检索中基于图索引的部分"""
         results = []
         
-        # 1. 使用图索引进行实体检索
+        # 1. 使用图索引进行实体检索：先收集所有匹配实体（同一节点被多个关键词命中时只保留首次匹配，
+        #    得分相同），再一次性批量查询邻居
+        matched_by_node: Dict[str, Tuple[str, Any]] = {}
         for keyword in entity_keywords:
-            # 检索匹配的实体
-            entities = self.graph_indexing.get_entities_by_key(keyword)
+            for entity in self._lookup_entities(keyword):
+                matched_by_node.setdefault(entity.metadata["node_id"], (keyword, entity))
+        matched = list(matched_by_node.values())
+        neighbors_by_id = self._batch_get_neighbors(
+            [entity.metadata["node_id"] for _, entity in matched], max_neighbors=2
+        )
+
+        for keyword, entity in matched:
+            neighbors = neighbors_by_id.get(entity.metadata["node_id"])
             
-            for entity in entities:
-                # 获取邻居信息
-                neighbors = self._get_node_neighbors(entity.metadata["node_id"], max_neighbors=2)
-                
-                # 构建增强内容
-                enhanced_content = entity.value_content
-                if neighbors:
-                    enhanced_content += f"\n相关信息: {', '.join(neighbors)}"
-                
-                results.append(RetrievalResult(
-                    content=enhanced_content,
-                    node_id=entity.metadata["node_id"],
-                    node_type=entity.entity_type,
-                    relevance_score=0.9,  # 精确匹配得分较高
-                    retrieval_level="entity",
-                    metadata={
-                        "entity_name": entity.entity_name,
-                        "entity_type": entity.entity_type,
-                        "index_keys": entity.index_keys,
-                        "matched_keyword": keyword
-                    }
-                ))
-        
-        # 2. 如果图索引结果不足，使用Neo4j进行补充检索
-        if len(results) < top_k:
-            neo4j_results = self._neo4j_entity_level_search(entity_keywords, top_k - len(results))
-            results.extend(neo4j_results)
+            # 构建增强内容
+            enhanced_content = entity.value_content
+            if neighbors:
+                enhanced_content += f"\n相关信息: {', '.join(neighbors)}"
             
-        # 3. 按相关性排序并返回
-        results.sort(key=lambda x: x.relevance_score, reverse=True)
-        
-        logger.info(f"实体级检索完成，返回 {len(results)} 个结果")
-        return results[:top_k]
+            results.append(RetrievalResult(
+                content=enhanced_content,
+                node_id=entity.metadata["node_id"],
+                node_type=entity.entity_type,
+                relevance_score=0.9,  # 精确匹配得分较高
+                retrieval_level="entity",
+                metadata={
+                    "entity_name": entity.entity_name,
+                    "entity_type": entity.entity_type,
+                    "index_keys": entity.index_keys,
+                    "matched_keyword": keyword
+                }
+            ))
+
+        return results
     
     def _neo4j_entity_level_search(self, keywords: List[str], limit: int) -> List[RetrievalResult]:
         """Neo4j补充检索 - 使用 CONTAINS 查询，不依赖全文索引"""
         results = []
 
         try:
-            with self.driver.session() as session:
-                # 使用简单的 CONTAINS 查询，不依赖全文索引
-                cypher_query = """
-                UNWIND $keywords as keyword
-                // 搜索景点
-                OPTIONAL MATCH (a:Attraction)
-                WHERE a.name CONTAINS keyword OR a.description CONTAINS keyword
-                WITH keyword, collect(DISTINCT a)[0..$per_type_limit] as attractions
-                
-                // 搜索城市
-                OPTIONAL MATCH (c:City)
-                WHERE c.name CONTAINS keyword OR c.description CONTAINS keyword
-                WITH keyword, attractions, collect(DISTINCT c)[0..$per_type_limit] as cities
-                
-                // 搜索地区
-                OPTIONAL MATCH (r:Region)
-                WHERE r.name CONTAINS keyword OR r.description CONTAINS keyword
-                WITH keyword, attractions, cities, collect(DISTINCT r)[0..$per_type_limit] as regions
-                
-                // 合并结果
-                UNWIND attractions + cities + regions as node
-                WHERE node IS NOT NULL
-                RETURN DISTINCT
-                    node.nodeId as node_id,
-                    node.name as name,
-                    node.description as description,
-                    node.category as category,
-                    node.ticket_price as ticket_price,
-                    node.address as address,
-                    node.best_time as best_time,
-                    node.highlights as highlights,
-                    labels(node) as labels,
-                    head(labels(node)) as node_type,
-                    keyword as matched_keyword,
-                    1.0 as score
-                LIMIT $limit
-                """
-
-                result = session.run(cypher_query, {
+            # 使用简单的 CONTAINS 查询，不依赖全文索引
+            result = self._run_read(_ENTITY_SUPPLEMENT_CYPHER, {
+                "entity_keywords": keywords,
+                "entity_limit": limit,
+                "per_type_limit": max(3, limit // 3)
+            })
+
+            for record in result:
+                retrieval_result = self._entity_supplement_result(record, len(results))
+                if retrieval_result:
+                    results.append(retrieval_result)
+
+        except Exception as e:
+            logger.warning(f"Neo4j CONTAINS 检索失败: {e}，尝试降级方案")
+            # 降级方案：更简单的查询
+            try:
+                result = self._run_read(_ENTITY_FALLBACK_CYPHER, {
                     "keywords": keywords,
-                    "limit": limit,
-                    "per_type_limit": max(3, limit // 3)
+                    "limit": limit
                 })
 
                 for record in result:
@@ -363,335 +888,336 @@ class HybridRetrievalModule:
                     node_type = record["node_type"]
 
                     if node_type == "Attraction":
-                        if record["name"]:
-                            content_parts.append(f"景点: {record['name']}")
-                        if record["category"]:
-                            content_parts.append(f"类型: {record['category']}")
-                        if record["description"]:
-                            content_parts.append(f"描述: {record['description']}")
-                        if record["ticket_price"]:
-                            content_parts.append(f"门票: {record['ticket_price']}")
-                        if record["address"]:
-                            content_parts.append(f"地址: {record['address']}")
+                        content_parts.append(f"景点: {record['name']}")
                     elif node_type == "City":
-                        if record["name"]:
-                            content_parts.append(f"城市: {record['name']}")
-                        if record["description"]:
-                            content_parts.append(f"描述: {record['description']}")
-                        if record["best_time"]:
-                            content_parts.append(f"最佳旅游时间: {record['best_time']}")
-                        if record["highlights"]:
-                            content_parts.append(f"特色: {record['highlights']}")
+                        content_parts.append(f"城市: {record['name']}")
                     elif node_type == "Region":
-                        if record["name"]:
-                            content_parts.append(f"地区: {record['name']}")
-                        if record["description"]:
-                            content_parts.append(f"描述: {record['description']}")
+                        content_parts.append(f"地区: {record['name']}")
+                    
+                    if record["description"]:
+                        content_parts.append(f"描述: {record['description']}")
 
                     if content_parts:
                         results.append(RetrievalResult(
                             content='\n'.join(content_parts),
-                            node_id=record["node_id"] or f"unknown_{len(results)}",
+                            node_id=record["node_id"] or f"fallback_{len(results)}",
                             node_type=node_type,
-                            relevance_score=0.7,
+                            relevance_score=0.6,
                             retrieval_level="entity",
                             metadata={
                                 "name": record["name"],
-                                "category": record.get("category"),
-                                "description": record.get("description"),
-                                "ticket_price": record.get("ticket_price"),
                                 "labels": record["labels"],
-                                "matched_keyword": record["matched_keyword"],
-                                "source": "neo4j_contains"
+                                "source": "neo4j_fallback_simple"
                             }
                         ))
-
-        except Exception as e:
-            logger.warning(f"Neo4j CONTAINS 检索失败: {e}，尝试降级方案")
-            # 降级方案：更简单的查询
-            try:
-                with self.driver.session() as session:
-                    fallback_query = """
-                    UNWIND $keywords as keyword
-                    MATCH (n)
-                    WHERE (n:City OR n:Attraction OR n:Region)
-                      AND n.name CONTAINS keyword
-                    RETURN DISTINCT
-                        n.nodeId as node_id,
-                        n.name as name,
-                        n.description as description,
-                        labels(n) as labels,
-                        head(labels(n)) as node_type
-                    LIMIT $limit
-                    """
-
-                    result = session.run(fallback_query, {
-                        "keywords": keywords,
-                        "limit": limit
-                    })
-
-                    for record in result:
-                        content_parts = []
-                        node_type = record["node_type"]
-
-                        if node_type == "Attraction":
-                            content_parts.append(f"景点: {record['name']}")
-                        elif node_type == "City":
-                            content_parts.append(f"城市: {record['name']}")
-                        elif node_type == "Region":
-                            content_parts.append(f"地区: {record['name']}")
-                        
-                        if record["description"]:
-                            content_parts.append(f"描述: {record['description']}")
-
-                        if content_parts:
-                            results.append(RetrievalResult(
-                                content='\n'.join(content_parts),
-                                node_id=record["node_id"] or f"fallback_{len(results)}",
-                                node_type=node_type,
-                                relevance_score=0.6,
-                                retrieval_level="entity",
-                                metadata={
-                                    "name": record["name"],
-                                    "labels": record["labels"],
-                                    "source": "neo4j_fallback_simple"
-                                }
-                            ))
             except Exception as e2:
                 logger.error(f"Neo4j降级检索也失败: {e2}")
 
         return results
     
+    def _entity_supplement_result(self, record, index: int) -> Optional[RetrievalResult]:
+        """把实体级补充检索的一行结果组装为检索结果，没有可展示内容时返回None"""
+        node_type = record["node_type"]
+        content_parts = _content_lines(record, _ENTITY_CONTENT_FIELDS.get(node_type, ()))
+
+        if not content_parts:
+            return None
+
+        return RetrievalResult(
+            content='\n'.join(content_parts),
+            node_id=record["node_id"] or f"unknown_{index}",
+            node_type=node_type,
+            relevance_score=0.7,
+            retrieval_level="entity",
+            metadata={
+                "name": record["name"],
+                "category": record.get("category"),
+                "description": record.get("description"),
+                "ticket_price": record.get("ticket_price"),
+                "labels": record["labels"],
+                "matched_keyword": record["matched_keyword"],
+                "source": "neo4j_contains"
+            }
+        )
+
     def topic_level_retrieval(self, topic_keywords: List[str], top_k: int = 5) -> List[RetrievalResult]:
         """
         主题级检索：专注于广泛主题和概念
         使用图索引的关系键值对结构进行主题检索
         """
-        results = []
-        
-        # 1. 使用图索引进行关系/主题检索
-        for keyword in topic_keywords:
-            # 检索匹配的关系
-            relations = self.graph_indexing.get_relations_by_key(keyword)
-            
-            for relation in relations:
-                # 获取相关实体信息
-                source_entity = self.graph_indexing.entity_kv_store.get(relation.source_entity)
-                target_entity = self.graph_indexing.entity_kv_store.get(relation.target_entity)
-                
-                if source_entity and target_entity:
-                    # 构建丰富的主题内容
-                    content_parts = [
-                        f"主题: {keyword}",
-                        relation.value_content,
-                        f"相关菜品: {source_entity.entity_name}",
-                        f"相关信息: {target_entity.entity_name}"
-                    ]
-                    
-                    # 添加源实体的详细信息
-                    if source_entity.entity_type in ["Attraction", "City", "Region"]:
-                        newline = '\n'
-                        content_parts.append(f"详情: {source_entity.value_content.split(newline)[0]}")
-                    
-                    results.append(RetrievalResult(
-                        content='\n'.join(content_parts),
-                        node_id=relation.source_entity,  # 以主要实体为ID
-                        node_type=source_entity.entity_type,
-                        relevance_score=0.95,  # 主题匹配得分
-                        retrieval_level="topic",
-                        metadata={
-                            "relation_id": relation.relation_id,
-                            "relation_type": relation.relation_type,
-                            "source_name": source_entity.entity_name,
-                            "target_name": target_entity.entity_name,
-                            "matched_keyword": keyword,
-                            "index_keys": relation.index_keys
-                        }
-                    ))
-        
-        # 2. 使用实体的分类信息进行主题检索
-        for keyword in topic_keywords:
-            entities = self.graph_indexing.get_entities_by_key(keyword)
-            for entity in entities:
-                if entity.entity_type in ["Attraction", "City", "Region", "Food", "Hotel"]:
-                    # 构建分类主题内容
-                    content_parts = [
-                        f"主题分类: {keyword}",
-                        entity.value_content
-                    ]
-
-                    results.append(RetrievalResult(
-                        content='\n'.join(content_parts),
-                        node_id=entity.metadata["node_id"],
-                        node_type=entity.entity_type,
-                        relevance_score=0.85,  # 分类匹配得分
-                        retrieval_level="topic",
-                        metadata={
-                            "entity_name": entity.entity_name,
-                            "entity_type": entity.entity_type,
-                            "matched_keyword": keyword,
-                            "source": "category_match"
-                        }
-                    ))
-        
-        # 3. 如果结果不足，使用Neo4j进行补充检索
+        # 1-2. 图索引检索（关系匹配 + 分类匹配，已按节点去重）
+        results = self._topic_index_results(topic_keywords)
+
+        # 3. 如果去重后的结果不足，使用Neo4j进行补充检索
         if len(results) < top_k:
             neo4j_results = self._neo4j_topic_level_search(topic_keywords, top_k - len(results))
-            results.extend(neo4j_results)
+            results = _best_per_node(results + neo4j_results)
             
-        # 4. 按相关性排序并返回
-        results.sort(key=lambda x: x.relevance_score, reverse=True)
+        # 4. 按相关性取前top_k个返回
+        results = heapq.nlargest(top_k, results, key=_relevance)
         
-        logger.info(f"主题级检索完成，返回 {len(results)} 个结果")
-        return results[:top_k]
-    
-    def _neo4j_topic_level_search(self, keywords: List[str], limit: int) -> List[RetrievalResult]:
-        """Neo4j主题级检索补充"""
+        logger.info("主题级检索完成，返回 %d 个结果", len(results))
+        return results
+
+    def _topic_index_results(self, topic_keywords: List[str]) -> List[RetrievalResult]:
+        """
+        主题级检索中基于图索引的部分（关系匹配 + 实体分类匹配）
+        同一节点只生成一条结果：关系匹配得分高于分类匹配，先处理关系，已产出的节点在后续匹配中直接跳过
+        """
         results = []
+        seen_nodes = set()
+        entity_store = self.graph_indexing.entity_kv_store
 
-        try:
-            with self.driver.session() as session:
-                cypher_query = """
-                UNWIND $keywords as keyword
-                // 搜索景点
-                MATCH (a:Attraction)
-                WHERE a.category CONTAINS keyword
-                WITH a, 'Attraction' as node_type, a.category as category_info, keyword
-                OPTIONAL MATCH (a)-[:HAS_ATTRACTION]->(sub_attraction:Attraction)
-                WITH a, node_type, category_info, keyword, collect(sub_attraction.name)[0..3] as related_attractions
-                RETURN
-                    a.nodeId as node_id,
-                    a.name as name,
-                    node_type as node_type,
-                    category_info as category_info,
-                    a.description as description,
-                    a.ticket_price as ticket_price,
-                    a.best_time as best_time,
-                    related_attractions,
-                    keyword as matched_keyword
-                UNION ALL
-                UNWIND $keywords as keyword
-                // 搜索城市
-                MATCH (c:City)
-                WHERE c.highlights CONTAINS keyword OR c.description CONTAINS keyword
-                WITH c, 'City' as node_type, '旅游城市' as category_info, keyword
-                OPTIONAL MATCH (c)-[:HAS_ATTRACTION]->(a:Attraction)
-                WITH c, node_type, category_info, keyword, collect(a.name)[0..3] as related_attractions
-                RETURN
-                    c.nodeId as node_id,
-                    c.name as name,
-                    node_type as node_type,
-                    category_info as category_info,
-                    c.description as description,
-                    c.ticket_price as ticket_price,
-                    c.best_time as best_time,
-                    related_attractions,
-                    keyword as matched_keyword
-                UNION ALL
-                UNWIND $keywords as keyword
-                // 搜索地区
-                MATCH (r:Region)
-                WHERE r.description CONTAINS keyword OR r.highlights CONTAINS keyword
-                WITH r, 'Region' as node_type, '旅游地区' as category_info, keyword
-                OPTIONAL MATCH (r)-[:HAS_ATTRACTION]->(a:Attraction)
-                WITH r, node_type, category_info, keyword, collect(a.name)[0..3] as related_attractions
-                RETURN
-                    r.nodeId as node_id,
-                    r.name as name,
-                    node_type as node_type,
-                    category_info as category_info,
-                    r.description as description,
-                    r.ticket_price as ticket_price,
-                    r.best_time as best_time,
-                    related_attractions,
-                    keyword as matched_keyword
-                ORDER BY name
-                LIMIT $limit
-                """
-
-                result = session.run(cypher_query, {
-                    "keywords": keywords,
-                    "limit": limit
-                })
+        # 1. 使用图索引进行关系/主题检索：先收集全部命中关系，再一次性取出涉及的实体
+        matched_relations = [
+            (keyword, relation)
+            for keyword in topic_keywords
+            for relation in self._lookup_relations(keyword)
+        ]
+        needed_ids = {relation.source_entity for _, relation in matched_relations}
+        needed_ids.update(relation.target_entity for _, relation in matched_relations)
+        entities_by_id = {entity_id: entity_store.get(entity_id) for entity_id in needed_ids}
 
-                for record in result:
-                    content_parts = []
-                    node_type = record["node_type"]
+        for keyword, relation in matched_relations:
+            if relation.source_entity in seen_nodes:
+                continue
 
-                    if node_type == "Attraction":
-                        content_parts.append(f"景点: {record['name']}")
-                        if record.get("description"):
-                            content_parts.append(f"描述: {record['description']}")
-                        if record.get("ticket_price"):
-                            content_parts.append(f"门票: {record['ticket_price']}")
-                    elif node_type == "City":
-                        content_parts.append(f"城市: {record['name']}")
-                        if record.get("description"):
-                            content_parts.append(f"描述: {record['description']}")
-                        if record.get("best_time"):
-                            content_parts.append(f"最佳旅游时间: {record['best_time']}")
-                    elif node_type == "Region":
-                        content_parts.append(f"地区: {record['name']}")
-                        if record.get("description"):
-                            content_parts.append(f"描述: {record['description']}")
+            # 获取相关实体信息
+            source_entity = entities_by_id[relation.source_entity]
+            target_entity = entities_by_id[relation.target_entity]
+            if not source_entity or not target_entity:
+                continue
 
-                    if record.get("category_info"):
-                        content_parts.append(f"类别: {record['category_info']}")
+            # 构建丰富的主题内容
+            content_parts = [
+                f"主题: {keyword}",
+                relation.value_content,
+                f"相关菜品: {source_entity.entity_name}",
+                f"相关信息: {target_entity.entity_name}"
+            ]
 
-                    if record.get("related_attractions"):
-                        attractions_str = ', '.join([a for a in record["related_attractions"] if a])
-                        if attractions_str:
-                            content_parts.append(f"相关景点: {attractions_str}")
+            # 添加源实体的详细信息
+            if source_entity.entity_type in ("Attraction", "City", "Region"):
+                summary_line = source_entity.value_content.partition("\n")[0]
+                content_parts.append(f"详情: {summary_line}")
 
-                    if content_parts:
-                        results.append(RetrievalResult(
-                            content='\n'.join(content_parts),
-                            node_id=record.get("node_id") or f"topic_{len(results)}",
-                            node_type=node_type,
-                            relevance_score=0.75,
-                            retrieval_level="topic",
-                            metadata={
-                                "name": record.get("name"),
-                                "category": record.get("category_info"),
-                                "description": record.get("description"),
-                                "matched_keyword": record.get("matched_keyword"),
-                                "source": "neo4j_topic"
-                            }
-                        ))
-                    
+            seen_nodes.add(relation.source_entity)
+            results.append(RetrievalResult(
+                content='\n'.join(content_parts),
+                node_id=relation.source_entity,  # 以主要实体为ID
+                node_type=source_entity.entity_type,
+                relevance_score=0.95,  # 主题匹配得分
+                retrieval_level="topic",
+                metadata={
+                    "relation_id": relation.relation_id,
+                    "relation_type": relation.relation_type,
+                    "source_name": source_entity.entity_name,
+                    "target_name": target_entity.entity_name,
+                    "matched_keyword": keyword,
+                    "index_keys": relation.index_keys
+                }
+            ))
+
+        # 2. 使用实体的分类信息进行主题检索（跳过已由关系匹配产出的节点）
+        for keyword in topic_keywords:
+            for entity in self._lookup_entities(keyword):
+                node_id = entity.metadata["node_id"]
+                if node_id in seen_nodes or entity.entity_type not in ("Attraction", "City", "Region", "Food", "Hotel"):
+                    continue
+
+                seen_nodes.add(node_id)
+                results.append(RetrievalResult(
+                    content=f"主题分类: {keyword}\n{entity.value_content}",
+                    node_id=node_id,
+                    node_type=entity.entity_type,
+                    relevance_score=0.85,  # 分类匹配得分
+                    retrieval_level="topic",
+                    metadata={
+                        "entity_name": entity.entity_name,
+                        "entity_type": entity.entity_type,
+                        "matched_keyword": keyword,
+                        "source": "category_match"
+                    }
+                ))
+
+        return results
+    
+    def _neo4j_topic_level_search(self, keywords: List[str], limit: int) -> List[RetrievalResult]:
+        """Neo4j主题级检索补充"""
+        results = []
+
+        try:
+            result = self._run_read(_TOPIC_SUPPLEMENT_CYPHER, {
+                "topic_keywords": keywords,
+                "topic_limit": limit
+            })
+
+            for record in result:
+                retrieval_result = self._topic_supplement_result(record, len(results))
+                if retrieval_result:
+                    results.append(retrieval_result)
+                
         except Exception as e:
             logger.error(f"Neo4j主题级检索失败: {e}")
             
         return results
         
+    def _topic_supplement_result(self, record, index: int) -> Optional[RetrievalResult]:
+        """把主题级补充检索的一行结果组装为检索结果，没有可展示内容时返回None"""
+        content_parts = []
+        node_type = record["node_type"]
+
+        content_template = _TOPIC_CONTENT_FIELDS.get(node_type)
+        if content_template:
+            name_prefix, fields = content_template
+            content_parts.append(f"{name_prefix}{record['name']}")
+            content_parts.extend(_content_lines(record, fields))
+
+        if record.get("category_info"):
+            content_parts.append(f"类别: {record['category_info']}")
+
+        if record.get("related_attractions"):
+            attractions_str = ', '.join([a for a in record["related_attractions"] if a])
+            if attractions_str:
+                content_parts.append(f"相关景点: {attractions_str}")
+
+        if not content_parts:
+            return None
+
+        return RetrievalResult(
+            content='\n'.join(content_parts),
+            node_id=record.get("node_id") or f"topic_{index}",
+            node_type=node_type,
+            relevance_score=0.75,
+            retrieval_level="topic",
+            metadata={
+                "name": record.get("name"),
+                "category": record.get("category_info"),
+                "description": record.get("description"),
+                "matched_keyword": record.get("matched_keyword"),
+                "source": "neo4j_topic"
+            }
+        )
+
+    def _neo4j_supplementary_search(self, entity_keywords: List[str], topic_keywords: List[str],
+                                    entity_limit: int, topic_limit: int) -> Tuple[List[RetrievalResult], List[RetrievalResult]]:
+        """
+        实体级和主题级补充检索合并为一次Neo4j往返，按 level 列拆分结果
+        合并查询失败时退回两次独立查询（各自带降级方案）
+        """
+        entity_limit, topic_limit = max(entity_limit, 0), max(topic_limit, 0)
+        if not entity_limit and not topic_limit:
+            return [], []
+
+        entity_results, topic_results = [], []
+        try:
+            result = self._run_read(_SUPPLEMENTARY_SEARCH_CYPHER, {
+                "entity_keywords": entity_keywords if entity_limit else [],
+                "topic_keywords": topic_keywords if topic_limit else [],
+                "entity_limit": entity_limit,
+                "topic_limit": topic_limit,
+                "per_type_limit": max(3, entity_limit // 3)
+            })
+
+            for record in result:
+                if record["level"] == "entity":
+                    retrieval_result = self._entity_supplement_result(record["row"], len(entity_results))
+                    if retrieval_result:
+                        entity_results.append(retrieval_result)
+                else:
+                    retrieval_result = self._topic_supplement_result(record["row"], len(topic_results))
+                    if retrieval_result:
+                        topic_results.append(retrieval_result)
+
+        except Exception as e:
+            logger.warning(f"Neo4j合并补充检索失败: {e}，改为分别检索")
+            entity_results = self._neo4j_entity_level_search(entity_keywords, entity_limit) if entity_limit else []
+            topic_results = self._neo4j_topic_level_search(topic_keywords, topic_limit) if topic_limit else []
+
+        return entity_results, topic_results
+
+    @staticmethod
+    def _copy_documents(documents: List[Document]) -> List[Document]:
+        """复制文档列表（元数据浅拷贝），调用方后续修改元数据不会影响缓存"""
+        return [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in documents]
+
     def dual_level_retrieval(self, query: str, top_k: int = 5) -> List[Document]:
         """
         双层检索：结合实体级和主题级检索
+        按 (模型, 规范化查询, top_k) 缓存最终文档列表，命中时直接返回副本
         """
-        logger.info(f"开始双层检索: {query}")
+        cache_key = (self.config.llm_model, " ".join(query.lower().split()), top_k)
+        with self._result_cache_lock:
+            entry = self._result_cache.get(cache_key)
+            if entry is not None and time.monotonic() - entry[1] > RESULT_CACHE_TTL:
+                del self._result_cache[cache_key]
+                entry = None
+
+            if entry is None:
+                self._result_cache_misses += 1
+            else:
+                self._result_cache.move_to_end(cache_key)
+                self._result_cache_hits += 1
+
+        if entry is not None:
+            logger.info("双层检索命中结果缓存: %s", query)
+            return self._copy_documents(entry[0])
+
+        documents = self._dual_level_retrieval_uncached(query, top_k)
+
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = (self._copy_documents(documents), time.monotonic())
+            self._result_cache.move_to_end(cache_key)
+            while len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+
+        return documents
+
+    def result_cache_stats(self) -> Dict[str, int]:
+        """双层检索结果缓存统计"""
+        with self._result_cache_lock:
+            return {
+                "hits": self._result_cache_hits,
+                "misses": self._result_cache_misses,
+                "size": len(self._result_cache),
+                "max_size": RESULT_CACHE_SIZE
+            }
+
+    def clear_result_cache(self):
+        """清空双层检索结果缓存（图数据写入或图索引重建后调用）"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+            self._result_cache_hits = 0
+            self._result_cache_misses = 0
+
+    def _dual_level_retrieval_uncached(self, query: str, top_k: int) -> List[Document]:
+        """双层检索的完整流程：关键词提取 -> 实体级/主题级检索 -> 合并去重"""
+        logger.info("开始双层检索: %s", query)
         
         # 1. 提取关键词
         entity_keywords, topic_keywords = self.extract_query_keywords(query)
         
-        # 2. 执行双层检索
-        entity_results = self.entity_level_retrieval(entity_keywords, top_k)
-        topic_results = self.topic_level_retrieval(topic_keywords, top_k)
-        
-        # 3. 结果合并和排序
-        all_results = entity_results + topic_results
-        
-        # 4. 去重和重排序
-        seen_nodes = set()
-        unique_results = []
+        # 2. 执行双层检索：两层的图索引检索（实体级含邻居查询）与合并后的Neo4j补充检索三路并发。
+        #    补充检索不再等待索引结果数量，直接按top_k取数：索引结果得分均高于补充结果，
+        #    排序截断后与“只补足差额”的结果一致，只是多取几行换一次往返的延迟
+        #    补充检索在当前线程执行，另外两路提交到常驻线程池
+        retrieval_executor = self._get_retrieval_executor()
+        entity_future = retrieval_executor.submit(self._entity_index_results, entity_keywords)
+        topic_future = retrieval_executor.submit(self._topic_index_results, topic_keywords)
+        entity_supplement, topic_supplement = self._neo4j_supplementary_search(
+            entity_keywords, topic_keywords, top_k, top_k
+        )
+        entity_results, topic_results = entity_future.result(), topic_future.result()
+        entity_results = heapq.nlargest(top_k, _best_per_node(entity_results + entity_supplement), key=_relevance)
+        topic_results = heapq.nlargest(top_k, _best_per_node(topic_results + topic_supplement), key=_relevance)
+        logger.info("实体级检索返回 %d 个结果，主题级检索返回 %d 个结果", len(entity_results), len(topic_results))
         
-        for result in sorted(all_results, key=lambda x: x.relevance_score, reverse=True):
-            if result.node_id not in seen_nodes:
-                seen_nodes.add(result.node_id)
-                unique_results.append(result)
+        # 3-4. 结果合并：两层之间仍可能命中同一节点，跨层去重后取前top_k个
+        unique_results = heapq.nlargest(top_k, _best_per_node(entity_results + topic_results), key=_relevance)
         
         # 5. 转换为Document格式
         documents = []
-        for result in unique_results[:top_k]:
+        for result in unique_results:
             # 确保recipe_name字段正确设置
             recipe_name = result.metadata.get("name") or result.metadata.get("entity_name", "未知菜品")
             
@@ -709,17 +1235,29 @@ class HybridRetrievalModule:
             )
             documents.append(doc)
             
-        logger.info(f"双层检索完成，返回 {len(documents)} 个文档")
+        logger.info("双层检索完成，返回 %d 个文档", len(documents))
         return documents
     
-    def vector_search_enhanced(self, query: str, top_k: int = 5) -> List[Document]:
+    def vector_search_enhanced(self, query: str, top_k: int = 5,
+                               filters: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         增强的向量检索：结合图信息
+
+        Args:
+            query: 查询文本
+            top_k: 返回结果数量
+            filters: 元数据过滤条件（如 {"node_type": "Attraction"}），
+                     在Milvus的ANN检索中直接过滤，返回的top_k均满足条件
         """
         try:
-            # 使用Milvus进行向量检索
-            vector_docs = self.milvus_module.similarity_search(query, k=top_k*2)
+            # 使用Milvus进行向量检索：过滤在索引内完成，结果不做二次筛选，无需多取候选
+            vector_docs = self.milvus_module.similarity_search(query, k=top_k, filters=filters)
             
+            # 所有结果的邻居信息一次批量查询
+            neighbors_by_id = self._batch_get_neighbors([
+                result.get("metadata", {}).get("node_id") for result in vector_docs
+            ])
+
             # 用图信息增强结果并转换为Document对象
             enhanced_docs = []
             for result in vector_docs:
@@ -730,7 +1268,7 @@ class HybridRetrievalModule:
                 
                 if node_id:
                     # 从图中获取邻居信息
-                    neighbors = self._get_node_neighbors(node_id)
+                    neighbors = neighbors_by_id.get(node_id)
                     if neighbors:
                         # 将邻居信息添加到内容中
                         neighbor_info = f"\n相关信息: {', '.join(neighbors[:3])}"
@@ -741,7 +1279,7 @@ class HybridRetrievalModule:
                 
                 # 调试：打印向量得分
                 vector_score = result.get("score", 0.0)
-                logger.debug(f"向量检索得分: {recipe_name} = {vector_score}")
+                logger.debug("向量检索得分: %s = %s", recipe_name, vector_score)
                 
                 # 创建Document对象
                 doc = Document(
@@ -755,7 +1293,7 @@ class HybridRetrievalModule:
                 )
                 enhanced_docs.append(doc)
                 
-            return enhanced_docs[:top_k]
+            return enhanced_docs
             
         except Exception as e:
             logger.error(f"增强向量检索失败: {e}")
@@ -763,75 +1301,133 @@ class HybridRetrievalModule:
     
     def _get_node_neighbors(self, node_id: str, max_neighbors: int = 3) -> List[str]:
         """获取节点的邻居信息"""
+        return self._batch_get_neighbors([node_id], max_neighbors).get(node_id, [])
+
+    def _batch_get_neighbors(self, node_ids: List[str], max_neighbors: int = 3) -> Dict[str, List[str]]:
+        """
+        批量获取多个节点的邻居名称，返回 节点ID -> 邻居名称列表
+        先查一跳邻居缓存，未命中的节点合并为一次查询
+        """
+        unique_ids = [node_id for node_id in dict.fromkeys(node_ids) if node_id]
+        if not unique_ids:
+            return {}
+
+        neighbors_by_id = {}
+        misses = []
+        with self._neighbor_cache_lock:
+            for node_id in unique_ids:
+                cached = self._neighbor_cache.get((node_id, max_neighbors))
+                if cached is None:
+                    misses.append(node_id)
+                else:
+                    self._neighbor_cache.move_to_end((node_id, max_neighbors))
+                    neighbors_by_id[node_id] = list(cached)
+
+        if not misses:
+            return neighbors_by_id
+
         try:
-            with self.driver.session() as session:
-                query = """
-                MATCH (n {nodeId: $node_id})-[r]-(neighbor)
-                RETURN neighbor.name as name
-                LIMIT $limit
-                """
-                result = session.run(query, {"node_id": node_id, "limit": max_neighbors})
-                return [record["name"] for record in result if record["name"]]
+            result = self._run_read(_BATCH_NEIGHBORS_CYPHER, {"node_ids": misses, "limit": max_neighbors})
+            fetched = {record["node_id"]: record["names"] for record in result}
         except Exception as e:
             logger.error(f"获取邻居节点失败: {e}")
-            return []
+            return neighbors_by_id
+
+        # 图中不存在的节点也缓存为空元组，避免重复查询
+        with self._neighbor_cache_lock:
+            for node_id in misses:
+                self._neighbor_cache[(node_id, max_neighbors)] = tuple(fetched.get(node_id, ()))
+            while len(self._neighbor_cache) > NEIGHBOR_CACHE_SIZE:
+                self._neighbor_cache.popitem(last=False)
+
+        neighbors_by_id.update(fetched)
+        return neighbors_by_id
+
+    def clear_neighbor_cache(self):
+        """清空一跳邻居缓存（图数据写入或图索引重建后调用）"""
+        with self._neighbor_cache_lock:
+            self._neighbor_cache.clear()
     
     def hybrid_search(self, query: str, top_k: int = 5) -> List[Document]:
         """
         混合检索：使用Round-robin轮询合并策略
         公平轮询合并不同检索结果，不使用权重配置
         """
-        logger.info(f"开始混合检索: {query}")
-        
-        # 1. 双层检索（实体+主题检索）
-        dual_docs = self.dual_level_retrieval(query, top_k)
+        logger.info("开始混合检索: %s", query)
         
-        # 2. 增强向量检索
+        # 1-2. 双层检索（关键词提取+实体/主题检索）和增强向量检索互不依赖，并发执行
+        #    双层检索提交到常驻线程池，向量检索在当前线程执行，耗时取两者较大值
+        dual_future = self._get_search_executor().submit(self.dual_level_retrieval, query, top_k)
         vector_docs = self.vector_search_enhanced(query, top_k)
+        dual_docs = dual_future.result()
         
-        # 3. Round-robin轮询合并
-        merged_docs = []
-        seen_doc_ids = set()
-        max_len = max(len(dual_docs), len(vector_docs))
+        # 3. Round-robin轮询合并：每轮先取双层检索结果，再取向量检索结果，凑满top_k即停止
+        hits: List[RetrievalHit] = []
+        seen_doc_ids: set[int] = set()
         origin_len = len(dual_docs) + len(vector_docs)
+
+        def add(doc: Document, search_method: str, final_score: float):
+            doc_id = _doc_key(doc)
+            if doc_id in seen_doc_ids:
+                return
+            seen_doc_ids.add(doc_id)
+            hits.append(RetrievalHit(doc_id, final_score, search_method, doc))
+
+        for dual_doc, vector_doc in zip_longest(dual_docs, vector_docs):
+            if dual_doc is not None:
+                add(dual_doc, "dual_level", dual_doc.metadata.get("relevance_score", 0.0))
+
+            if vector_doc is not None:
+                # 向量得分为归一化向量的内积，本身就是余弦相似度（越大越相似），取值[-1, 1]；
+                # 截到[0, 1]与双层检索的relevance_score同一量纲
+                vector_score = float(vector_doc.metadata.get("score", 0.0))
+                add(vector_doc, "vector_enhanced", min(1.0, max(0.0, vector_score)))
+
+            if len(hits) >= top_k:
+                break
+
+        # 取前top_k个结果，只为入选文档写回一次元数据
+        final_docs = []
+        for order, hit in enumerate(hits[:top_k]):
+            hit.doc.metadata.update(
+                search_method=hit.method,
+                round_robin_order=order,
+                final_score=hit.score  # 统一的final_score字段
+            )
+            final_docs.append(hit.doc)
         
-        for i in range(max_len):
-            # 先添加双层检索结果
-            if i < len(dual_docs):
-                doc = dual_docs[i]
-                doc_id = doc.metadata.get("node_id", hash(doc.page_content))
-                if doc_id not in seen_doc_ids:
-                    seen_doc_ids.add(doc_id)
-                    doc.metadata["search_method"] = "dual_level"
-                    doc.metadata["round_robin_order"] = len(merged_docs)
-                    # 设置统一的final_score字段
-                    doc.metadata["final_score"] = doc.metadata.get("relevance_score", 0.0)
-                    merged_docs.append(doc)
-            
-            # 再添加向量检索结果
-            if i < len(vector_docs):
-                doc = vector_docs[i]
-                doc_id = doc.metadata.get("node_id", hash(doc.page_content))
-                if doc_id not in seen_doc_ids:
-                    seen_doc_ids.add(doc_id)
-                    doc.metadata["search_method"] = "vector_enhanced"
-                    doc.metadata["round_robin_order"] = len(merged_docs)
-                    # 设置统一的final_score字段（向量得分需要转换）
-                    vector_score = doc.metadata.get("score", 0.0)
-                    # COSINE距离转换为相似度：distance越小，相似度越高
-                    similarity_score = max(0.0, 1.0 - vector_score) if vector_score <= 1.0 else 0.0
-                    doc.metadata["final_score"] = similarity_score
-                    merged_docs.append(doc)
-        
-        # 取前top_k个结果
-        final_docs = merged_docs[:top_k]
-        
-        logger.info(f"Round-robin合并：从总共{origin_len}个结果合并为{len(final_docs)}个文档")
-        logger.info(f"混合检索完成，返回 {len(final_docs)} 个文档")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Round-robin合并：从总共%d个结果合并为%d个文档", origin_len, len(final_docs))
+            logger.info("混合检索完成，返回 %d 个文档", len(final_docs))
         return final_docs
         
+    def _get_search_executor(self) -> ThreadPoolExecutor:
+        """获取常驻检索线程池，不存在（首次使用或已close）时创建"""
+        with self._executor_lock:
+            if self._search_executor is None:
+                self._search_executor = ThreadPoolExecutor(max_workers=SEARCH_POOL_SIZE, thread_name_prefix="hybrid-search")
+            return self._search_executor
+
+    def _get_retrieval_executor(self) -> ThreadPoolExecutor:
+        """获取常驻索引检索线程池，不存在（首次使用或已close）时创建"""
+        with self._executor_lock:
+            if self._retrieval_executor is None:
+                self._retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_POOL_SIZE, thread_name_prefix="hybrid-retrieval")
+            return self._retrieval_executor
+
     def close(self):
         """关闭资源连接"""
         if self.driver:
             self.driver.close()
-            logger.info("Neo4j连接已关闭") 
+            logger.info("Neo4j连接已关闭")
+        # 缓存内容来自已关闭的连接，重新初始化后可能连接到不同的数据库
+        self.clear_neighbor_cache()
+        self.clear_result_cache()
+        with self._executor_lock:
+            for executor in (self._search_executor, self._retrieval_executor):
+                if executor is not None:
+                    executor.shutdown(wait=False)
+            self._search_executor = None
+            self._retrieval_executor = None
+        if self._owns_graph_data_module and self.graph_data_module:
+            self.graph_data_module.close() 
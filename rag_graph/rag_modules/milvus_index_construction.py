@@ -13,6 +13,17 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# 向量入库前统一L2归一化，内积即余弦相似度，省去Milvus打分时的模长除法
+VECTOR_METRIC_TYPE = "IP"
+
+
+def _l2_normalize(vectors) -> np.ndarray:
+    """按行L2归一化，零向量保持不变"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
 class MilvusIndexConstructionModule:
     """Milvus索引构建模块 - 负责向量化和Milvus索引构建"""
 
@@ -146,7 +157,7 @@ class MilvusIndexConstructionModule:
             self.client.create_collection(
                 collection_name=self.collection_name,
                 schema=schema,
-                metric_type="COSINE",  # 使用余弦相似度
+                metric_type=VECTOR_METRIC_TYPE,  # 归一化向量的内积即余弦相似度
                 consistency_level="Strong"
             )
             
@@ -177,7 +188,7 @@ class MilvusIndexConstructionModule:
             index_params.add_index(
                 field_name="vector",
                 index_type="HNSW",
-                metric_type="COSINE",
+                metric_type=VECTOR_METRIC_TYPE,
                 params={
                     "M": 16,
                     "efConstruction": 200
@@ -219,7 +230,7 @@ class MilvusIndexConstructionModule:
             # 2. 准备数据
             logger.info("正在生成向量embeddings...")
             texts = [chunk.page_content for chunk in chunks]
-            vectors = self.embeddings.embed_documents(texts)
+            vectors = _l2_normalize(self.embeddings.embed_documents(texts)).tolist()
             
             # 3. 准备插入数据
             entities = []
@@ -288,7 +299,7 @@ class MilvusIndexConstructionModule:
         try:
             # 生成向量
             texts = [chunk.page_content for chunk in new_chunks]
-            vectors = self.embeddings.embed_documents(texts)
+            vectors = _l2_normalize(self.embeddings.embed_documents(texts)).tolist()
             
             # 准备插入数据
             entities = []
@@ -339,7 +350,7 @@ class MilvusIndexConstructionModule:
         
         try:
             # 生成查询向量
-            query_vector = self.embeddings.embed_query(query)
+            query_vector = _l2_normalize(self.embeddings.embed_query(query)).tolist()
             
             # 构建过滤表达式
             filter_expr = ""
@@ -362,9 +373,9 @@ class MilvusIndexConstructionModule:
                 if filter_conditions:
                     filter_expr = " and ".join(filter_conditions)
             
-            # 执行搜索 - 修复参数传递
+            # 执行搜索 - 不指定metric_type，沿用集合索引的度量：
+            # 新建集合为IP，旧的COSINE集合无需重建也能继续检索，两者对归一化向量的得分相同
             search_params = {
-                "metric_type": "COSINE",
                 "params": {"ef": 64}
             }
             
@@ -392,7 +403,7 @@ class MilvusIndexConstructionModule:
                 for hit in results[0]:  # results[0]因为我们只发送了一个查询向量
                     result = {
                         "id": hit["id"],
-                        "score": hit["distance"],  # 注意：在COSINE距离中，值越大相似度越高
+                        "score": hit["distance"],  # 归一化向量的内积即余弦相似度，值越大越相似
                         "text": hit["entity"]["text"],
                         "metadata": {
                             "node_id": hit["entity"]["node_id"],
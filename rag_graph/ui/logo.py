@@ -25,6 +25,23 @@ PRODUCT_NAME = "GraphRAG"
 PRODUCT_VERSION = "1.0.0"
 PRODUCT_DESCRIPTION = "智能图RAG旅游助手"
 
+# 欢迎横幅与帮助提示只依赖主题，按主题缓存一份，render() 只拼接动态状态行
+_WELCOME_LINES: tuple = ()
+_WELCOME_THEME = None
+
+
+def _welcome_lines(theme) -> tuple:
+    """返回当前主题下的静态欢迎行（主题切换后重新构建）"""
+    global _WELCOME_LINES, _WELCOME_THEME
+    if _WELCOME_THEME is not theme:
+        _WELCOME_LINES = (
+            f"[{theme.primary}]✻[/] 欢迎使用 [{theme.primary}][bold]{PRODUCT_NAME}[/bold][/] {PRODUCT_DESCRIPTION}!",
+            "",
+            f"  [{theme.secondary_text}][italic]/help 获取帮助信息[/italic][/]",
+        )
+        _WELCOME_THEME = theme
+    return _WELCOME_LINES
+
 
 class Logo:
     """Logo 显示组件"""
@@ -52,14 +69,10 @@ class Logo:
             content_lines.append(f"[{self.theme.warning}]有新版本可用: {update_available}[/]")
             content_lines.append("")
         
-        # 欢迎信息
-        content_lines.append(
-            f"[{self.theme.primary}]✻[/] 欢迎使用 [{self.theme.primary}][bold]{PRODUCT_NAME}[/bold][/] {PRODUCT_DESCRIPTION}!"
-        )
-        content_lines.append("")
+        # 欢迎信息和帮助信息（静态部分复用缓存）
+        content_lines.extend(_welcome_lines(self.theme))
         
-        # 帮助信息和工作目录
-        content_lines.append(f"  [{self.theme.secondary_text}][italic]/help 获取帮助信息[/italic][/]")
+        # 工作目录
         if cwd:
             content_lines.append(f"  [{self.theme.secondary_text}]cwd: {cwd}[/]")
         
@@ -47,6 +47,7 @@ class REPL:
     ):
         self.console = console or Console()
         self.theme = get_theme()
+        self._build_markup_templates()
         self.on_query = on_query
         self.on_command = on_command
         self.commands = commands or []
@@ -65,10 +66,24 @@ class REPL:
         self._pt_style = PTStyle.from_dict({
             'prompt': 'ansibrightcyan',
         })
+        # 提示符内容固定，只解析一次
+        self._prompt_html = HTML('<style fg="cyan">&gt;</style> ')
         
         # 内置命令
         self._setup_builtin_commands()
     
+    def _build_markup_templates(self) -> None:
+        """预先生成各渲染方法使用的 rich 标记模板，渲染时只需 format 填入文本"""
+        theme = self.theme
+        self._user_template = f"[{theme.user_input}]❓ 您的问题:[/] {{}}"
+        self._assistant_header = f"[{theme.assistant}]🎯 回答:[/]"
+        self._status_templates = {
+            "info": f"[{theme.info}]{{}}[/]",
+            "success": f"[{theme.success}]{{}}[/]",
+            "warning": f"[{theme.warning}]{{}}[/]",
+            "error": f"[{theme.error}]{{}}[/]",
+        }
+
     def _setup_builtin_commands(self) -> None:
         """设置内置命令"""
         builtin = [
@@ -79,6 +94,11 @@ class REPL:
             Command("exit", "退出系统", self._cmd_quit, hidden=True),
         ]
         self.commands = builtin + self.commands
+
+        # 命令名 -> 命令，同名时保留排在前面的（内置命令优先），与按列表顺序查找的结果一致
+        self._cmd_map: Dict[str, Command] = {}
+        for cmd in self.commands:
+            self._cmd_map.setdefault(cmd.name, cmd)
     
     def _cmd_help(self, args: List[str] = None) -> None:
         """显示帮助信息"""
@@ -137,10 +157,10 @@ class REPL:
         cmd_name = parts[0].lower()
         args = parts[1:]
         
-        for cmd in self.commands:
-            if cmd.name == cmd_name:
-                cmd.handler(args)
-                return True
+        cmd = self._cmd_map.get(cmd_name)
+        if cmd is not None:
+            cmd.handler(args)
+            return True
         
         self.console.print(f"[{self.theme.error}]未知命令: /{cmd_name}[/]")
         self.console.print(f"[{self.theme.secondary_text}]输入 /help 查看可用命令[/]")
@@ -148,12 +168,12 @@ class REPL:
     
     def _get_prompt_message(self):
         """获取 prompt_toolkit 格式的提示符"""
-        return HTML(f'<style fg="cyan">&gt;</style> ')
+        return self._prompt_html
     
     def _render_user_message(self, text: str) -> None:
         """渲染用户消息"""
         self.console.print()
-        self.console.print(f"[{self.theme.user_input}]❓ 您的问题:[/] {text}")
+        self.console.print(self._user_template.format(text))
     
     def _render_assistant_message(self, text: str, streaming: bool = False) -> None:
         """渲染助手回复"""
@@ -168,14 +188,8 @@ class REPL:
     
     def _render_status(self, text: str, status: str = "info") -> None:
         """渲染状态信息"""
-        style_map = {
-            "info": self.theme.info,
-            "success": self.theme.success,
-            "warning": self.theme.warning,
-            "error": self.theme.error,
-        }
-        style = style_map.get(status, self.theme.info)
-        self.console.print(f"[{style}]{text}[/]")
+        template = self._status_templates.get(status) or self._status_templates["info"]
+        self.console.print(template.format(text))
     
     def show_logo(
         self,
@@ -279,6 +293,36 @@ class StreamingREPL(REPL):
     def set_stream_handler(self, handler: Callable) -> None:
         """设置流式查询处理器"""
         self.on_stream_query = handler
+
+    def _stream_markdown(self, chunks) -> None:
+        """
+        流式渲染 Markdown 回答
+        未完成的段落以纯文本实时显示在 Live 区域；遇到空行（段落边界）时，已完成的段落
+        只解析一次并作为 Markdown 打印到 Live 上方。代码块未闭合时不在其内部的空行处切分
+        """
+        pending = ""
+        live = Live(Text(), console=self.console, refresh_per_second=8, transient=True)
+        live.start()
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                pending += chunk
+
+                boundary = pending.rfind("\n\n")
+                if boundary != -1:
+                    complete = pending[:boundary]
+                    if complete.count("```") % 2 == 0:
+                        if complete.strip():
+                            live.console.print(Markdown(complete))
+                        pending = pending[boundary + 2:]
+
+                live.update(Text(pending))
+        finally:
+            live.stop()
+            # 最后一段（包括中断时已收到的部分）
+            if pending.strip():
+                self.console.print(Markdown(pending))
     
     def handle_streaming_response(self, user_input: str) -> None:
         """处理流式响应"""
@@ -287,7 +331,7 @@ class StreamingREPL(REPL):
         
         self._render_user_message(user_input)
         self.console.print()
-        self.console.print(f"[{self.theme.assistant}]🎯 回答:[/]")
+        self.console.print(self._assistant_header)
         self.console.print()
         
         interrupted = False
@@ -297,12 +341,8 @@ class StreamingREPL(REPL):
                 # 先获取分析结果
                 pass
             
-            # 流式输出回答
-            for chunk in self.on_stream_query(user_input):
-                if chunk:
-                    self.console.print(chunk, end="")
-            
-            self.console.print()  # 换行
+            # 流式输出回答（按段落渲染 Markdown）
+            self._stream_markdown(self.on_stream_query(user_input))
             
         except KeyboardInterrupt:
             interrupted = True
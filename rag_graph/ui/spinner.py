@@ -5,7 +5,6 @@ Spinner 组件 - 参考 Kode-cli 的加载动画
 import sys
 import time
 import random
-import threading
 from typing import Optional, List, Callable
 from contextlib import contextmanager
 from rich.console import Console
@@ -17,6 +16,9 @@ from .theme import get_theme
 
 # 加载动画字符 - 类似 Kode-cli
 SPINNER_FRAMES = ['·', '✢', '✳', '∗', '✻', '✽']
+# 正向 + 反向播放的完整帧序列
+_SPINNER_CYCLE = tuple(SPINNER_FRAMES + SPINNER_FRAMES[::-1])
+_SPINNER_CYCLE_LEN = len(_SPINNER_CYCLE)
 
 # 加载提示语 - 类似 Kode-cli 的有趣提示
 LOADING_MESSAGES = [
@@ -57,38 +59,49 @@ class Spinner:
         self._running = False
         self._start_time = 0
         self._frame_index = 0
-        self._thread: Optional[threading.Thread] = None
         self._live: Optional[Live] = None
+
+        # 每帧不变的部分预先构建，渲染时只拼接动画帧和已用秒数
+        self._build_static_text()
+
+    def _build_static_text(self) -> None:
+        """
+        构建消息文本和时间后缀（中断提示 + 右括号）
+        先在局部变量中构建完整再赋值，Live 刷新线程不会读到构建到一半的文本
+        """
+        message_text = Text(" ")
+        message_text.append(f"{self.message}… ", style=self.theme.primary)
+
+        suffix_text = Text()
+        if self.show_interrupt_hint:
+            suffix_text.append(" · ", style=self.theme.secondary_text)
+            suffix_text.append("esc", style=f"bold {self.theme.secondary_text}")
+            suffix_text.append(" 中断", style=self.theme.secondary_text)
+        suffix_text.append(")", style=self.theme.secondary_text)
+
+        self._message_text = message_text
+        self._suffix_text = suffix_text
     
     def _get_frame(self) -> str:
         """获取当前动画帧"""
-        frames = SPINNER_FRAMES + SPINNER_FRAMES[::-1]
-        frame = frames[self._frame_index % len(frames)]
-        self._frame_index += 1
+        frame = _SPINNER_CYCLE[self._frame_index]
+        self._frame_index = (self._frame_index + 1) % _SPINNER_CYCLE_LEN
         return frame
     
     def _render(self) -> Text:
         """渲染 Spinner 文本"""
-        text = Text()
-        
         # 动画字符
+        text = Text()
         text.append(self._get_frame(), style=self.theme.primary)
-        text.append(" ")
         
         # 消息
-        text.append(f"{self.message}… ", style=self.theme.primary)
+        text.append_text(self._message_text)
         
         # 已用时间
         if self.show_elapsed:
             elapsed = int(time.time() - self._start_time)
             text.append(f"({elapsed}s", style=self.theme.secondary_text)
-            
-            if self.show_interrupt_hint:
-                text.append(" · ", style=self.theme.secondary_text)
-                text.append("esc", style=f"bold {self.theme.secondary_text}")
-                text.append(" 中断", style=self.theme.secondary_text)
-            
-            text.append(")", style=self.theme.secondary_text)
+            text.append_text(self._suffix_text)
         
         return text
     
@@ -98,28 +111,18 @@ class Spinner:
         self._start_time = time.time()
         self._frame_index = 0
         
+        # Live 自带的刷新线程每次刷新时调用 _render 取最新帧，无需再开更新线程
         self._live = Live(
-            self._render(),
+            get_renderable=self._render,
             console=self.console,
             refresh_per_second=8,
             transient=True,
         )
         self._live.start()
-        
-        def update_loop():
-            while self._running:
-                if self._live:
-                    self._live.update(self._render())
-                time.sleep(0.12)
-        
-        self._thread = threading.Thread(target=update_loop, daemon=True)
-        self._thread.start()
     
     def stop(self) -> None:
         """停止 Spinner"""
         self._running = False
-        if self._thread:
-            self._thread.join(timeout=0.5)
         if self._live:
             self._live.stop()
             self._live = None
@@ -127,6 +130,7 @@ class Spinner:
     def update_message(self, message: str) -> None:
         """更新消息"""
         self.message = message
+        self._build_static_text()
 
 
 @contextmanager